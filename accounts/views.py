@@ -18,6 +18,9 @@ from .models import UserProfile, Farmer, Buyer, ContactMessage
 
 # FIX: Import OrderItem and Order so they can be used in the dashboard logic
 from livestock.models import LivestockItem, OrderItem, Order
+from livestock.analytics import get_herd_health
+from livestock.queries import with_primary_image
+from livestock.stats import get_farmer_stats
 
 
 # --- 1. REGISTRATION VIEW ---
@@ -89,27 +92,31 @@ def dashboard(request):
             # Get all items owned by this farmer
             farmer_items = LivestockItem.objects.filter(farmer=user.farmer_profile)
             
-            # 1. Total Livestock: Exclude 'sold' items as requested
-            context['total_livestock'] = farmer_items.exclude(status='sold').count()
-            
-            # 2. Sold Count: Count only 'sold' items
-            context['sold_count'] = farmer_items.filter(status='sold').count()
-            
-            # 3. Reserved Count: Count items currently in negotiation/delivery
-            context['reserved_count'] = farmer_items.filter(status='reserved').count()
+            # 1-3. Counters come precomputed from FarmerStats (one indexed read)
+            # Total Livestock excludes 'sold'; Reserved = in negotiation/delivery
+            stats = get_farmer_stats(user.farmer_profile)
+            context['total_livestock'] = stats.total_count
+            context['sold_count'] = stats.sold_count
+            context['reserved_count'] = stats.reserved_count
 
             # 4. Recent Listings: For the table
-            context['recent_listings'] = farmer_items.order_by('-listing_date')[:5]
+            recent = farmer_items.select_related('species', 'breed').order_by('-listing_date')[:5]
+            context['recent_listings'] = with_primary_image(recent)
             
             # 5. Inquiries: Find order items related to this farmer's livestock
             inquiries = OrderItem.objects.filter(livestock__in=farmer_items)
             
             # 6. New Inquiries Count: Only count orders with status 'inquiry_sent'
             # This matches the {{ new_inquiries_count }} variable in your template
-            context['new_inquiries_count'] = inquiries.filter(order__order_status='inquiry_sent').count()
+            context['new_inquiries_count'] = stats.new_inquiries_count
             
             # 7. Incoming Sales list (optional, if used in sidebar or extra widgets)
             context['incoming_sales'] = inquiries.order_by('-order__order_date')[:5]
+
+            # 8. Herd Health: telemetry statistics (cached for a few minutes)
+            herd_health = get_herd_health(user.farmer_profile)
+            context['herd_health'] = herd_health['herd']
+            context['flagged_animals'] = [a for a in herd_health['animals'] if a['flagged']][:5]
            
         except Exception as e:
             print(f"Dashboard Error: {e}")
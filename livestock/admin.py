@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
     LivestockSpecies, Breed, LivestockItem, ProductListing,
-    IoTDeviceData, Alert, Order, OrderItem
+    IoTDeviceData, Alert, Order, OrderItem, Geofence
 )
 
 @admin.register(LivestockSpecies)
@@ -31,6 +31,12 @@ class IoTDeviceDataAdmin(admin.ModelAdmin):
     list_display = ('data_id', 'livestock', 'timestamp', 'temperature', 'battery_level')
     search_fields = ('livestock__tag_id',)
 
+@admin.register(Geofence)
+class GeofenceAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'farmer', 'is_active')
+    list_filter = ('is_active',)
+    search_fields = ('name', 'farmer__farm_name')
+
 @admin.register(Alert)
 class AlertAdmin(admin.ModelAdmin):
     list_display = ('alert_id', 'alert_type', 'farmer', 'livestock', 'severity', 'is_resolved', 'timestamp')
@@ -0,0 +1,244 @@
+# livestock/alerts.py
+# Rule-based alert engine that turns the telemetry stream into Alert rows
+
+import threading
+from collections import deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+from .geo import distance_km, get_farm_geofences, inside_any
+from .models import Alert, IoTDeviceData, LivestockItem
+
+
+DEFAULT_THRESHOLDS = {
+    'fever_temperature': 39.5,         # degrees C
+    'temperature_rise_per_hour': 1.0,  # degrees C per hour above the rolling minimum
+    'temperature_window_minutes': 60,  # rolling minimum taken over this window
+    'temperature_min_minutes': 30,     # shorter rises are measured as if over this long
+    'low_battery': 15.0,               # percent
+    'inactivity_level': 5.0,           # activity_level below this counts as idle
+    'inactivity_minutes': 180,
+    'heartbeat_minutes': 30,           # no reading for this long -> No Signal
+    'sweep_minutes': 1,                # inline ingestion sweeps for No Signal at most this often
+    'geofence': None,                  # (latitude, longitude, radius_km) or None
+}
+
+
+def get_thresholds():
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    thresholds.update(getattr(settings, 'TELEMETRY_ALERT_THRESHOLDS', {}))
+    return thresholds
+
+
+class AnimalState:
+    """What the engine remembers about one animal between readings."""
+
+    def __init__(self, farmer_id):
+        self.farmer_id = farmer_id
+        self.last_timestamp = None
+        # (timestamp, temperature) candidates for the rolling minimum, rising
+        # left to right; the oldest entry is the window's lowest reading
+        self.temperatures = deque()
+        self.inactive_since = None
+
+
+class AlertEngine:
+    """
+    Evaluates threshold, rate-of-change, inactivity, geofence and heartbeat
+    rules over IoTDeviceData readings.
+
+    Per-animal state is kept in memory so history is never re-queried per
+    reading, and an alert type is only raised again for an animal once its
+    previous alert of that type has been resolved. One engine may be shared
+    by request threads: process() and sweep() hold a lock.
+    """
+
+    def __init__(self, thresholds=None):
+        self.thresholds = thresholds or get_thresholds()
+        self.states = {}
+        self.geofences = {}
+        self.last_sweep = None
+        self.lock = threading.Lock()
+
+    # --- State ---
+    def _load_states(self, livestock_ids):
+        missing = set(livestock_ids) - set(self.states)
+        if missing:
+            owners = LivestockItem.objects.filter(livestock_id__in=missing).values_list('livestock_id', 'farmer_id')
+            for livestock_id, farmer_id in owners:
+                self.states[livestock_id] = AnimalState(farmer_id)
+
+    # --- Rules (each returns (alert_type, severity, description) or None) ---
+    def _check_reading(self, state, reading):
+        t = self.thresholds
+        found = []
+
+        if reading.temperature is not None:
+            if reading.temperature >= t['fever_temperature']:
+                found.append(('Fever', 'critical', f"Temperature {reading.temperature:.1f}°C"))
+
+            # Rise against the lowest reading of the last hour, never over less than
+            # temperature_min_minutes, so sensor noise between close readings is no rise
+            window = state.temperatures
+            if window and reading.timestamp > state.last_timestamp:
+                while window and reading.timestamp - window[0][0] > timedelta(minutes=t['temperature_window_minutes']):
+                    window.popleft()
+                if window:
+                    baseline_at, baseline = window[0]
+                    minutes = max((reading.timestamp - baseline_at).total_seconds() / 60, t['temperature_min_minutes'])
+                    rise = (reading.temperature - baseline) * 60 / minutes
+                    if rise >= t['temperature_rise_per_hour']:
+                        found.append(('Rapid Temperature Rise', 'warning', f"Temperature rising {rise:.1f}°C per hour"))
+
+        if reading.battery_level is not None and reading.battery_level <= t['low_battery']:
+            found.append(('Low Battery', 'info', f"Collar battery at {reading.battery_level:.0f}%"))
+
+        if reading.activity_level is not None:
+            if reading.activity_level < t['inactivity_level']:
+                since = state.inactive_since or reading.timestamp
+                if reading.timestamp - since >= timedelta(minutes=t['inactivity_minutes']):
+                    found.append(('Inactivity', 'warning', f"Inactive since {timezone.localtime(since):%Y-%m-%d %H:%M}"))
+            else:
+                since = None
+        else:
+            since = state.inactive_since
+
+        geofence = t['geofence']
+        if geofence and reading.latitude is not None and reading.longitude is not None:
+            lat, lon, radius_km = geofence
+            away = distance_km(lat, lon, reading.latitude, reading.longitude)
+            if away > radius_km:
+                found.append(('Geofence Exit', 'critical', f"{away:.2f} km from the farm"))
+
+        # Farm polygons (Geofence rows): an animal must be inside one of its farmer's fences
+        fences = self.geofences.get(state.farmer_id)
+        if fences and reading.latitude is not None and reading.longitude is not None:
+            if not inside_any(fences, reading.latitude, reading.longitude):
+                found.append((
+                    'Geofence Exit', 'critical',
+                    f"Outside the farm boundary at {reading.latitude}, {reading.longitude}",
+                ))
+
+        # Late readings are still checked but do not move the state backwards
+        if state.last_timestamp is None or reading.timestamp >= state.last_timestamp:
+            state.last_timestamp = reading.timestamp
+            state.inactive_since = since
+            if reading.temperature is not None:
+                window = state.temperatures
+                while window and window[-1][1] >= reading.temperature:
+                    window.pop()
+                window.append((reading.timestamp, reading.temperature))
+
+        return found
+
+    # --- Output ---
+    def _create_alerts(self, candidates):
+        """Writes candidate alerts, skipping any that already have an open alert."""
+        if not candidates:
+            return []
+
+        # Keep the first candidate per (animal, type) within this batch
+        unique = {}
+        for livestock_id, alert_type, severity, description, timestamp in candidates:
+            unique.setdefault((livestock_id, alert_type), (severity, description, timestamp))
+
+        open_alerts = set(
+            Alert.objects.filter(
+                is_resolved=False,
+                livestock_id__in={key[0] for key in unique},
+                alert_type__in={key[1] for key in unique},
+            ).values_list('livestock_id', 'alert_type')
+        )
+
+        alerts = []
+        for (livestock_id, alert_type), (severity, description, timestamp) in unique.items():
+            if (livestock_id, alert_type) in open_alerts:
+                continue
+            alerts.append(Alert(
+                livestock_id=livestock_id,
+                farmer_id=self.states[livestock_id].farmer_id,
+                alert_type=alert_type,
+                severity=severity,
+                description=description,
+                timestamp=timestamp,
+            ))
+        return Alert.objects.bulk_create(alerts)
+
+    # --- Public API ---
+    def process(self, readings):
+        """Evaluates IoTDeviceData rows (in arrival order) and returns new alerts."""
+        readings = list(readings)
+        with self.lock:
+            self._load_states({r.livestock_id for r in readings})
+            self.geofences = get_farm_geofences()
+
+            candidates = []
+            for reading in readings:
+                state = self.states.get(reading.livestock_id)
+                if state is None:
+                    continue
+                for alert_type, severity, description in self._check_reading(state, reading):
+                    candidates.append((reading.livestock_id, alert_type, severity, description, reading.timestamp))
+
+            return self._create_alerts(candidates)
+
+    def sweep(self, now=None):
+        """
+        Raises 'No Signal' for animals whose collars have gone quiet. The
+        engine only sees its own share of readings when several processes
+        ingest, so quiet animals are checked against the table (one
+        aggregate over the livestock/timestamp index) before alerting.
+        """
+        now = now or timezone.now()
+        cutoff = now - timedelta(minutes=self.thresholds['heartbeat_minutes'])
+
+        with self.lock:
+            self.last_sweep = now
+            quiet = [
+                livestock_id for livestock_id, state in self.states.items()
+                if state.last_timestamp is not None and state.last_timestamp < cutoff
+            ]
+            if not quiet:
+                return []
+            latest = (
+                IoTDeviceData.objects.filter(livestock_id__in=quiet)
+                .values('livestock_id').annotate(last=Max('timestamp')).values_list('livestock_id', 'last')
+            )
+            for livestock_id, last in latest:
+                state = self.states[livestock_id]
+                state.last_timestamp = max(state.last_timestamp, last)
+
+            candidates = []
+            for livestock_id in quiet:
+                last_seen = self.states[livestock_id].last_timestamp
+                if last_seen < cutoff:
+                    description = f"No reading since {timezone.localtime(last_seen):%Y-%m-%d %H:%M}"
+                    candidates.append((livestock_id, 'No Signal', 'warning', description, now))
+            return self._create_alerts(candidates)
+
+    def sweep_if_due(self, now=None):
+        """sweep(), at most once every ``sweep_minutes`` (for the inline ingestion path)."""
+        now = now or timezone.now()
+        if self.last_sweep is not None and now - self.last_sweep < timedelta(minutes=self.thresholds['sweep_minutes']):
+            return []
+        return self.sweep(now)
+
+
+# One engine per process so the ingestion path keeps its state between
+# requests. Each process only sees the readings it ingests: deployments with
+# several workers should set TELEMETRY_ALERTS_INLINE = False and run the
+# `run_alert_engine` command, which sees every reading.
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = AlertEngine()
+    return _engine
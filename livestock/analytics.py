@@ -0,0 +1,277 @@
+# livestock/analytics.py
+# Herd-health statistics over the hourly telemetry rollups, computed with
+# NumPy. A herd's hourly buckets (at most 24 a day per animal, however fast
+# the collars report) are loaded once into flat arrays sorted by
+# (livestock_id, hour); every statistic is then a whole-array operation over
+# group boundaries instead of a Python loop per animal or per bucket.
+# Reports are as fresh as the rollups: run `refresh_telemetry_rollups` often.
+
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import LivestockItem, TelemetryHourRollup
+
+
+DEFAULT_ANALYTICS = {
+    'baseline_hours': 24,         # trailing window for an animal's temperature baseline
+    'baseline_min_readings': 6,   # fewer prior hourly means than this -> no z-score
+    'min_temperature_std': 0.2,   # degrees C; stops z blowing up on flat series
+    'anomaly_z': 3.0,             # |z| at or above this counts as an anomaly
+    'recent_hours': 24,           # window for flags (anomalies, activity vs herd)
+    'anomaly_flag_count': 3,      # recent anomalous hours before an animal is flagged
+    'activity_drop_ratio': 0.6,   # recent activity below 60% of the herd median
+    'battery_warning_hours': 48,  # projected hours left before flagging a collar
+}
+
+CACHE_KEY = 'livestock:herd_health:{farmer_id}:{days}'
+CACHE_TIMEOUT = 300  # seconds
+
+SERIES_DTYPE = np.dtype([
+    ('livestock_id', 'i8'),
+    ('timestamp', 'f8'),  # middle of the hour, seconds since the epoch
+    ('readings', 'i8'),
+    ('temperature', 'f8'),  # hourly means
+    ('temperature_count', 'i8'),
+    ('activity_level', 'f8'),
+    ('activity_level_count', 'i8'),
+    ('battery_level', 'f8'),
+])
+
+
+def get_analytics_settings():
+    options = dict(DEFAULT_ANALYTICS)
+    options.update(getattr(settings, 'HERD_ANALYTICS', {}))
+    return options
+
+
+# 1. LOADING
+def load_series(livestock_ids, start, end):
+    """
+    Reads the hourly rollups of ``livestock_ids`` (a list or an id subquery)
+    for the hours starting between ``start`` and ``end`` into one structured
+    array. Missing means become NaN.
+    """
+    rows = (
+        TelemetryHourRollup.objects.filter(livestock_id__in=livestock_ids, bucket_start__gte=start, bucket_start__lt=end)
+        .order_by('livestock_id', 'bucket_start')
+        .values_list(
+            'livestock_id', 'bucket_start', 'reading_count', 'temperature_avg', 'temperature_count',
+            'activity_level_avg', 'activity_level_count', 'battery_level_avg',
+        )
+        .iterator(chunk_size=getattr(settings, 'TELEMETRY_EXPORT_CHUNK_SIZE', 10000))
+    )
+    nan = math.nan
+    return np.fromiter(
+        (
+            (
+                livestock_id, hour.timestamp() + 1800.0, readings,
+                nan if temperature is None else temperature, temperature_count,
+                nan if activity is None else activity, activity_count,
+                nan if battery is None else battery,
+            )
+            for livestock_id, hour, readings, temperature, temperature_count, activity, activity_count, battery in rows
+        ),
+        dtype=SERIES_DTYPE,
+    )
+
+
+# 2. GROUPED HELPERS
+def _group_sums(group, values, groups, weights):
+    """Per-group total weight and weighted sum of the non-NaN entries of ``values``."""
+    valid = ~np.isnan(values)
+    counts = np.bincount(group[valid], weights=weights[valid], minlength=groups)
+    sums = np.bincount(group[valid], weights=values[valid] * weights[valid], minlength=groups)
+    return counts, sums
+
+
+def _divide(numerator, denominator):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, numerator / np.where(denominator > 0, denominator, 1), np.nan)
+
+
+def _last_valid(group, values, groups):
+    """Each group's last non-NaN value (rows are in time order)."""
+    rows = np.flatnonzero(~np.isnan(values))
+    last = np.full(groups, -1)
+    np.maximum.at(last, group[rows], rows)
+    return np.where(last >= 0, values[last], np.nan) if values.size else np.full(groups, np.nan)
+
+
+# 3. STATISTICS
+def temperature_zscores(group, timestamps, temperature, options):
+    """
+    For every hour: the mean and standard deviation of the same animal's
+    hourly temperatures over the previous ``baseline_hours`` (the hour itself
+    excluded), and the hour's z-score against that baseline.
+
+    Window edges are found with one searchsorted over a (group, time) key
+    and window sums come from running totals, so this is O(n log n) overall.
+    """
+    window = options['baseline_hours'] * 3600.0
+    span = (timestamps.max() - timestamps.min()) if timestamps.size else 0.0
+    key = group * (span + window + 1.0) + (timestamps - (timestamps.min() if timestamps.size else 0.0))
+    window_start = np.searchsorted(key, key - window, side='left')
+    current = np.arange(key.size)
+
+    valid = ~np.isnan(temperature)
+    filled = np.where(valid, temperature, 0.0)
+    count = np.concatenate(([0], np.cumsum(valid)))
+    total = np.concatenate(([0.0], np.cumsum(filled)))
+    squares = np.concatenate(([0.0], np.cumsum(filled * filled)))
+
+    n = count[current] - count[window_start]
+    mean = _divide(total[current] - total[window_start], n)
+    variance = _divide(squares[current] - squares[window_start], n) - mean * mean
+    std = np.sqrt(np.clip(variance, 0.0, None))
+
+    enough = n >= options['baseline_min_readings']
+    floor = np.maximum(std, options['min_temperature_std'])
+    with np.errstate(invalid='ignore'):
+        z = np.where(enough & valid, (temperature - mean) / floor, np.nan)
+    return mean, z
+
+
+def battery_drain(group, timestamps, battery, groups):
+    """Least-squares slope of battery level over time per animal, in % per day (positive = draining)."""
+    valid = ~np.isnan(battery)
+    g, t, b = group[valid], timestamps[valid], battery[valid]
+    counts = np.bincount(g, minlength=groups)
+    if not g.size:
+        return np.full(groups, np.nan)
+
+    # Centre time per animal so the sums stay well conditioned
+    t_mean = _divide(np.bincount(g, weights=t, minlength=groups), counts)
+    b_mean = _divide(np.bincount(g, weights=b, minlength=groups), counts)
+    dt = (t - t_mean[g]) / 86400.0
+    db = b - b_mean[g]
+    covariance = np.bincount(g, weights=dt * db, minlength=groups)
+    spread = np.bincount(g, weights=dt * dt, minlength=groups)
+    slope = _divide(covariance, np.where(counts >= 2, spread, 0.0))
+    return -slope
+
+
+def analyse_series(series, now=None, options=None):
+    """
+    Herd-health statistics for a structured array from ``load_series``.
+    Anomaly counts are in hours; readings and means weigh each hour by its
+    number of readings.
+
+    Returns ``(herd, animals)``: a dict of herd-wide figures and a list with
+    one dict per animal that has readings, most concerning animals first.
+    """
+    options = options or get_analytics_settings()
+    now = (now or timezone.now()).timestamp()
+
+    livestock_ids, group = np.unique(series['livestock_id'], return_inverse=True)
+    groups = livestock_ids.size
+    timestamps = series['timestamp']
+    temperature = series['temperature']
+    activity = series['activity_level']
+    battery = series['battery_level']
+
+    # Temperature: rolling baseline and z-score anomalies
+    baseline, z = temperature_zscores(group, timestamps, temperature, options)
+    anomalous = np.abs(np.nan_to_num(z)) >= options['anomaly_z']
+    anomaly_count = np.bincount(group[anomalous], minlength=groups)
+    recent = timestamps >= now - options['recent_hours'] * 3600.0
+    recent_anomalies = np.bincount(group[anomalous & recent], minlength=groups)
+    fever_flag = recent_anomalies >= options['anomaly_flag_count']
+    max_abs_z = np.full(groups, np.nan)
+    has_z = ~np.isnan(z)
+    if has_z.any():
+        np.fmax.at(max_abs_z, group[has_z], np.abs(z[has_z]))
+
+    temperature_count, temperature_sum = _group_sums(group, temperature, groups, series['temperature_count'])
+    mean_temperature = _divide(temperature_sum, temperature_count)
+    latest_temperature = _last_valid(group, temperature, groups)
+    latest_baseline = _last_valid(group, np.where(np.isnan(temperature), np.nan, baseline), groups)
+    latest_z = _last_valid(group, z, groups)
+
+    # Activity: each animal's recent mean against the herd's median
+    recent_activity = np.where(recent, activity, np.nan)
+    activity_count, activity_sum = _group_sums(group, recent_activity, groups, series['activity_level_count'])
+    mean_activity = _divide(activity_sum, activity_count)
+    herd_activity = float(np.nanmedian(mean_activity)) if np.any(~np.isnan(mean_activity)) else math.nan
+    relative_activity = _divide(mean_activity, np.full(groups, herd_activity))
+    activity_drop = relative_activity < options['activity_drop_ratio']
+
+    # Battery: drain rate and projected time until flat
+    drain_per_day = battery_drain(group, timestamps, battery, groups)
+    latest_battery = _last_valid(group, battery, groups)
+    hours_left = np.where(drain_per_day > 0, _divide(latest_battery, drain_per_day) * 24.0, np.nan)
+    battery_warning = hours_left < options['battery_warning_hours']
+
+    readings = np.bincount(group, weights=series['readings'], minlength=groups)
+    last_seen = _last_valid(group, timestamps, groups)
+
+    tags = dict(LivestockItem.objects.filter(livestock_id__in=livestock_ids.tolist()).values_list('livestock_id', 'tag_id'))
+    flagged = fever_flag | activity_drop | battery_warning
+    order = np.lexsort((-np.nan_to_num(max_abs_z), -flagged.astype(int)))
+
+    animals = [
+        {
+            'livestock_id': int(livestock_ids[i]),
+            'tag_id': tags.get(int(livestock_ids[i])),
+            'readings': int(readings[i]),
+            'last_seen': datetime.fromtimestamp(last_seen[i], tz=dt_timezone.utc),
+            'mean_temperature': _number(mean_temperature[i]),
+            'latest_temperature': _number(latest_temperature[i]),
+            'temperature_baseline': _number(latest_baseline[i]),
+            'temperature_z': _number(latest_z[i]),
+            'max_abs_temperature_z': _number(max_abs_z[i]),
+            'temperature_anomalies': int(anomaly_count[i]),
+            'recent_temperature_anomalies': int(recent_anomalies[i]),
+            'temperature_flag': bool(fever_flag[i]),
+            'recent_activity': _number(mean_activity[i]),
+            'relative_activity': _number(relative_activity[i]),
+            'activity_drop': bool(activity_drop[i]),
+            'battery_level': _number(latest_battery[i]),
+            'battery_drain_per_day': _number(drain_per_day[i]),
+            'battery_hours_left': _number(hours_left[i]),
+            'battery_warning': bool(battery_warning[i]),
+            'flagged': bool(flagged[i]),
+        }
+        for i in order
+    ]
+    herd = {
+        'animals': int(groups),
+        'readings': int(series['readings'].sum()),
+        'mean_temperature': _number(temperature_sum.sum() / temperature_count.sum()) if temperature_count.any() else None,
+        'median_recent_activity': _number(herd_activity),
+        'temperature_anomalies': int(anomaly_count.sum()),
+        'temperature_flags': int(fever_flag.sum()),
+        'activity_drops': int(activity_drop.sum()),
+        'battery_warnings': int(battery_warning.sum()),
+        'flagged_animals': int(flagged.sum()),
+    }
+    return herd, animals
+
+
+def _number(value, places=3):
+    value = float(value)
+    return None if math.isnan(value) or math.isinf(value) else round(value, places)
+
+
+# 4. ENTRY POINT (dashboard and API)
+def get_herd_health(farmer, days=None, refresh=False):
+    """
+    Herd-health report for a farmer's animals over the last ``days`` days
+    (default HERD_ANALYTICS_DAYS), from the hourly rollups. Cached for a
+    few minutes per farmer.
+    """
+    days = days or getattr(settings, 'HERD_ANALYTICS_DAYS', 30)
+    key = CACHE_KEY.format(farmer_id=farmer.pk, days=days)
+    report = None if refresh else cache.get(key)
+    if report is None:
+        now = timezone.now()
+        herd_ids = LivestockItem.objects.filter(farmer=farmer).values('livestock_id')
+        series = load_series(herd_ids, now - timedelta(days=days), now)
+        herd, animals = analyse_series(series, now=now)
+        report = {'generated_at': now, 'days': days, 'herd': herd, 'animals': animals}
+        cache.set(key, report, CACHE_TIMEOUT)
+    return report
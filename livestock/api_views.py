@@ -1,6 +1,42 @@
-from rest_framework import viewsets, permissions
-from .models import LivestockItem, LivestockSpecies
-from .serializers import LivestockItemSerializer, SpeciesSerializer
+import tempfile
+from datetime import timedelta
+from types import GeneratorType
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.parsers import JSONParser, MultiPartParser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from accounts.models import Farmer
+from .models import LivestockItem, LivestockPosition, LivestockSpecies
+from .alerts import get_engine
+from .analytics import get_herd_health
+from .conditional import listings_etag
+from .context_processors import buyer_id_for
+from .exports import (
+    CONTENT_TYPES, EXPORT_FORMATS, STREAMING_FORMATS, ExportUnavailable,
+    export_telemetry, parse_bound, telemetry_queryset,
+)
+from .forms import MultipleImageField
+from .geo import nearest, within_bbox
+from .images import save_uploaded_photos, stream_uploads_to_disk
+from .inquiries import INQUIRY_ACTIONS, MAX_BATCH_SIZE as INQUIRY_BATCH_SIZE, InquiryError, bulk_update_inquiries
+from .pagination import LivestockKeysetPagination
+from .queries import api_listings
+from .search import search_listings
+from .parsers import NDJSONParser
+from .serializers import (
+    LivestockItemSerializer, LivestockItemListSerializer, SpeciesSerializer, LivestockImageSerializer,
+)
+from .telemetry import ingest_readings
+from .wishlist import ACTIONS, MAX_BATCH_SIZE, get_wishlist_ids, update_wishlist, with_wishlist_flag
 
 # 1. Species API (Read Only is usually fine for lists)
 class SpeciesViewSet(viewsets.ReadOnlyModelViewSet):
@@ -12,6 +48,7 @@ class SpeciesViewSet(viewsets.ReadOnlyModelViewSet):
 class LivestockViewSet(viewsets.ModelViewSet):
     queryset = LivestockItem.objects.all()
     serializer_class = LivestockItemSerializer
+    pagination_class = LivestockKeysetPagination
     
     # Permissions: Anyone can READ (list/retrieve), but only Authenticated users can CREATE/UPDATE
     def get_permissions(self):
@@ -21,15 +58,330 @@ class LivestockViewSet(viewsets.ModelViewSet):
             permission_classes = [permissions.IsAuthenticated]
         return [permission() for permission in permission_classes]
 
+    # Photo uploads go to temp files chunk by chunk; set before authentication
+    # (its CSRF check reads the body)
+    def initialize_request(self, request, *args, **kwargs):
+        if self.action_map.get(request.method.lower()) == 'upload_photos':
+            stream_uploads_to_disk(request)
+        return super().initialize_request(request, *args, **kwargs)
+
+    # Polling clients get 304 Not Modified until a listing actually changes.
+    # ETag only: rows carry per-user wishlist state that a global
+    # Last-Modified date cannot see change.
+    @method_decorator(condition(etag_func=listings_etag))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    # Lists use the hand-written serializer; writes keep the ModelSerializer
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return LivestockItemListSerializer
+        return LivestockItemSerializer
+
     # Automatic filtering: Only show 'is_for_sale' items to the public list
     def get_queryset(self):
-        queryset = LivestockItem.objects.all()
+        # Nested species/breed/farmer/images are loaded up front (no per-item queries),
+        # and the requesting buyer's heart state rides on the same query
+        queryset = with_wishlist_flag(api_listings(), buyer_id_for(self.request.user))
         # If looking at the main list, only show available items
         if self.action == 'list':
-            return queryset.filter(is_for_sale=True, status='available')
+            queryset = queryset.filter(is_for_sale=True, status='available')
+            # ?q= free-text search returns the ranked best matches
+            query = (self.request.query_params.get('q') or '').strip()
+            if query:
+                return search_listings(queryset, query)
         return queryset
 
+    # Ranked search results are a single page; everything else is keyset-paginated
+    def paginate_queryset(self, queryset):
+        if (self.request.query_params.get('q') or '').strip():
+            return None
+        return super().paginate_queryset(queryset)
+
     # Auto-link the farmer when creating an item via API
     def perform_create(self, serializer):
         # Assumes the user is a farmer
-        serializer.save(farmer=self.request.user.farmer_profile)
\ No newline at end of file
+        serializer.save(farmer=self.request.user.farmer_profile)
+
+    # Batched photo upload: POST several files as 'images' (multipart) in one request
+    @action(detail=True, methods=['post'], parser_classes=[MultiPartParser], url_path='photos')
+    def upload_photos(self, request, pk=None):
+        livestock = self.get_object()
+        farmer = getattr(request.user, 'farmer_profile', None)
+        if farmer is None or livestock.farmer_id != farmer.pk:
+            raise PermissionDenied("You can only add photos to your own listings.")
+
+        try:
+            files = MultipleImageField().clean(request.FILES.getlist('images'))
+        except DjangoValidationError as e:
+            raise ValidationError({'images': e.messages})
+
+        photos = save_uploaded_photos(livestock, files)
+        serializer = LivestockImageSerializer(photos, many=True, context=self.get_serializer_context())
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+# 3. Telemetry Ingestion API (collar gateways post batches of readings)
+# Staff may post for any herd; a farmer's gateway only for the farmer's own animals
+class TelemetryIngestView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [JSONParser, NDJSONParser]
+
+    def get_farmer_id(self, request):
+        if request.user.is_staff:
+            return None
+        farmer = getattr(request.user, 'farmer_profile', None)
+        if farmer is None:
+            raise PermissionDenied("Only farmers can send telemetry.")
+        return farmer.pk
+
+    def post(self, request):
+        farmer_id = self.get_farmer_id(request)
+        readings = request.data
+        # A single JSON object is treated as a batch of one; NDJSON arrives as a generator
+        if isinstance(readings, dict):
+            readings = [readings]
+        elif not isinstance(readings, (list, GeneratorType)):
+            raise ValidationError({'detail': "Send a reading object or a list of readings."})
+
+        result = ingest_readings(readings, farmer_id=farmer_id)
+
+        alerts = []
+        if getattr(settings, 'TELEMETRY_ALERTS_INLINE', True):
+            engine = get_engine()
+            alerts = engine.process(result['created']) + engine.sweep_if_due()
+
+        return Response({
+            'received': result['received'],
+            'created': len(result['created']),
+            'rejected': result['rejected'],
+            'alerts': len(alerts),
+        }, status=status.HTTP_201_CREATED)
+
+
+# 4. Telemetry Export API (bulk history for analytics)
+# GET /api/telemetry/export/?start=2026-01-01&end=2026-04-01&livestock=3,7&output=csv|arrow|parquet|npz
+class TelemetryExportView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_livestock_ids(self, request):
+        raw = request.query_params.get('livestock')
+        try:
+            requested = [int(pk) for pk in raw.split(',') if pk.strip()] if raw else None
+        except ValueError:
+            raise ValidationError({'livestock': "Use a comma-separated list of livestock ids."})
+
+        # Staff may export any herd; farmers only their own animals
+        if request.user.is_staff:
+            return requested
+        farmer = getattr(request.user, 'farmer_profile', None)
+        if farmer is None:
+            raise PermissionDenied("Only farmers can export telemetry.")
+        owned = LivestockItem.objects.filter(farmer=farmer)
+        if requested is not None:
+            owned = owned.filter(livestock_id__in=requested)
+        owned = list(owned.values_list('livestock_id', flat=True))
+        if requested is not None and len(owned) != len(set(requested)):
+            raise PermissionDenied("You can only export telemetry for your own animals.")
+        return owned
+
+    def get(self, request):
+        export_format = request.query_params.get('output', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError({'output': f"Choose one of: {', '.join(EXPORT_FORMATS)}."})
+
+        try:
+            end = parse_bound(request.query_params['end']) if 'end' in request.query_params else timezone.now()
+            start = (
+                parse_bound(request.query_params['start']) if 'start' in request.query_params
+                else end - timedelta(days=30)
+            )
+        except ValueError as e:
+            raise ValidationError({'detail': str(e)})
+
+        queryset = telemetry_queryset(start, end, self.get_livestock_ids(request))
+        filename = f"telemetry_{start:%Y%m%d}_{end:%Y%m%d}.{export_format}"
+
+        try:
+            if export_format in STREAMING_FORMATS:
+                response = StreamingHttpResponse(
+                    export_telemetry(queryset, export_format), content_type=CONTENT_TYPES[export_format],
+                )
+                response['Content-Disposition'] = f'attachment; filename="{filename}"'
+                return response
+
+            # Parquet and .npz are only readable once complete: build on disk, then send
+            spool = tempfile.TemporaryFile()
+            export_telemetry(queryset, export_format, fileobj=spool)
+        except ExportUnavailable as e:
+            return Response({'detail': str(e)}, status=status.HTTP_501_NOT_IMPLEMENTED)
+        spool.seek(0)
+        return FileResponse(
+            spool, as_attachment=True, filename=filename, content_type=CONTENT_TYPES[export_format],
+        )
+
+
+# Herd endpoints act on the caller's own herd; staff may pick one with ?farmer=<id>
+class FarmerHerdMixin:
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_farmer(self, request):
+        farmer_id = request.query_params.get('farmer')
+        if request.user.is_staff and farmer_id:
+            farmer = Farmer.objects.filter(pk=farmer_id).first()
+            if farmer is None:
+                raise ValidationError({'farmer': "Unknown farmer."})
+            return farmer
+        farmer = getattr(request.user, 'farmer_profile', None)
+        if farmer is None:
+            raise PermissionDenied("Only farmers have a herd.")
+        return farmer
+
+
+# 5. Herd Health API (NumPy statistics over the herd's telemetry)
+# GET /api/herd-health/?days=30  (staff may add &farmer=<id>)
+class HerdHealthView(FarmerHerdMixin, APIView):
+    max_days = 90
+
+    def get(self, request):
+        farmer = self.get_farmer(request)
+        try:
+            days = int(request.query_params.get('days') or getattr(settings, 'HERD_ANALYTICS_DAYS', 30))
+        except ValueError:
+            raise ValidationError({'days': "Must be a whole number of days."})
+        days = max(1, min(days, self.max_days))
+
+        return Response(get_herd_health(farmer, days=days, refresh='refresh' in request.query_params))
+
+
+# 6. Herd Map API (latest collar position per animal, as GeoJSON)
+def position_feature(livestock_id, tag_id, latitude, longitude, timestamp, **properties):
+    return {
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': [float(longitude), float(latitude)]},
+        'properties': {'livestock_id': livestock_id, 'tag_id': tag_id, 'timestamp': timestamp, **properties},
+    }
+
+
+def query_float(request, name, minimum, maximum):
+    try:
+        value = float(request.query_params[name])
+    except KeyError:
+        raise ValidationError({name: "This parameter is required."})
+    except ValueError:
+        raise ValidationError({name: "Must be a number."})
+    if not minimum <= value <= maximum:
+        raise ValidationError({name: f"Must be between {minimum} and {maximum}."})
+    return value
+
+
+# GET /api/herd-map/?bbox=west,south,east,north
+class HerdMapView(FarmerHerdMixin, APIView):
+    def get(self, request):
+        positions = LivestockPosition.objects.filter(farmer=self.get_farmer(request))
+
+        bbox = request.query_params.get('bbox')
+        if bbox:
+            try:
+                west, south, east, north = (float(value) for value in bbox.split(','))
+            except ValueError:
+                raise ValidationError({'bbox': "Use bbox=west,south,east,north in degrees."})
+            if not (-90 <= south <= north <= 90 and -180 <= west <= east <= 180):
+                raise ValidationError({'bbox': "Use bbox=west,south,east,north in degrees."})
+            positions = within_bbox(positions, south, west, north, east)
+
+        rows = positions.values_list('livestock_id', 'livestock__tag_id', 'latitude', 'longitude', 'timestamp')
+        return Response({
+            'type': 'FeatureCollection',
+            'features': [position_feature(*row) for row in rows],
+        })
+
+
+# GET /api/herd-map/nearest/?lat=-1.94&lon=30.06&limit=10
+class NearestAnimalsView(FarmerHerdMixin, APIView):
+    max_limit = 100
+
+    def get(self, request):
+        latitude = query_float(request, 'lat', -90, 90)
+        longitude = query_float(request, 'lon', -180, 180)
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 10)), self.max_limit))
+        except ValueError:
+            raise ValidationError({'limit': "Must be a whole number."})
+
+        positions = LivestockPosition.objects.filter(farmer=self.get_farmer(request)).select_related('livestock')
+        found = nearest(positions, latitude, longitude, limit=limit)
+        return Response({
+            'type': 'FeatureCollection',
+            'features': [
+                position_feature(
+                    p.livestock_id, p.livestock.tag_id, p.latitude, p.longitude, p.timestamp,
+                    distance_km=round(p.distance_km, 3),
+                )
+                for p in found
+            ],
+        })
+
+
+# 7. Wishlist API (many items per request)
+# GET  /api/wishlist/             -> {"livestock_ids": [...]}
+# GET  /api/wishlist/?ids=4,9,12  -> {"wishlisted": {"4": true, "9": false, ...}}
+# POST /api/wishlist/  {"add": [4], "remove": [9], "toggle": [12]}  -> {"wishlisted": {...}}
+def id_list(values, field, limit=MAX_BATCH_SIZE):
+    if not isinstance(values, list):
+        raise ValidationError({field: "Must be a list of ids."})
+    try:
+        ids = [int(value) for value in values]
+    except (TypeError, ValueError):
+        raise ValidationError({field: "Must be a list of ids."})
+    if len(ids) > limit:
+        raise ValidationError({field: f"At most {limit} ids per request."})
+    return ids
+
+
+class WishlistView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_buyer(self, request):
+        buyer = getattr(request.user, 'buyer_profile', None)
+        if buyer is None:
+            raise PermissionDenied("Only buyers have a wishlist.")
+        return buyer
+
+    def get(self, request):
+        wishlisted = get_wishlist_ids(self.get_buyer(request).pk)
+        ids = request.query_params.get('ids')
+        if ids is None:
+            return Response({'livestock_ids': sorted(wishlisted)})
+        ids = id_list([value for value in ids.split(',') if value], 'ids')
+        return Response({'wishlisted': {pk: pk in wishlisted for pk in ids}})
+
+    def post(self, request):
+        changes = {action: id_list(request.data.get(action, []), action) for action in ACTIONS}
+        if not any(changes.values()):
+            raise ValidationError({'detail': "Give livestock ids to add, remove or toggle."})
+        if sum(len(ids) for ids in changes.values()) > MAX_BATCH_SIZE:
+            raise ValidationError({'detail': f"At most {MAX_BATCH_SIZE} ids per request."})
+        return Response({'wishlisted': update_wishlist(self.get_buyer(request), **changes)})
+
+
+# 8. Bulk Inquiry API (farmers approve or reject many inquiry lines at once)
+# POST /api/inquiries/bulk/  {"action": "approve" | "reject", "ids": [<order item id>, ...]}
+class BulkInquiryView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        farmer = getattr(request.user, 'farmer_profile', None)
+        if farmer is None:
+            raise PermissionDenied("Only farmers receive sales inquiries.")
+        action = request.data.get('action')
+        if action not in INQUIRY_ACTIONS:
+            raise ValidationError({'action': f"Must be one of: {', '.join(INQUIRY_ACTIONS)}."})
+        ids = id_list(request.data.get('ids'), 'ids', limit=INQUIRY_BATCH_SIZE)
+        if not ids:
+            raise ValidationError({'ids': "Select at least one inquiry."})
+        try:
+            result = bulk_update_inquiries(farmer, ids, action)
+        except InquiryError as e:
+            raise PermissionDenied(str(e))  # the selection includes another farmer's lines
+        return Response(result)
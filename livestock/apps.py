@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class LivestockConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'livestock'
+
+    def ready(self):
+        import livestock.checks
+        import livestock.signals
+        import livestock.tasks
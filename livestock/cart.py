@@ -0,0 +1,171 @@
+# livestock/cart.py
+# Cart and checkout operations. Totals are summed in the database and
+# checkout locks the animals it reserves, so two buyers can never both
+# reserve the same animal. Every change also rewrites the buyer's cached
+# cart summary, which the header badge reads without touching the database.
+
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .conditional import bump_listings_version, bump_user_version
+from .facets import clear_marketplace_facets
+from .models import LivestockItem, Order, OrderItem
+
+
+class CartError(Exception):
+    """Raised when the cart cannot be changed or checked out."""
+
+
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+CART_SUMMARY_KEY = 'livestock:cart_summary:{buyer_id}'
+CART_SUMMARY_TIMEOUT = 60 * 60 * 24  # rewritten on every cart change, so this only bounds staleness
+
+
+# 1. TOTALS (one UPDATE, no Python loop over items)
+def recalculate_total(order):
+    line_totals = (
+        OrderItem.objects.filter(order=OuterRef('pk'))
+        .values('order')
+        .annotate(total=Sum(ExpressionWrapper(F('unit_price_at_time') * F('quantity'), output_field=MONEY)))
+        .values('total')
+    )
+    Order.objects.filter(pk=order.pk).update(
+        total_amount=Coalesce(Subquery(line_totals), Value(Decimal('0')), output_field=MONEY)
+    )
+    order.refresh_from_db(fields=['total_amount'])
+    return order.total_amount
+
+
+def get_cart(buyer):
+    return Order.objects.filter(buyer=buyer, order_status='pending').first()
+
+
+# 2. CART CHANGES
+@transaction.atomic
+def add_item(buyer, item):
+    order, _ = Order.objects.get_or_create(
+        buyer=buyer,
+        order_status='pending',
+        defaults={'total_amount': Decimal('0')}
+    )
+
+    order_item, created = OrderItem.objects.get_or_create(
+        order=order,
+        livestock=item,
+        defaults={
+            'quantity': 1,
+            'unit_price_at_time': item.price or Decimal('0')
+        }
+    )
+    if not created:
+        OrderItem.objects.filter(pk=order_item.pk).update(quantity=F('quantity') + 1)
+
+    recalculate_total(order)
+    refresh_cart_summary(buyer.pk)
+    return order
+
+
+@transaction.atomic
+def remove_item(order, order_item_id):
+    OrderItem.objects.filter(order=order, order_item_id=order_item_id).delete()
+    recalculate_total(order)
+    refresh_cart_summary(order.buyer_id)
+    return order
+
+
+# 3. CHECKOUT
+@transaction.atomic
+def checkout(order, **contact):
+    """
+    Turns the pending cart into an inquiry and reserves every animal in it.
+
+    The order and its animals are locked with SELECT ... FOR UPDATE, then all
+    animals are reserved with one conditional UPDATE. The query count does not
+    depend on the cart size. Raises CartError (and changes nothing) if any
+    animal has already been reserved or sold.
+    """
+    order = Order.objects.select_for_update().get(pk=order.pk)
+    if order.order_status != 'pending':
+        raise CartError("This cart has already been checked out.")
+
+    livestock_ids = OrderItem.objects.filter(order=order, livestock__isnull=False).values('livestock_id')
+    # Always lock in primary-key order: two carts sharing animals then queue
+    # on the first shared row instead of deadlocking on each other's rows
+    locked = list(
+        LivestockItem.objects.select_for_update()
+        .filter(livestock_id__in=Subquery(livestock_ids))
+        .order_by('livestock_id')
+        .values_list('livestock_id', 'status')
+    )
+    if not locked:
+        raise CartError("Cart is empty.")
+
+    unavailable = [pk for pk, status in locked if status != 'available']
+    if unavailable:
+        raise CartError("Some animals in your cart are no longer available.")
+
+    ids = [pk for pk, _ in locked]
+    reserved = LivestockItem.objects.filter(livestock_id__in=ids, status='available').update(status='reserved')
+    if reserved != len(ids):
+        # Only possible without row locks (e.g. SQLite); roll everything back
+        raise CartError("Some animals in your cart are no longer available.")
+
+    for field, value in contact.items():
+        setattr(order, field, value)
+    order.order_status = 'inquiry_sent'
+    order.save()  # post_save refreshes the farmers' dashboard counters
+
+    # .update() skips the LivestockItem signals, so clear the facet cache and ETags here
+    transaction.on_commit(clear_marketplace_facets)
+    transaction.on_commit(bump_listings_version)
+    recalculate_total(order)
+    refresh_cart_summary(order.buyer_id)
+    return order
+
+
+# 4. CART SUMMARY (header badge; Buyer shares its primary key with User)
+EMPTY_SUMMARY = {'order_id': None, 'count': 0, 'total': Decimal('0'), 'line_ids': []}
+
+
+def compute_cart_summary(buyer_id):
+    """Item count, total and line ids of the buyer's pending cart, in one query."""
+    lines = list(
+        OrderItem.objects.filter(order__buyer_id=buyer_id, order__order_status='pending')
+        .order_by('order_item_id')
+        .values_list('order_item_id', 'quantity', 'order_id', 'order__total_amount')
+    )
+    if not lines:
+        return dict(EMPTY_SUMMARY)
+    return {
+        'order_id': lines[0][2],
+        'count': sum(quantity for _, quantity, _, _ in lines),
+        'total': lines[0][3],
+        'line_ids': [line_id for line_id, _, _, _ in lines],
+    }
+
+
+def get_cart_summary(buyer_id):
+    key = CART_SUMMARY_KEY.format(buyer_id=buyer_id)
+    summary = cache.get(key)
+    if summary is None:
+        summary = compute_cart_summary(buyer_id)
+        cache.set(key, summary, CART_SUMMARY_TIMEOUT)
+    return summary
+
+
+def refresh_cart_summary(buyer_id):
+    """Recomputes the cached summary once the current transaction commits."""
+    def write():
+        cache.set(CART_SUMMARY_KEY.format(buyer_id=buyer_id), compute_cart_summary(buyer_id), CART_SUMMARY_TIMEOUT)
+        bump_user_version(buyer_id)  # pages showing the old badge must not get a 304
+    transaction.on_commit(write)
+
+
+def clear_cart_summary(buyer_id):
+    cache.delete(CART_SUMMARY_KEY.format(buyer_id=buyer_id))
+    bump_user_version(buyer_id)
@@ -0,0 +1,27 @@
+# livestock/checks.py
+# Deployment checks (`manage.py check --deploy`)
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend not in LOCAL_CACHE_BACKENDS:
+        return []
+    return [Warning(
+        "The default cache is local to each process.",
+        hint=(
+            "Listing ETags, facets, detail pages, cart badges and wishlists are invalidated "
+            "through the cache; with several worker processes use a shared backend such as "
+            "Redis (set REDIS_URL)."
+        ),
+        id='livestock.W001',
+    )]
@@ -0,0 +1,53 @@
+# livestock/conditional.py
+# ETag support for listing pages. A single version stamp in the cache is
+# bumped whenever anything shown on a listing changes, so an unchanged page
+# can be answered with 304 before any query or rendering.
+# A second, per-user stamp covers what differs between users (cart badge,
+# avatar, wishlist hearts).
+
+import hashlib
+
+from django.core.cache import cache
+from django.utils import timezone
+
+
+VERSION_CACHE_KEY = 'livestock:listings_version'
+USER_VERSION_CACHE_KEY = 'livestock:user_version:{user_id}'
+
+
+def bump_listings_version():
+    cache.set(VERSION_CACHE_KEY, timezone.now(), None)
+
+
+def get_listings_version():
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        # First request after a restart/eviction: start a new version
+        cache.add(VERSION_CACHE_KEY, timezone.now(), None)
+        version = cache.get(VERSION_CACHE_KEY)
+    return version
+
+
+def bump_user_version(user_id):
+    cache.set(USER_VERSION_CACHE_KEY.format(user_id=user_id), timezone.now(), None)
+
+
+def get_user_version(user_id):
+    key = USER_VERSION_CACHE_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, timezone.now(), None)
+        version = cache.get(key)
+    return version
+
+
+# Callback for django.views.decorators.http.condition
+def listings_etag(request, *args, **kwargs):
+    # Same data renders differently per query string, host (absolute URLs),
+    # user and CSRF secret (pages embed the token; login rotates it)
+    user = '0'
+    if request.user.is_authenticated:
+        user = f"{request.user.pk}@{get_user_version(request.user.pk).isoformat()}"
+    csrf = request.META.get('CSRF_COOKIE') or ''
+    key = f"{get_listings_version().isoformat()}|{request.get_host()}|{request.get_full_path()}|{user}|{csrf}"
+    return hashlib.sha1(key.encode()).hexdigest()
@@ -0,0 +1,51 @@
+# livestock/context_processors.py
+# Everything base.html's header needs, served from the cache. The user comes
+# from the session lookup Django does anyway; the role, avatar and cart badge
+# are cached per user, so rendering the header costs no queries once warm.
+
+from django.core.cache import cache
+
+from accounts.models import UserProfile
+
+from .cart import get_cart_summary
+from .conditional import bump_user_version
+
+
+HEADER_PROFILE_KEY = 'livestock:header_profile:{user_id}'
+HEADER_PROFILE_TIMEOUT = 60 * 60 * 24  # cleared by signals when the profile changes
+
+
+def get_header_profile(user_id):
+    key = HEADER_PROFILE_KEY.format(user_id=user_id)
+    profile = cache.get(key)
+    if profile is None:
+        found = UserProfile.objects.filter(user_id=user_id).only('user_type', 'profile_picture').first()
+        profile = {
+            'user_type': found.user_type if found else None,
+            'avatar_url': found.profile_picture.url if found and found.profile_picture else None,
+        }
+        cache.set(key, profile, HEADER_PROFILE_TIMEOUT)
+    return profile
+
+
+def clear_header_profile(user_id):
+    cache.delete(HEADER_PROFILE_KEY.format(user_id=user_id))
+    bump_user_version(user_id)
+
+
+def buyer_id_for(user):
+    """The user's Buyer id (the same as the user id) if they are a buyer, else None. No queries once cached."""
+    if user.is_authenticated and get_header_profile(user.pk)['user_type'] == 'buyer':
+        return user.pk
+    return None
+
+
+def header(request):
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {'header_profile': None, 'cart_summary': None}
+
+    profile = get_header_profile(user.pk)
+    # Buyer's primary key is its user id, so no profile lookup is needed here
+    summary = get_cart_summary(user.pk) if profile['user_type'] == 'buyer' else None
+    return {'header_profile': profile, 'cart_summary': summary}
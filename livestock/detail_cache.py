@@ -0,0 +1,112 @@
+# livestock/detail_cache.py
+# Read-through cache for listing detail pages. Each listing's item (with its
+# species, breed, farmer, farmer profile and photos preloaded) is cached
+# under a per-listing version that signals bump on every change, so a hot
+# page renders from memory and an edit is visible on the next request.
+# Species and breed renames (rare) are left to expire with the entries.
+#
+# Stampede protection: an entry is fresh for DETAIL_CACHE_TIMEOUT, then
+# served stale for up to DETAIL_CACHE_GRACE while one request (holding a
+# short cache lock) reloads it. Requests that find nothing at all wait
+# briefly for the lock holder instead of all querying at once.
+
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from .models import LivestockImage, LivestockItem
+
+
+VERSION_KEY = 'livestock:detail_version:{pk}'
+ENTRY_KEY = 'livestock:detail:{pk}:{version}'
+LOCK_KEY = 'livestock:detail_lock:{pk}:{version}'
+
+DETAIL_CACHE_TIMEOUT = 10 * 60  # seconds an entry is fresh
+DETAIL_CACHE_GRACE = 2 * 60     # further seconds it may be served while one request reloads it
+LOCK_TIMEOUT = 5                # seconds; a crashed reload frees the lock by itself
+WAIT_STEP = 0.05
+
+# The farmer's User row only links to their profile: its password hash,
+# email and login times must not end up in the shared cache
+DEFERRED_USER_FIELDS = tuple(
+    f'farmer__user__{field.name}' for field in User._meta.concrete_fields if not field.primary_key
+)
+
+
+# 1. VERSIONS (bumped by signals; see livestock.signals)
+def bump_detail_version(pk):
+    # A fresh unique token, not a counter: an evicted counter restarting at 1
+    # could point back at an old entry
+    cache.set(VERSION_KEY.format(pk=pk), uuid.uuid4().hex, None)
+
+
+def bump_detail_versions(pks):
+    cache.set_many({VERSION_KEY.format(pk=pk): uuid.uuid4().hex for pk in pks}, None)
+
+
+def get_detail_version(pk):
+    key = VERSION_KEY.format(pk=pk)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+# 2. LOADING
+def load_listing(pk):
+    """The item with everything the detail page touches, or None."""
+    item = (
+        LivestockItem.objects.select_related('species', 'breed', 'farmer__user__userprofile')
+        .defer(*DEFERRED_USER_FIELDS)
+        .prefetch_related(Prefetch('images', queryset=LivestockImage.objects.order_by('id')))
+        .filter(pk=pk)
+        .first()
+    )
+    if item is not None:
+        item.primary_images = list(item.images.all()[:1])  # primary_image without another query
+    return item
+
+
+def _store(key, item):
+    entry = {'item': item, 'fresh_until': time.time() + DETAIL_CACHE_TIMEOUT}
+    cache.set(key, entry, DETAIL_CACHE_TIMEOUT + DETAIL_CACHE_GRACE)
+
+
+# 3. READ-THROUGH
+def get_listing(pk):
+    """
+    The listing for a detail page (None if it does not exist). Misses are
+    not cached, so a new listing shows up at once.
+    """
+    version = get_detail_version(pk)
+    key = ENTRY_KEY.format(pk=pk, version=version)
+    lock = LOCK_KEY.format(pk=pk, version=version)
+
+    entry = cache.get(key)
+    if entry is not None and entry['fresh_until'] > time.time():
+        return entry['item']
+
+    locked = cache.add(lock, 1, LOCK_TIMEOUT)
+    if not locked:
+        if entry is not None:
+            return entry['item']  # stale, but another request is already reloading it
+        # Someone else is loading this version; wait for their result
+        deadline = time.time() + LOCK_TIMEOUT
+        while time.time() < deadline and cache.get(lock) is not None:
+            time.sleep(WAIT_STEP)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry['item']
+
+    try:
+        item = load_listing(pk)
+        if item is not None:
+            _store(key, item)
+        return item
+    finally:
+        if locked:
+            cache.delete(lock)
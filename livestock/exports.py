@@ -0,0 +1,240 @@
+# livestock/exports.py
+# Bulk telemetry export for analytics. Rows come straight from a values_list
+# iterator (a server-side cursor on PostgreSQL) in fixed-size chunks, so
+# memory stays flat however many readings the date range covers.
+
+import csv
+import io
+import os
+import sys
+import tempfile
+import zipfile
+from array import array
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import islice
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import IoTDeviceData
+
+
+COLUMNS = (
+    'data_id', 'livestock_id', 'timestamp', 'latitude', 'longitude',
+    'temperature', 'activity_level', 'battery_level', 'device_type',
+)
+EXPORT_FORMATS = ('csv', 'arrow', 'parquet', 'npz')
+STREAMING_FORMATS = ('csv', 'arrow')  # the others need the whole file before it can be read
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet',
+    'npz': 'application/octet-stream',
+}
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+
+class ExportUnavailable(RuntimeError):
+    """Raised when a binary format's optional library is not installed."""
+
+
+def _chunk_size():
+    return getattr(settings, 'TELEMETRY_EXPORT_CHUNK_SIZE', 10000)
+
+
+# 1. ROWS
+def parse_bound(value):
+    """Accepts an ISO datetime or a plain date (midnight, local time)."""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Not a date or datetime: {value!r}")
+        moment = datetime(day.year, day.month, day.day)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def telemetry_queryset(start, end, livestock_ids=None):
+    """Readings with ``start <= timestamp < end``, grouped per animal in time order."""
+    queryset = IoTDeviceData.objects.filter(timestamp__gte=start, timestamp__lt=end)
+    if livestock_ids is not None:
+        queryset = queryset.filter(livestock_id__in=livestock_ids)
+    return queryset.order_by('livestock_id', 'timestamp', 'data_id')
+
+
+def iter_chunks(queryset, chunk_size=None):
+    """Yields lists of plain tuples (one per reading), never model instances."""
+    chunk_size = chunk_size or _chunk_size()
+    rows = queryset.values_list(*COLUMNS).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _micros(value):
+    return (value - EPOCH) // ONE_MICROSECOND
+
+
+def _float(value):
+    return float('nan') if value is None else float(value)
+
+
+# 2. CSV (always available)
+def iter_csv(queryset, chunk_size=None):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for chunk in iter_chunks(queryset, chunk_size):
+        writer.writerows(
+            (data_id, livestock_id, timestamp.isoformat(), *rest)
+            for data_id, livestock_id, timestamp, *rest in chunk
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+# 3. ARROW IPC / PARQUET (need pyarrow)
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+    except ImportError:
+        raise ExportUnavailable("Arrow and Parquet exports need the 'pyarrow' package.")
+    return pyarrow
+
+
+def _arrow_schema(pa):
+    return pa.schema([
+        ('data_id', pa.int64()),
+        ('livestock_id', pa.int64()),
+        ('timestamp', pa.timestamp('us', tz='UTC')),
+        ('latitude', pa.float64()),
+        ('longitude', pa.float64()),
+        ('temperature', pa.float64()),
+        ('activity_level', pa.float64()),
+        ('battery_level', pa.float64()),
+        ('device_type', pa.string()),
+    ])
+
+
+def _arrow_batches(pa, schema, queryset, chunk_size):
+    for chunk in iter_chunks(queryset, chunk_size):
+        columns = list(zip(*chunk))
+        # Coordinates are Decimals in the database; analytics wants plain doubles
+        for index in (3, 4):
+            columns[index] = [None if value is None else float(value) for value in columns[index]]
+        yield pa.record_batch(
+            [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+            schema=schema,
+        )
+
+
+def iter_arrow(queryset, chunk_size=None):
+    """Arrow IPC stream: one record batch per chunk, readable before the export finishes."""
+    pa = _pyarrow()
+    schema = _arrow_schema(pa)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for batch in _arrow_batches(pa, schema, queryset, chunk_size):
+            writer.write_batch(batch)
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+    yield sink.getvalue()  # end-of-stream marker
+
+
+def write_parquet(queryset, fileobj, chunk_size=None):
+    pa = _pyarrow()
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportUnavailable("Parquet exports need pyarrow built with Parquet support.")
+    schema = _arrow_schema(pa)
+    with pq.ParquetWriter(fileobj, schema, compression='zstd') as writer:
+        for batch in _arrow_batches(pa, schema, queryset, chunk_size):
+            writer.write_batch(batch)
+
+
+# 4. NUMPY .npz (needs numpy)
+NPZ_COLUMNS = (
+    # name, array typecode, numpy dtype
+    ('data_id', 'q', 'i8'),
+    ('livestock_id', 'q', 'i8'),
+    ('timestamp', 'q', 'M8[us]'),
+    ('latitude', 'd', 'f8'),
+    ('longitude', 'd', 'f8'),
+    ('temperature', 'd', 'f8'),
+    ('activity_level', 'd', 'f8'),
+    ('battery_level', 'd', 'f8'),
+)
+
+
+def write_npz(queryset, fileobj, chunk_size=None):
+    """
+    Writes one array per numeric column (``np.load(f)['temperature']``).
+    Missing readings are NaN and timestamps are UTC datetime64[us];
+    device_type is left out because .npz has no compact string column.
+
+    Columns are spooled to temporary files in one pass over the cursor and
+    then copied into the archive, so the export never sits in memory.
+    """
+    try:
+        from numpy.lib import format as npy_format
+    except ImportError:
+        raise ExportUnavailable("NumPy exports need the 'numpy' package.")
+
+    byteorder = '<' if sys.byteorder == 'little' else '>'
+    with tempfile.TemporaryDirectory() as tmpdir:
+        spools = {name: open(os.path.join(tmpdir, name), 'wb') for name, _, _ in NPZ_COLUMNS}
+        count = 0
+        try:
+            for chunk in iter_chunks(queryset, chunk_size):
+                count += len(chunk)
+                for (name, typecode, _), values in zip(NPZ_COLUMNS, zip(*chunk)):
+                    if name == 'timestamp':
+                        values = map(_micros, values)
+                    elif typecode == 'd':
+                        values = map(_float, values)
+                    array(typecode, values).tofile(spools[name])
+        finally:
+            for spool in spools.values():
+                spool.close()
+
+        with zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+            for name, _, dtype in NPZ_COLUMNS:
+                header = {'descr': byteorder + dtype, 'fortran_order': False, 'shape': (count,)}
+                with archive.open(f'{name}.npy', 'w', force_zip64=True) as member:
+                    npy_format.write_array_header_1_0(member, header)
+                    with open(os.path.join(tmpdir, name), 'rb') as spool:
+                        while block := spool.read(1 << 20):
+                            member.write(block)
+    return count
+
+
+# 5. ENTRY POINT (shared by the API view and the management command)
+def export_telemetry(queryset, export_format, fileobj=None, chunk_size=None):
+    """
+    Streaming formats return an iterator of byte chunks. File formats are
+    written to ``fileobj`` (which must be seekable for Parquet).
+    """
+    if export_format == 'csv':
+        return iter_csv(queryset, chunk_size)
+    if export_format == 'arrow':
+        _pyarrow()  # fail now, not halfway through a streamed response
+        return iter_arrow(queryset, chunk_size)
+    if export_format == 'parquet':
+        return write_parquet(queryset, fileobj, chunk_size)
+    if export_format == 'npz':
+        return write_npz(queryset, fileobj, chunk_size)
+    raise ValueError(f"Unknown export format: {export_format}")
@@ -0,0 +1,45 @@
+# livestock/facets.py
+# Cached species/location counts for the marketplace filter dropdowns
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import LivestockItem
+
+
+FACETS_CACHE_KEY = 'livestock:marketplace_facets'
+FACETS_TIMEOUT = 60 * 60  # signals clear it on every relevant change
+
+
+def compute_marketplace_facets():
+    available = LivestockItem.objects.filter(status='available', is_for_sale=True)
+
+    species = [
+        {'id': row['species_id'], 'species_name': row['species__species_name'], 'count': row['count']}
+        for row in available.values('species_id', 'species__species_name')
+        .annotate(count=Count('livestock_id'))
+        .order_by('species__species_name')
+    ]
+
+    locations = [
+        {'name': row['farmer__farm_location'], 'count': row['count']}
+        for row in available.exclude(farmer__farm_location__isnull=True)
+        .exclude(farmer__farm_location__exact='')
+        .values('farmer__farm_location')
+        .annotate(count=Count('livestock_id'))
+        .order_by('farmer__farm_location')
+    ]
+
+    return {'species': species, 'locations': locations}
+
+
+def get_marketplace_facets():
+    facets = cache.get(FACETS_CACHE_KEY)
+    if facets is None:
+        facets = compute_marketplace_facets()
+        cache.set(FACETS_CACHE_KEY, facets, FACETS_TIMEOUT)
+    return facets
+
+
+def clear_marketplace_facets():
+    cache.delete(FACETS_CACHE_KEY)
@@ -32,13 +32,32 @@ class LivestockItemForm(forms.ModelForm):
         }
         
 # --- 2. IMAGE UPLOAD FORM (Step 2: Add Photos) ---
-class LivestockImageForm(forms.ModelForm):
-    class Meta:
-        model = LivestockImage
-        fields = ['image']
-        widgets = {
-            'image': forms.ClearableFileInput(attrs={'class': 'form-control'})
-        }
+MAX_PHOTOS_PER_UPLOAD = 10
+
+
+class MultipleImageInput(forms.ClearableFileInput):
+    allow_multiple_selected = True
+
+
+class MultipleImageField(forms.ImageField):
+    """An ImageField that accepts several files and validates each one."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('widget', MultipleImageInput(attrs={'class': 'form-control', 'accept': 'image/*'}))
+        super().__init__(*args, **kwargs)
+
+    def clean(self, data, initial=None):
+        files = data if isinstance(data, (list, tuple)) else [data]
+        files = [f for f in files if f]
+        if not files and self.required:
+            raise forms.ValidationError(self.error_messages['required'], code='required')
+        if len(files) > MAX_PHOTOS_PER_UPLOAD:
+            raise forms.ValidationError(f"Upload at most {MAX_PHOTOS_PER_UPLOAD} photos at a time.")
+        return [super(MultipleImageField, self).clean(f, initial) for f in files]
+
+
+class LivestockImageForm(forms.Form):
+    images = MultipleImageField()
 
 # --- 3. ORDER FORM (For Payments) ---
 class SimpleOrderForm(forms.Form):
@@ -0,0 +1,206 @@
+# livestock/geo.py
+# Spatial lookups over LivestockPosition (the latest fix per animal).
+# Positions carry a geohash, so a bounding box becomes a handful of indexed
+# range scans on (farmer, geohash) instead of a scan over raw telemetry.
+
+import math
+
+from django.core.cache import cache
+from django.db.models import Q
+
+from .models import Geofence, LivestockItem, LivestockPosition
+
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9          # ~5 m cells for stored positions
+GEOHASH_RANGE_END = '{'        # sorts just after 'z', the last geohash character
+MAX_COVERING_CELLS = 16        # cells (range scans) per bounding-box query
+
+GEOFENCE_CACHE_KEY = 'livestock:geofences'
+GEOFENCE_CACHE_TIMEOUT = 600  # seconds
+
+EARTH_RADIUS_KM = 6371.0
+
+
+# 1. GEOHASH
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    latitude, longitude = float(latitude), float(longitude)
+    chars = []
+    bits, value, even = 0, 0, True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        if coordinate >= middle:
+            value = (value << 1) | 1
+            interval[0] = middle
+        else:
+            value <<= 1
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(height, width) in degrees of a geohash cell of ``precision`` characters."""
+    lon_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def covering_cells(min_lat, min_lon, max_lat, max_lon, max_cells=MAX_COVERING_CELLS):
+    """
+    The geohash prefixes that together cover a bounding box, at the finest
+    precision that needs no more than ``max_cells`` of them.
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        rows = math.floor((max_lat + 90) / height) - math.floor((min_lat + 90) / height) + 1
+        columns = math.floor((max_lon + 180) / width) - math.floor((min_lon + 180) / width) + 1
+        if rows * columns <= max_cells:
+            break
+
+    cells = set()
+    first_row = math.floor((min_lat + 90) / height)
+    first_column = math.floor((min_lon + 180) / width)
+    for row in range(rows):
+        for column in range(columns):
+            # Encode each cell's centre so float edges never land in a neighbour
+            latitude = min((first_row + row + 0.5) * height - 90, 90.0)
+            longitude = min((first_column + column + 0.5) * width - 180, 180.0)
+            cells.add(encode_geohash(latitude, longitude, precision))
+    return sorted(cells)
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (float(lat1), float(lon1), float(lat2), float(lon2)))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * math.asin(math.sqrt(a))
+
+
+# 2. POSITION MAINTENANCE (called from telemetry ingestion)
+def update_latest_positions(readings):
+    """
+    Moves each animal's LivestockPosition to its newest reading with
+    coordinates. Readings older than the stored position (late uploads)
+    are ignored. One read and one upsert per batch.
+    """
+    newest = {}
+    for reading in readings:
+        if reading.latitude is None or reading.longitude is None:
+            continue
+        current = newest.get(reading.livestock_id)
+        if current is None or reading.timestamp >= current.timestamp:
+            newest[reading.livestock_id] = reading
+    if not newest:
+        return 0
+
+    known = LivestockItem.objects.filter(livestock_id__in=newest).values_list(
+        'livestock_id', 'farmer_id', 'position__timestamp',
+    )
+    positions = []
+    for livestock_id, farmer_id, stored_at in known:
+        reading = newest[livestock_id]
+        if stored_at is not None and reading.timestamp < stored_at:
+            continue
+        positions.append(LivestockPosition(
+            livestock_id=livestock_id,
+            farmer_id=farmer_id,
+            data_id=reading.data_id,
+            timestamp=reading.timestamp,
+            latitude=reading.latitude,
+            longitude=reading.longitude,
+            geohash=encode_geohash(reading.latitude, reading.longitude),
+        ))
+
+    LivestockPosition.objects.bulk_create(
+        positions,
+        update_conflicts=True,
+        unique_fields=['livestock'],
+        update_fields=['farmer', 'data_id', 'timestamp', 'latitude', 'longitude', 'geohash'],
+    )
+    return len(positions)
+
+
+# 3. QUERIES
+def within_bbox(queryset, min_lat, min_lon, max_lat, max_lon):
+    """Positions inside the box: geohash range scans, then an exact coordinate check."""
+    cells = Q()
+    for prefix in covering_cells(min_lat, min_lon, max_lat, max_lon):
+        cells |= Q(geohash__gte=prefix, geohash__lt=prefix + GEOHASH_RANGE_END)
+    return queryset.filter(cells).filter(
+        latitude__gte=min_lat, latitude__lte=max_lat,
+        longitude__gte=min_lon, longitude__lte=max_lon,
+    )
+
+
+def bbox_around(latitude, longitude, radius_km):
+    height = math.degrees(radius_km / EARTH_RADIUS_KM)
+    width = height / max(math.cos(math.radians(latitude)), 1e-6)
+    return (
+        max(latitude - height, -90.0), max(longitude - width, -180.0),
+        min(latitude + height, 90.0), min(longitude + width, 180.0),
+    )
+
+
+def nearest(queryset, latitude, longitude, limit=10, radius_km=1.0, max_radius_km=50.0):
+    """
+    The ``limit`` positions closest to a point, nearest first, each with a
+    ``distance_km`` attribute. Searches a box around the point and doubles
+    it until ``limit`` animals lie inside the searched radius (or
+    ``max_radius_km`` is reached), so only nearby cells are ever read.
+    """
+    latitude, longitude = float(latitude), float(longitude)
+    while True:
+        candidates = list(within_bbox(queryset, *bbox_around(latitude, longitude, radius_km)))
+        for position in candidates:
+            position.distance_km = distance_km(latitude, longitude, position.latitude, position.longitude)
+        inside = sorted((p for p in candidates if p.distance_km <= radius_km), key=lambda p: p.distance_km)
+        if len(inside) >= limit or radius_km >= max_radius_km:
+            return inside[:limit]
+        radius_km = min(radius_km * 2, max_radius_km)
+
+
+# 4. GEOFENCES (polygons with precomputed bounding boxes)
+def point_in_polygon(latitude, longitude, polygon):
+    """Ray casting over [[lat, lon], ...]; the ring need not be closed."""
+    inside = False
+    j = len(polygon) - 1
+    for i in range(len(polygon)):
+        lat_i, lon_i = polygon[i]
+        lat_j, lon_j = polygon[j]
+        if (lat_i > latitude) != (lat_j > latitude):
+            crossing = lon_i + (latitude - lat_i) * (lon_j - lon_i) / (lat_j - lat_i)
+            if longitude < crossing:
+                inside = not inside
+        j = i
+    return inside
+
+
+def get_farm_geofences():
+    """farmer_id -> [((min_lat, min_lon, max_lat, max_lon), polygon), ...] for active fences."""
+    fences = cache.get(GEOFENCE_CACHE_KEY)
+    if fences is None:
+        fences = {}
+        for fence in Geofence.objects.filter(is_active=True):
+            fences.setdefault(fence.farmer_id, []).append((fence.bbox, fence.polygon))
+        cache.set(GEOFENCE_CACHE_KEY, fences, GEOFENCE_CACHE_TIMEOUT)
+    return fences
+
+
+def clear_farm_geofences():
+    cache.delete(GEOFENCE_CACHE_KEY)
+
+
+def inside_any(fences, latitude, longitude):
+    """True if the point is in one of ``fences``; boxes rule most fences out before any polygon test."""
+    latitude, longitude = float(latitude), float(longitude)
+    for (min_lat, min_lon, max_lat, max_lon), polygon in fences:
+        if min_lat <= latitude <= max_lat and min_lon <= longitude <= max_lon:
+            if point_in_polygon(latitude, longitude, polygon):
+                return True
+    return False
@@ -0,0 +1,136 @@
+# livestock/images.py
+# Resized, re-encoded derivatives of uploaded LivestockImage photos
+
+import logging
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db import transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .conditional import bump_listings_version
+from .detail_cache import bump_detail_version
+from .models import LivestockImage
+
+
+logger = logging.getLogger(__name__)
+
+# name -> max width in px (never upscaled)
+VARIANT_WIDTHS = {
+    'thumb': 160,   # cart, order history, dashboard and inquiry rows
+    'card': 480,    # marketplace grid
+    'large': 1200,  # detail page
+}
+
+# Derivatives live in their own folder per photo, apart from uploaded originals
+VARIANT_PATH = 'livestock_images/variants/{photo_id}/{size}.{extension}'
+
+# fmt -> (Pillow format, extension, save options)
+VARIANT_FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def _load_rgb(photo):
+    with photo.image.open('rb') as f:
+        source = Image.open(f)
+        # Phone photos are often stored sideways with an EXIF rotation flag
+        source = ImageOps.exif_transpose(source)
+        source.load()
+
+    if source.mode in ('RGBA', 'LA', 'P'):
+        source = source.convert('RGBA')
+        background = Image.new('RGB', source.size, (255, 255, 255))
+        background.paste(source, mask=source.getchannel('A'))
+        return background
+    return source.convert('RGB')
+
+
+def generate_variants(photo):
+    """
+    Writes every size/format derivative of ``photo`` under VARIANT_PATH and
+    records their storage paths in ``photo.variants``; the ones recorded
+    before are deleted afterwards. EXIF metadata is not copied into the
+    derivatives.
+    """
+    try:
+        source = _load_rgb(photo)
+    except (UnidentifiedImageError, OSError) as e:
+        logger.warning("Could not create variants for image %s: %s", photo.pk, e)
+        return {}
+
+    storage = photo.image.storage
+    previous = {path for formats in (photo.variants or {}).values() for path in formats.values()}
+    variants = {}
+
+    for size, width in VARIANT_WIDTHS.items():
+        if source.width > width:
+            height = max(1, round(source.height * width / source.width))
+            resized = source.resize((width, height), Image.LANCZOS)
+        else:
+            resized = source
+
+        variants[size] = {}
+        for fmt, (pil_format, extension, options) in VARIANT_FORMATS.items():
+            buffer = BytesIO()
+            resized.save(buffer, pil_format, **options)
+            path = VARIANT_PATH.format(photo_id=photo.pk, size=size, extension=extension)
+            # A leftover at this path gets a fresh name from the storage, never overwritten
+            variants[size][fmt] = storage.save(path, ContentFile(buffer.getvalue()))
+
+    LivestockImage.objects.filter(pk=photo.pk).update(variants=variants)
+    photo.variants = variants
+    for path in previous - {path for formats in variants.values() for path in formats.values()}:
+        storage.delete(path)
+    transaction.on_commit(bump_listings_version)  # pages now point at the new variant URLs
+    transaction.on_commit(lambda: bump_detail_version(photo.livestock_id))
+    return variants
+
+
+def stream_uploads_to_disk(request):
+    """
+    Sends this request's uploads to temporary files chunk by chunk, small
+    ones included (Django keeps files under 2.5 MB in memory by default).
+    Must run before request.POST or request.FILES is first read.
+    """
+    request.upload_handlers = [TemporaryFileUploadHandler(request)]
+
+
+def save_uploaded_photos(livestock, files):
+    """
+    Streams each uploaded file into storage, creates all LivestockImage rows
+    with one bulk_create and queues one derivative job per photo. If
+    anything fails, the files already stored are deleted again. Call it
+    outside a transaction: a later rollback of the caller's would leave them.
+    """
+    from .jobs import enqueue_many
+
+    field = LivestockImage._meta.get_field('image')
+    photos = []
+    try:
+        for upload in files:
+            photo = LivestockImage(livestock=livestock)
+            name = field.generate_filename(photo, upload.name)
+            photo.image = field.storage.save(name, upload, max_length=field.max_length)
+            photos.append(photo)
+
+        with transaction.atomic():
+            photos = LivestockImage.objects.bulk_create(photos)
+            transaction.on_commit(bump_listings_version)
+            transaction.on_commit(lambda: bump_detail_version(livestock.pk))
+            # bulk_create skips post_save, so queue the derivative jobs here
+            enqueue_many('process_livestock_image', [{'image_id': photo.pk} for photo in photos])
+    except Exception:
+        for photo in photos:
+            field.storage.delete(photo.image.name)
+        raise
+    return photos
+
+
+def delete_variants(photo):
+    storage = photo.image.storage
+    for formats in (photo.variants or {}).values():
+        for path in formats.values():
+            storage.delete(path)
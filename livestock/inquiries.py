@@ -0,0 +1,89 @@
+# livestock/inquiries.py
+# Farmer decisions on sales inquiries, many at a time. Ownership is checked
+# for the whole selection in one query, the orders change status in one
+# UPDATE and their animals are reserved or released in one more, all in a
+# single transaction, so the query count does not grow with the selection.
+
+from django.db import transaction
+
+from .conditional import bump_listings_version
+from .detail_cache import bump_detail_versions
+from .facets import clear_marketplace_facets
+from .models import LivestockItem, Order, OrderItem
+from .stats import farmers_for_orders, refresh_farmer_stats_on_commit
+
+
+class InquiryError(Exception):
+    """Raised when a selection cannot be acted on; nothing is changed."""
+
+
+# action -> (new order status, order statuses it applies to, animal status from, animal status to)
+INQUIRY_ACTIONS = {
+    'approve': ('approved', ('inquiry_sent',), 'available', 'reserved'),
+    'reject': ('cancelled', ('inquiry_sent', 'approved'), 'reserved', 'available'),
+}
+MAX_BATCH_SIZE = 500
+
+
+@transaction.atomic
+def bulk_update_inquiries(farmer, order_item_ids, action):
+    """
+    Approves or rejects the orders behind the farmer's selected inquiry lines
+    (OrderItem ids). Approved orders keep their animals reserved; rejected
+    orders give them back to the marketplace. Lines whose order has already
+    moved on (paid, confirmed, cancelled) are skipped and listed in the result.
+
+    Raises InquiryError, changing nothing, if any line is unknown or belongs
+    to another farmer, or if an order to change also holds another farmer's
+    animals (one farmer's decision must not cancel someone else's sale).
+    Returns a summary dict.
+    """
+    if action not in INQUIRY_ACTIONS:
+        raise InquiryError(f"Unknown action: {action}")
+    new_status, from_statuses, animal_from, animal_to = INQUIRY_ACTIONS[action]
+
+    order_item_ids = set(order_item_ids)
+    if not order_item_ids:
+        raise InquiryError("Select at least one inquiry.")
+    if len(order_item_ids) > MAX_BATCH_SIZE:
+        raise InquiryError(f"Select at most {MAX_BATCH_SIZE} inquiries at a time.")
+
+    # 1. Ownership of every line, in one query
+    lines = list(
+        OrderItem.objects.filter(order_item_id__in=order_item_ids)
+        .values_list('order_item_id', 'order_id', 'livestock__farmer_id')
+    )
+    if len(lines) != len(order_item_ids) or any(farmer_id != farmer.pk for _, _, farmer_id in lines):
+        raise InquiryError("You do not have permission to manage some of these inquiries.")
+
+    # 2. Lock the orders that can still make this move (a buyer may be paying right now)
+    order_ids = set(
+        Order.objects.select_for_update()
+        .filter(order_id__in={order_id for _, order_id, _ in lines}, order_status__in=from_statuses)
+        .exclude(payment_status='paid')
+        .order_by('order_id')
+        .values_list('order_id', flat=True)
+    )
+    skipped = sorted(line_id for line_id, order_id, _ in lines if order_id not in order_ids)
+    if not order_ids:
+        return {'orders': 0, 'animals': 0, 'skipped': skipped}
+    if OrderItem.objects.filter(order_id__in=order_ids).exclude(livestock__farmer_id=farmer.pk).exists():
+        raise InquiryError("Some of these orders include other farmers' animals; they cannot be changed here.")
+
+    # 3. One UPDATE for the orders, one for their animals. A cancelled order
+    # frees every animal on it, not only the selected lines.
+    Order.objects.filter(order_id__in=order_ids).update(order_status=new_status)
+    animals = LivestockItem.objects.filter(order_items__order_id__in=order_ids, farmer_id=farmer.pk, status=animal_from)
+    animal_ids = list(animals.values_list('livestock_id', flat=True).distinct())
+    changed = (
+        LivestockItem.objects.filter(livestock_id__in=animal_ids, farmer_id=farmer.pk, status=animal_from)
+        .update(status=animal_to)
+    )
+
+    # .update() skips the Order and LivestockItem signals: refresh what they would have
+    refresh_farmer_stats_on_commit(farmers_for_orders(order_ids) | {farmer.pk})
+    transaction.on_commit(clear_marketplace_facets)
+    transaction.on_commit(bump_listings_version)
+    transaction.on_commit(lambda: bump_detail_versions(animal_ids))
+
+    return {'orders': len(order_ids), 'animals': changed, 'skipped': skipped}
@@ -0,0 +1,107 @@
+# livestock/jobs.py
+# A small database-backed job queue. Work is enqueued as Job rows and
+# executed by `manage.py run_worker`, so slow tasks stay off the request path.
+
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+
+def task(name):
+    """Registers a function as a job handler: @task('process_livestock_image')."""
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+def enqueue(name, **payload):
+    """
+    Queues ``TASKS[name](**payload)``. The Job row commits with the caller's
+    transaction. With JOB_QUEUE_EAGER the task runs straight away instead
+    (handy locally when no worker is running).
+    """
+    if getattr(settings, 'JOB_QUEUE_EAGER', False):
+        transaction.on_commit(lambda: TASKS[name](**payload))
+        return None
+    return Job.objects.create(task=name, payload=payload)
+
+
+def enqueue_many(name, payloads):
+    """Queues one job per payload with a single INSERT."""
+    payloads = list(payloads)
+    if getattr(settings, 'JOB_QUEUE_EAGER', False):
+        for payload in payloads:
+            enqueue(name, **payload)
+        return []
+    return Job.objects.bulk_create([Job(task=name, payload=payload) for payload in payloads])
+
+
+# 1. CLAIMING
+def claim_jobs(limit):
+    """Marks up to ``limit`` due jobs as running and returns their ids."""
+    now = timezone.now()
+    stale = now - timedelta(seconds=getattr(settings, 'JOB_LOCK_TIMEOUT', 600))
+
+    with transaction.atomic():
+        # A crashed worker leaves jobs 'running'; put them back in the queue.
+        # The lost run counts as an attempt, so a job that keeps killing its
+        # worker still fails for good after max_attempts.
+        lost = Job.objects.filter(status='running', locked_at__lt=stale)
+        failed = lost.filter(attempts__gte=F('max_attempts') - 1).update(
+            status='failed', attempts=F('attempts') + 1, locked_at=None, finished_at=now,
+            last_error="The worker running this job stopped before it finished.",
+        )
+        if failed:
+            logger.error("%s job(s) failed for good after their worker stopped", failed)
+        lost.update(status='queued', attempts=F('attempts') + 1, locked_at=None)
+
+        due = Job.objects.filter(status='queued', run_after__lte=now).order_by('run_after', 'pk')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        ids = list(due.values_list('pk', flat=True)[:limit])
+        if not ids:
+            return []
+        # Without SKIP LOCKED (SQLite) another worker may have picked the same
+        # rows: only take those still queued, and keep the ones stamped with
+        # this claim's time
+        Job.objects.filter(pk__in=ids, status='queued').update(status='running', locked_at=now)
+        return list(Job.objects.filter(pk__in=ids, status='running', locked_at=now).values_list('pk', flat=True))
+
+
+# 2. RUNNING
+def run_job(job_id):
+    """Runs one claimed job and records the outcome. Safe to call in a child process."""
+    job = Job.objects.get(pk=job_id)
+    job.attempts += 1
+    try:
+        TASKS[job.task](**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            job.status = 'failed'
+            job.finished_at = timezone.now()
+            logger.error("Job %s (%s) failed for good", job.pk, job.task)
+        else:
+            # Back off 30s, 60s, 120s... before the next attempt
+            job.status = 'queued'
+            job.run_after = timezone.now() + timedelta(seconds=30 * 2 ** (job.attempts - 1))
+    else:
+        job.status = 'done'
+        job.finished_at = timezone.now()
+        job.last_error = None
+    job.locked_at = None
+    job.save()
+    return job.status
@@ -0,0 +1,244 @@
+# livestock/live.py
+# Live collar positions and alerts for open farmer dashboards (Server-Sent Events).
+# One LiveFeed per server process polls the telemetry and alert tables for
+# every connected farmer at once and fans the results out through a broker,
+# so the database sees the same two queries per interval whether one
+# dashboard is open or a thousand.
+
+import asyncio
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.db.models import Max
+from django.utils.module_loading import import_string
+
+from .models import Alert, IoTDeviceData
+from .telemetry import settled_cutoff
+
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRY_DELAY = 60.0  # seconds between polls while the database keeps failing
+
+
+# 1. BROKER (pluggable via LIVE_EVENTS_BROKER)
+class LocalBroker:
+    """
+    In-process fan-out: each open stream gets its own bounded asyncio.Queue,
+    keyed by channel (the farmer id). A slow client drops its oldest events
+    instead of holding up everyone else. Must be used from the event loop.
+    """
+
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self.subscribers = {}
+
+    def subscribe(self, channel):
+        queue = asyncio.Queue(maxsize=self.max_queue)
+        self.subscribers.setdefault(channel, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, channel, queue):
+        queues = self.subscribers.get(channel)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[channel]
+
+    def channels(self):
+        return set(self.subscribers)
+
+    def publish(self, channel, event):
+        for queue in self.subscribers.get(channel, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+
+def format_event(event):
+    """One SSE frame: ``id``, ``event`` and a single JSON ``data`` line."""
+    data = json.dumps(event['data'], cls=DjangoJSONEncoder)
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+
+# 2. FEED (one poller per process, started by the first subscriber)
+class LiveFeed:
+    position_fields = (
+        'data_id', 'livestock_id', 'livestock__tag_id', 'livestock__farmer_id', 'timestamp',
+        'latitude', 'longitude', 'temperature', 'activity_level', 'battery_level', 'received_at',
+    )
+    alert_fields = (
+        'alert_id', 'farmer_id', 'livestock_id', 'livestock__tag_id',
+        'alert_type', 'severity', 'description', 'timestamp', 'created_at',
+    )
+
+    def __init__(self, broker=None, interval=None, heartbeat=None, batch_size=5000):
+        self.broker = broker or import_string(
+            getattr(settings, 'LIVE_EVENTS_BROKER', 'livestock.live.LocalBroker')
+        )()
+        self.interval = interval or getattr(settings, 'LIVE_EVENTS_POLL_INTERVAL', 2.0)
+        self.heartbeat = heartbeat or getattr(settings, 'LIVE_EVENTS_HEARTBEAT', 15.0)
+        self.batch_size = batch_size
+        self.last_data_id = None
+        self.last_alert_id = None
+        # Ids above the watermarks that were already sent (their rows are not settled yet)
+        self.sent_data_ids = set()
+        self.sent_alert_ids = set()
+        self.task = None
+
+    # --- Polling (sync; runs in Django's sync thread) ---
+    def start_from_now(self):
+        # Streams show what happens after they open, not the table's history.
+        # The watermarks stop at settled rows; newer ones count as already sent.
+        cutoff = settled_cutoff()
+        self.last_data_id = (
+            IoTDeviceData.objects.filter(received_at__lte=cutoff).aggregate(last=Max('data_id'))['last'] or 0
+        )
+        self.last_alert_id = Alert.objects.filter(created_at__lte=cutoff).aggregate(last=Max('alert_id'))['last'] or 0
+        self.sent_data_ids = set(
+            IoTDeviceData.objects.filter(data_id__gt=self.last_data_id).values_list('data_id', flat=True)
+        )
+        self.sent_alert_ids = set(
+            Alert.objects.filter(alert_id__gt=self.last_alert_id).values_list('alert_id', flat=True)
+        )
+
+    @staticmethod
+    def _advance(rows, watermark, sent, cutoff):
+        """
+        The rows (stamp dropped) not sent before, and the new watermark: the
+        newest settled row. Rows above it are scanned again next time, in
+        case a lower id commits late, and ``sent`` keeps them from repeating.
+        """
+        new = [row[:-1] for row in rows if row[0] not in sent]
+        sent.update(row[0] for row in new)
+        settled = [row[0] for row in rows if row[-1] <= cutoff]
+        if settled:
+            watermark = settled[-1]
+            sent.difference_update([pk for pk in sent if pk <= watermark])
+        return new, watermark
+
+    def poll(self, farmer_ids):
+        """
+        Returns ``[(farmer_id, event), ...]`` for readings and alerts newer
+        than the last poll, for all ``farmer_ids`` in one query each. Only
+        the newest reading per animal is kept: a dashboard needs where the
+        cow is now, not every fix since the last tick.
+
+        Each query is a primary-key range scan over every farmer's rows,
+        filtered here, so the watermarks move past rows nobody is watching
+        instead of rescanning them on every tick. Rows are sent as soon as
+        they are seen, but the watermarks only pass settled ones.
+        """
+        if self.last_data_id is None:
+            self.start_from_now()
+        if not farmer_ids:
+            return []
+        cutoff = settled_cutoff()
+
+        readings = list(
+            IoTDeviceData.objects.filter(data_id__gt=self.last_data_id)
+            .order_by('data_id')
+            .values_list(*self.position_fields)[:self.batch_size]
+        )
+        alerts = list(
+            Alert.objects.filter(alert_id__gt=self.last_alert_id)
+            .order_by('alert_id')
+            .values_list(*self.alert_fields)[:self.batch_size]
+        )
+        readings, self.last_data_id = self._advance(readings, self.last_data_id, self.sent_data_ids, cutoff)
+        alerts, self.last_alert_id = self._advance(alerts, self.last_alert_id, self.sent_alert_ids, cutoff)
+
+        latest = {}
+        for row in readings:
+            if row[3] in farmer_ids:
+                latest[row[1]] = row
+        alerts = [row for row in alerts if row[1] in farmer_ids]
+
+        events = []
+        for data_id, livestock_id, tag_id, farmer_id, *values in latest.values():
+            events.append((farmer_id, {
+                'id': f'p{data_id}',
+                'type': 'position',
+                'data': dict(
+                    zip(('timestamp', 'latitude', 'longitude', 'temperature', 'activity_level', 'battery_level'), values),
+                    livestock_id=livestock_id, tag_id=tag_id,
+                ),
+            }))
+        for alert_id, farmer_id, livestock_id, tag_id, alert_type, severity, description, timestamp in alerts:
+            events.append((farmer_id, {
+                'id': f'a{alert_id}',
+                'type': 'alert',
+                'data': {
+                    'alert_id': alert_id, 'livestock_id': livestock_id, 'tag_id': tag_id,
+                    'alert_type': alert_type, 'severity': severity,
+                    'description': description, 'timestamp': timestamp,
+                },
+            }))
+        return events
+
+    def _poll_once(self, farmer_ids):
+        close_old_connections()
+        return self.poll(farmer_ids)
+
+    # --- Async side ---
+    async def run(self):
+        # A restarted poller must not replay what arrived while nobody watched
+        # (the first poll starts from now)
+        self.last_data_id = self.last_alert_id = None
+        delay = self.interval
+        try:
+            while channels := self.broker.channels():
+                try:
+                    events = await sync_to_async(self._poll_once)(channels)
+                except Exception:
+                    # Open streams keep their keep-alives; poll again, less often
+                    delay = min(delay * 2, MAX_RETRY_DELAY)
+                    logger.exception("Live feed poll failed; retrying in %.1fs", delay)
+                else:
+                    delay = self.interval
+                    for farmer_id, event in events:
+                        self.broker.publish(farmer_id, event)
+                await asyncio.sleep(delay)
+        finally:
+            self.task = None
+
+    def subscribe(self, farmer_id):
+        queue = self.broker.subscribe(farmer_id)
+        if self.task is None:
+            self.task = asyncio.get_running_loop().create_task(self.run())
+        return queue
+
+    async def stream(self, farmer_id):
+        """Async iterator of SSE frames for one farmer's open dashboard."""
+        queue = self.subscribe(farmer_id)
+        try:
+            yield f"retry: {int(self.interval * 1000) * 2}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=self.heartbeat)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_event(event)
+        finally:
+            self.broker.unsubscribe(farmer_id, queue)
+
+
+_feeds = {}
+
+
+def get_feed():
+    """The LiveFeed for the running event loop (one per server process)."""
+    loop = asyncio.get_running_loop()
+    feed = _feeds.get(loop)
+    if feed is None:
+        # Drop feeds of loops that have gone away (tests, reloads)
+        for old_loop in [old for old in _feeds if old.is_closed()]:
+            del _feeds[old_loop]
+        feed = _feeds[loop] = LiveFeed()
+    return feed
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from livestock.retention import apply_retention
+
+
+class Command(BaseCommand):
+    help = (
+        "Fold expired IoTDeviceData into the rollups, archive it to gzipped CSV, "
+        "delete it in batches and prune old rollups (see TELEMETRY_RETENTION)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--raw-days', type=int, help="Keep raw readings for this many days.")
+        parser.add_argument('--batch-size', type=int, help="Rows deleted per transaction.")
+        parser.add_argument(
+            '--no-archive', action='store_false', dest='archive', default=None,
+            help="Delete expired readings without writing archive files.",
+        )
+
+    def handle(self, *args, **options):
+        summary = apply_retention(
+            raw_days=options['raw_days'], batch_size=options['batch_size'], archive=options['archive'],
+        )
+        self.stdout.write(f"Rolled up {summary['rolled_up']} new readings.")
+        for name in summary['dropped_partitions']:
+            self.stdout.write(f"Dropped partition {name}.")
+        self.stdout.write(f"Deleted {summary['deleted_readings']} expired readings.")
+        for kind, count in summary['deleted_rollups'].items():
+            self.stdout.write(f"Deleted {count} {kind} rollups.")
+        self.stdout.write(self.style.SUCCESS("Retention applied."))
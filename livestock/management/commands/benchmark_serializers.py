@@ -0,0 +1,76 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries, transaction
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import Farmer
+from livestock.models import LivestockItem, LivestockSpecies, Breed, LivestockImage
+from livestock.queries import api_listings
+from livestock.serializers import LivestockItemSerializer, LivestockItemListSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compare list serialisation throughput: ModelSerializer on a bare queryset vs the fast read path."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--listings', type=int, default=1000)
+        parser.add_argument('--photos', type=int, default=2, help="Photos per listing.")
+
+    def seed(self, count, photos):
+        user = User.objects.create_user('benchmark-farmer')
+        farmer = Farmer.objects.create(user=user, farm_name='Benchmark Farm', farm_location='Musanze')
+        species = LivestockSpecies.objects.create(species_name='Benchmark Cattle')
+        breed = Breed.objects.create(species=species, breed_name='Ankole')
+        items = LivestockItem.objects.bulk_create([
+            LivestockItem(farmer=farmer, species=species, breed=breed, tag_id=f'BENCH{i:06d}',
+                          price=150000, weight=320.5, is_for_sale=True, description='Benchmark listing')
+            for i in range(count)
+        ])
+        LivestockImage.objects.bulk_create([
+            LivestockImage(livestock=item, image=f'livestock_images/bench_{item.pk}_{n}.jpg')
+            for item in items for n in range(photos)
+        ])
+        return [item.pk for item in items]
+
+    def measure(self, label, build):
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            data = build()
+            elapsed = time.perf_counter() - start
+        rate = len(data) / elapsed if elapsed else float('inf')
+        self.stdout.write(
+            f"{label:<38} {elapsed * 1000:8.1f} ms  {rate:10.0f} listings/s  {len(ctx.captured_queries):5d} queries"
+        )
+        return data
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                ids = self.seed(options['listings'], options['photos'])
+                bare = LivestockItem.objects.filter(pk__in=ids).order_by('pk')
+
+                before = self.measure(
+                    "Before: ModelSerializer, bare queryset",
+                    lambda: LivestockItemSerializer(bare.all(), many=True).data,
+                )
+                self.measure(
+                    "ModelSerializer, prefetched queryset",
+                    lambda: LivestockItemSerializer(api_listings(bare.all()), many=True).data,
+                )
+                after = self.measure(
+                    "After: list serializer, prefetched",
+                    lambda: LivestockItemListSerializer(api_listings(bare.all()), many=True).data,
+                )
+
+                if [dict(row) for row in before] != list(after):
+                    self.stderr.write("Warning: the two serializers produced different output.")
+                raise Rollback
+        except Rollback:
+            pass
+        reset_queries()
@@ -0,0 +1,63 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from accounts.models import Farmer, Buyer
+from livestock.geo import within_bbox
+from livestock.models import LivestockItem, LivestockPosition, Order, OrderItem, IoTDeviceData, Alert
+
+
+class Command(BaseCommand):
+    help = "Print the query plan of each hot marketplace/dashboard/telemetry query to confirm index use."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--analyze', action='store_true',
+            help="Run EXPLAIN ANALYZE (PostgreSQL only; executes the queries).",
+        )
+
+    def hot_queries(self):
+        # Sample ids so the plans use real parameter values when data exists
+        farmer_id = Farmer.objects.values_list('pk', flat=True).first() or 0
+        buyer_id = Buyer.objects.values_list('pk', flat=True).first() or 0
+        livestock_id = LivestockItem.objects.values_list('pk', flat=True).first() or 0
+        available = LivestockItem.objects.filter(status='available', is_for_sale=True)
+
+        return [
+            ("Marketplace page (newest first)",
+             available.order_by('-listing_date', '-livestock_id')[:25]),
+            ("Marketplace species filter",
+             available.filter(species_id=1).order_by('-listing_date', '-livestock_id')[:25]),
+            ("Marketplace price range",
+             available.filter(price__gte=50000, price__lte=500000)),
+            ("Cart lookup",
+             Order.objects.filter(buyer_id=buyer_id, order_status='pending')),
+            ("Farmer dashboard counters",
+             LivestockItem.objects.filter(farmer_id=farmer_id, status='reserved')),
+            ("Farmer sales inquiries",
+             OrderItem.objects.filter(livestock__farmer_id=farmer_id, order__order_status='inquiry_sent')),
+            ("Telemetry history (last 24h)",
+             IoTDeviceData.objects.filter(
+                 livestock_id=livestock_id, timestamp__gte=timezone.now() - timedelta(days=1),
+             ).order_by('timestamp')),
+            ("Open alerts for a farmer",
+             Alert.objects.filter(farmer_id=farmer_id, is_resolved=False)),
+            ("Herd map (bounding box)",
+             within_bbox(LivestockPosition.objects.filter(farmer_id=farmer_id), -2.0, 30.0, -1.9, 30.1)),
+        ]
+
+    def handle(self, *args, **options):
+        explain_options = {}
+        if options['analyze']:
+            if connection.vendor != 'postgresql':
+                self.stderr.write("--analyze is only supported on PostgreSQL; showing plain plans.")
+            else:
+                explain_options['analyze'] = True
+
+        self.stdout.write(f"Database: {connection.vendor}\n")
+        for title, queryset in self.hot_queries():
+            self.stdout.write(self.style.MIGRATE_HEADING(title))
+            self.stdout.write(queryset.explain(**explain_options))
+            self.stdout.write("")
@@ -0,0 +1,57 @@
+import sys
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from livestock.exports import (
+    EXPORT_FORMATS, STREAMING_FORMATS, ExportUnavailable, export_telemetry, parse_bound, telemetry_queryset,
+)
+
+
+class Command(BaseCommand):
+    help = "Export IoTDeviceData for a date range as CSV, Arrow IPC, Parquet or NumPy .npz."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="First day or datetime to include (default: 30 days before --end).")
+        parser.add_argument('--end', help="Day or datetime to stop before (default: now).")
+        parser.add_argument(
+            '--livestock', help="Comma-separated livestock ids (default: every animal).",
+        )
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv', dest='export_format')
+        parser.add_argument(
+            '--output', '-o',
+            help="File to write. CSV and Arrow go to stdout when omitted; Parquet and .npz need a file.",
+        )
+        parser.add_argument('--chunk-size', type=int, help="Rows fetched per database round trip.")
+
+    def handle(self, *args, **options):
+        export_format = options['export_format']
+        try:
+            end = parse_bound(options['end']) if options['end'] else timezone.now()
+            start = parse_bound(options['start']) if options['start'] else end - timedelta(days=30)
+            livestock_ids = (
+                [int(pk) for pk in options['livestock'].split(',') if pk.strip()]
+                if options['livestock'] else None
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        queryset = telemetry_queryset(start, end, livestock_ids)
+        output = options['output']
+        if output is None and export_format not in STREAMING_FORMATS:
+            raise CommandError(f"--output is required for {export_format} exports.")
+
+        try:
+            with (open(output, 'wb') if output else nullcontext(sys.stdout.buffer)) as fileobj:
+                if export_format in STREAMING_FORMATS:
+                    for block in export_telemetry(queryset, export_format, chunk_size=options['chunk_size']):
+                        fileobj.write(block)
+                else:
+                    export_telemetry(queryset, export_format, fileobj=fileobj, chunk_size=options['chunk_size'])
+        except ExportUnavailable as e:
+            raise CommandError(str(e))
+
+        if output:
+            self.stderr.write(self.style.SUCCESS(f"Wrote {export_format} export to {output}."))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from livestock.images import generate_variants
+from livestock.models import LivestockImage
+
+
+class Command(BaseCommand):
+    help = "Create thumbnail/card/large derivatives for photos that do not have them yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Regenerate variants for every photo.")
+
+    def handle(self, *args, **options):
+        photos = LivestockImage.objects.order_by('pk')
+        if not options['all']:
+            photos = photos.filter(variants={})
+
+        done = 0
+        for photo in photos.iterator():
+            if generate_variants(photo):
+                done += 1
+        self.stdout.write(self.style.SUCCESS(f"Generated variants for {done} photos."))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from livestock.retention import convert_to_partitioned, ensure_partitions, using_partitions
+
+
+class Command(BaseCommand):
+    help = "PostgreSQL: partition IoTDeviceData by month and keep future partitions created (run monthly)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--convert', action='store_true',
+            help="Switch the existing table to a partitioned one (one-off; copies every row).",
+        )
+        parser.add_argument('--months-ahead', type=int, default=2, help="Future months to create (default: 2).")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("Table partitioning is only supported on PostgreSQL.")
+
+        if options['convert']:
+            if convert_to_partitioned(months_ahead=options['months_ahead']):
+                self.stdout.write(self.style.SUCCESS(
+                    "IoTDeviceData is now partitioned by month. "
+                    "The old table was kept as livestock_iotdevicedata_unpartitioned."
+                ))
+            else:
+                self.stdout.write("IoTDeviceData is already partitioned.")
+        elif not using_partitions():
+            raise CommandError("IoTDeviceData is not partitioned yet; run with --convert first.")
+
+        ensure_partitions(months_ahead=options['months_ahead'])
+        self.stdout.write(self.style.SUCCESS(f"Partitions exist through {options['months_ahead']} months ahead."))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import Farmer
+from livestock.stats import refresh_farmer_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute every farmer's dashboard counters to repair any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        farmer_ids = list(Farmer.objects.values_list('pk', flat=True))
+        size = options['chunk_size']
+        for start in range(0, len(farmer_ids), size):
+            refresh_farmer_stats(farmer_ids[start:start + size])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {len(farmer_ids)} farmers."))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from livestock.models import LivestockItem
+from livestock.search import clear_search_index, index_listings
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for every listing (e.g. after bulk .update() calls)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        items = LivestockItem.objects.select_related('species', 'breed', 'farmer').order_by('livestock_id')
+        clear_search_index()
+        chunk, total = [], 0
+        for item in items.iterator(chunk_size=options['chunk_size']):
+            chunk.append(item)
+            if len(chunk) >= options['chunk_size']:
+                index_listings(chunk)
+                total += len(chunk)
+                chunk = []
+        index_listings(chunk)
+        total += len(chunk)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} listings."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from livestock.rollups import refresh_rollups
+
+
+class Command(BaseCommand):
+    help = "Fold new IoTDeviceData readings into the minute/hour/day rollup tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=50000,
+            help="Raw readings processed per transaction (default: 50000).",
+        )
+
+    def handle(self, *args, **options):
+        processed = refresh_rollups(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {processed} new readings."))
@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from livestock.alerts import AlertEngine
+from livestock.models import IoTDeviceData, TelemetryCheckpoint
+from livestock.telemetry import settled_cutoff
+
+
+CHECKPOINT_NAME = 'alert_engine'
+
+
+class Command(BaseCommand):
+    help = "Tail new IoTDeviceData rows and raise Alerts from the telemetry rules."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help="Readings evaluated per batch.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to wait when there is nothing new.")
+        parser.add_argument('--once', action='store_true', help="Drain the backlog once and exit.")
+
+    def handle(self, *args, **options):
+        engine = AlertEngine()
+        batch_size = options['batch_size']
+
+        while True:
+            with transaction.atomic():
+                checkpoint, _ = TelemetryCheckpoint.objects.select_for_update().get_or_create(name=CHECKPOINT_NAME)
+                low = checkpoint.last_data_id
+                # Only move the checkpoint up to a settled reading: a lower id may still commit
+                ids = list(
+                    IoTDeviceData.objects.filter(data_id__gt=low, received_at__lte=settled_cutoff())
+                    .order_by('data_id')
+                    .values_list('data_id', flat=True)[:batch_size]
+                )
+                if ids:
+                    readings = list(
+                        IoTDeviceData.objects.filter(data_id__gt=low, data_id__lte=ids[-1]).order_by('data_id')
+                    )
+                    alerts = engine.process(readings)
+                    checkpoint.last_data_id = ids[-1]
+                    checkpoint.save(update_fields=['last_data_id', 'updated_at'])
+                    if alerts:
+                        self.stdout.write(f"Raised {len(alerts)} alerts from {len(readings)} readings.")
+
+            if len(ids) < batch_size:
+                quiet = engine.sweep()
+                if quiet:
+                    self.stdout.write(f"Raised {len(quiet)} No Signal alerts.")
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
@@ -0,0 +1,39 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django import db
+from django.core.management.base import BaseCommand
+
+from livestock.jobs import claim_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = "Process queued background jobs (image derivatives etc.) with a pool of worker processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                            help="Worker processes (default: one per CPU core).")
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help="Seconds to wait when the queue is empty.")
+        parser.add_argument('--once', action='store_true', help="Drain the queue once and exit.")
+
+    def handle(self, *args, **options):
+        processes = max(1, options['processes'])
+
+        # Children must open their own database connections, never share ours
+        db.connections.close_all()
+        with ProcessPoolExecutor(max_workers=processes, initializer=db.connections.close_all) as pool:
+            while True:
+                job_ids = claim_jobs(limit=processes * 4)
+                if job_ids:
+                    statuses = list(pool.map(run_job, job_ids))
+                    self.stdout.write(
+                        f"Ran {len(job_ids)} jobs: {statuses.count('done')} done, "
+                        f"{statuses.count('queued')} retrying, {statuses.count('failed')} failed."
+                    )
+                    continue
+
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
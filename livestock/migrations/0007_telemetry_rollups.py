@@ -0,0 +1,101 @@
+# Generated by Django 6.0 on 2026-10-17 17:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('livestock', '0006_order_contact_phone_order_delivery_address'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TelemetryCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=120, unique=True)),
+                ('last_data_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TelemetryDayRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('reading_count', models.PositiveIntegerField(default=0)),
+                ('temperature_min', models.FloatField(blank=True, null=True)),
+                ('temperature_max', models.FloatField(blank=True, null=True)),
+                ('temperature_avg', models.FloatField(blank=True, null=True)),
+                ('activity_level_min', models.FloatField(blank=True, null=True)),
+                ('activity_level_max', models.FloatField(blank=True, null=True)),
+                ('activity_level_avg', models.FloatField(blank=True, null=True)),
+                ('battery_level_min', models.FloatField(blank=True, null=True)),
+                ('battery_level_max', models.FloatField(blank=True, null=True)),
+                ('battery_level_avg', models.FloatField(blank=True, null=True)),
+                ('last_latitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('last_longitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('last_timestamp', models.DateTimeField(blank=True, null=True)),
+                ('livestock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='livestock.livestockitem')),
+            ],
+            options={
+                'ordering': ['bucket_start'],
+                'abstract': False,
+                'unique_together': {('livestock', 'bucket_start')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TelemetryHourRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('reading_count', models.PositiveIntegerField(default=0)),
+                ('temperature_min', models.FloatField(blank=True, null=True)),
+                ('temperature_max', models.FloatField(blank=True, null=True)),
+                ('temperature_avg', models.FloatField(blank=True, null=True)),
+                ('activity_level_min', models.FloatField(blank=True, null=True)),
+                ('activity_level_max', models.FloatField(blank=True, null=True)),
+                ('activity_level_avg', models.FloatField(blank=True, null=True)),
+                ('battery_level_min', models.FloatField(blank=True, null=True)),
+                ('battery_level_max', models.FloatField(blank=True, null=True)),
+                ('battery_level_avg', models.FloatField(blank=True, null=True)),
+                ('last_latitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('last_longitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('last_timestamp', models.DateTimeField(blank=True, null=True)),
+                ('livestock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='livestock.livestockitem')),
+            ],
+            options={
+                'ordering': ['bucket_start'],
+                'abstract': False,
+                'unique_together': {('livestock', 'bucket_start')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TelemetryMinuteRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('reading_count', models.PositiveIntegerField(default=0)),
+                ('temperature_min', models.FloatField(blank=True, null=True)),
+                ('temperature_max', models.FloatField(blank=True, null=True)),
+                ('temperature_avg', models.FloatField(blank=True, null=True)),
+                ('activity_level_min', models.FloatField(blank=True, null=True)),
+                ('activity_level_max', models.FloatField(blank=True, null=True)),
+                ('activity_level_avg', models.FloatField(blank=True, null=True)),
+                ('battery_level_min', models.FloatField(blank=True, null=True)),
+                ('battery_level_max', models.FloatField(blank=True, null=True)),
+                ('battery_level_avg', models.FloatField(blank=True, null=True)),
+                ('last_latitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('last_longitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('last_timestamp', models.DateTimeField(blank=True, null=True)),
+                ('livestock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='livestock.livestockitem')),
+            ],
+            options={
+                'ordering': ['bucket_start'],
+                'abstract': False,
+                'unique_together': {('livestock', 'bucket_start')},
+            },
+        ),
+    ]
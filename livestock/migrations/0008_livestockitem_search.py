@@ -0,0 +1,62 @@
+# Generated by Django 6.0 on 2026-10-17 17:13
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    LivestockItem = apps.get_model('livestock', 'LivestockItem')
+    items = LivestockItem.objects.select_related('species', 'breed', 'farmer')
+
+    def document(item):
+        parts = [
+            item.tag_id,
+            item.species.species_name,
+            item.breed.breed_name if item.breed_id else None,
+            item.farmer.farm_name,
+            item.description,
+        ]
+        return ' '.join(part for part in parts if part)
+
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX livestock_search_vector_gin ON livestock_livestockitem USING gin ("search_vector")'
+        )
+        for item in items.iterator():
+            schema_editor.execute(
+                "UPDATE livestock_livestockitem SET search_vector = to_tsvector('simple', %s) WHERE livestock_id = %s",
+                [document(item), item.pk],
+            )
+    elif schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS livestock_search "
+            "USING fts5(document, tokenize='unicode61 remove_diacritics 2')"
+        )
+        for item in items.iterator():
+            schema_editor.execute(
+                'INSERT OR REPLACE INTO livestock_search (rowid, document) VALUES (%s, %s)',
+                [item.pk, document(item)],
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS livestock_search_vector_gin')
+    elif schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS livestock_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('livestock', '0007_telemetry_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='livestockitem',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 6.0 on 2026-10-17 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_contactmessage'),
+        ('livestock', '0008_livestockitem_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(fields=['farmer', 'is_resolved'], name='alert_farmer_resolved_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(condition=models.Q(('is_resolved', False)), fields=['livestock', 'alert_type'], name='alert_open_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='iotdevicedata',
+            index=models.Index(fields=['livestock', 'timestamp'], name='iot_livestock_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='livestockitem',
+            index=models.Index(condition=models.Q(('is_for_sale', True), ('status', 'available')), fields=['-listing_date', '-livestock_id'], name='livestock_avail_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='livestockitem',
+            index=models.Index(condition=models.Q(('is_for_sale', True), ('status', 'available')), fields=['species', '-listing_date', '-livestock_id'], name='livestock_avail_species_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='livestockitem',
+            index=models.Index(condition=models.Q(('is_for_sale', True), ('status', 'available')), fields=['price'], name='livestock_avail_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='livestockitem',
+            index=models.Index(fields=['farmer', 'status'], name='livestock_farmer_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['buyer', 'order_status'], name='order_buyer_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['order_status', '-order_date'], name='order_status_date_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-17 17:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_contactmessage'),
+        ('livestock', '0009_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FarmerStats',
+            fields=[
+                ('farmer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='accounts.farmer')),
+                ('total_count', models.PositiveIntegerField(default=0)),
+                ('available_count', models.PositiveIntegerField(default=0)),
+                ('reserved_count', models.PositiveIntegerField(default=0)),
+                ('sold_count', models.PositiveIntegerField(default=0)),
+                ('new_inquiries_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
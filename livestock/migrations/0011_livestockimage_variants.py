@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 17:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('livestock', '0010_farmerstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='livestockimage',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
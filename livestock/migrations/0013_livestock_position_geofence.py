@@ -0,0 +1,93 @@
+# Generated by Django 6.0 on 2026-10-17 17:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def encode_geohash(latitude, longitude, precision=9):
+    # Frozen copy of livestock.geo.encode_geohash: a migration must keep
+    # producing the same hashes whatever later happens to the app code.
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    latitude, longitude = float(latitude), float(longitude)
+    chars = []
+    bits, value, even = 0, 0, True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        if coordinate >= middle:
+            value = (value << 1) | 1
+            interval[0] = middle
+        else:
+            value <<= 1
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def backfill_positions(apps, schema_editor):
+    LivestockItem = apps.get_model('livestock', 'LivestockItem')
+    IoTDeviceData = apps.get_model('livestock', 'IoTDeviceData')
+    LivestockPosition = apps.get_model('livestock', 'LivestockPosition')
+
+    positions = []
+    for livestock_id, farmer_id in LivestockItem.objects.values_list('livestock_id', 'farmer_id').iterator():
+        # Newest fix per animal: a short walk down iot_livestock_time_idx
+        reading = (
+            IoTDeviceData.objects.filter(livestock_id=livestock_id, latitude__isnull=False, longitude__isnull=False)
+            .order_by('-timestamp').first()
+        )
+        if reading is not None:
+            positions.append(LivestockPosition(
+                livestock_id=livestock_id, farmer_id=farmer_id, data_id=reading.data_id,
+                timestamp=reading.timestamp, latitude=reading.latitude, longitude=reading.longitude,
+                geohash=encode_geohash(reading.latitude, reading.longitude),
+            ))
+    LivestockPosition.objects.bulk_create(positions, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_contactmessage'),
+        ('livestock', '0012_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Geofence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=120)),
+                ('polygon', models.JSONField()),
+                ('is_active', models.BooleanField(default=True)),
+                ('min_latitude', models.FloatField(editable=False)),
+                ('max_latitude', models.FloatField(editable=False)),
+                ('min_longitude', models.FloatField(editable=False)),
+                ('max_longitude', models.FloatField(editable=False)),
+                ('farmer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='geofences', to='accounts.farmer')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LivestockPosition',
+            fields=[
+                ('livestock', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='position', serialize=False, to='livestock.livestockitem')),
+                ('data_id', models.BigIntegerField(blank=True, null=True)),
+                ('timestamp', models.DateTimeField()),
+                ('latitude', models.DecimalField(decimal_places=6, max_digits=9)),
+                ('longitude', models.DecimalField(decimal_places=6, max_digits=9)),
+                ('geohash', models.CharField(max_length=12)),
+                ('farmer', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='positions', to='accounts.farmer')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['farmer', 'geohash'], name='position_farmer_geohash_idx'), models.Index(fields=['geohash'], name='position_geohash_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_positions, migrations.RunPython.noop),
+    ]
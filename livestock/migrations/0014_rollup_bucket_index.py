@@ -0,0 +1,25 @@
+# Generated by Django 6.0 on 2026-10-17 17:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('livestock', '0013_livestock_position_geofence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='telemetrydayrollup',
+            index=models.Index(fields=['bucket_start'], name='telemetrydayrollup_bkt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='telemetryhourrollup',
+            index=models.Index(fields=['bucket_start'], name='telemetryhourrollup_bkt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='telemetryminuterollup',
+            index=models.Index(fields=['bucket_start'], name='telemetryminuterollup_bkt_idx'),
+        ),
+    ]
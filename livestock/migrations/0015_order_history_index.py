@@ -0,0 +1,22 @@
+# Generated by Django 6.0 on 2026-10-17 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_contactmessage'),
+        ('livestock', '0014_rollup_bucket_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['buyer', 'order_status', '-order_date'], name='order_buyer_status_date_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='order',
+            name='order_buyer_status_idx',
+        ),
+    ]
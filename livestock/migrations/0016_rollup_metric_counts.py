@@ -0,0 +1,69 @@
+# Generated by Django 6.0 on 2026-10-17 18:14
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_metric_counts(apps, schema_editor):
+    # Existing buckets were built from readings that (almost always) carry
+    # every metric, so the bucket's reading count is the best available count
+    for name in ('TelemetryMinuteRollup', 'TelemetryHourRollup', 'TelemetryDayRollup'):
+        model = apps.get_model('livestock', name)
+        for metric in ('temperature', 'activity_level', 'battery_level'):
+            model.objects.filter(**{f'{metric}_avg__isnull': False}).update(**{f'{metric}_count': F('reading_count')})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('livestock', '0015_order_history_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='telemetrydayrollup',
+            name='activity_level_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='telemetrydayrollup',
+            name='battery_level_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='telemetrydayrollup',
+            name='temperature_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='telemetryhourrollup',
+            name='activity_level_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='telemetryhourrollup',
+            name='battery_level_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='telemetryhourrollup',
+            name='temperature_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='telemetryminuterollup',
+            name='activity_level_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='telemetryminuterollup',
+            name='battery_level_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='telemetryminuterollup',
+            name='temperature_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_metric_counts, migrations.RunPython.noop),
+    ]
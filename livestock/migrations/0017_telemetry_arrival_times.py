@@ -0,0 +1,24 @@
+# Generated by Django 6.0 on 2026-10-17 18:59
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('livestock', '0016_rollup_metric_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alert',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddField(
+            model_name='iotdevicedata',
+            name='received_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
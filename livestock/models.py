@@ -1,5 +1,7 @@
 from django.db import models
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.contrib.postgres.search import SearchVectorField
 from django.utils import timezone
 
 # 4. LivestockSpecies (Reference/Lookup Table)
@@ -46,6 +48,35 @@ class LivestockItem(models.Model):
     quantity = models.PositiveIntegerField(default=1)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='available')
 
+    # Full-text search document (PostgreSQL; SQLite uses the livestock_search FTS5 table)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Marketplace grid: partial indexes cover only what buyers can see
+            models.Index(
+                fields=['-listing_date', '-livestock_id'], name='livestock_avail_recent_idx',
+                condition=models.Q(status='available', is_for_sale=True),
+            ),
+            models.Index(
+                fields=['species', '-listing_date', '-livestock_id'], name='livestock_avail_species_idx',
+                condition=models.Q(status='available', is_for_sale=True),
+            ),
+            models.Index(
+                fields=['price'], name='livestock_avail_price_idx',
+                condition=models.Q(status='available', is_for_sale=True),
+            ),
+            # Farmer dashboard counters
+            models.Index(fields=['farmer', 'status'], name='livestock_farmer_status_idx'),
+        ]
+
+    @property
+    def primary_image(self):
+        # Uses the 'primary_images' prefetch when present (see livestock.queries)
+        if hasattr(self, 'primary_images'):
+            return self.primary_images[0] if self.primary_images else None
+        return self.images.first()
+
     def __str__(self):
         # show a friendly label
         label = self.tag_id or f"ID-{self.livestock_id}"
@@ -79,11 +110,136 @@ class IoTDeviceData(models.Model):
     activity_level = models.FloatField(blank=True, null=True)
     battery_level = models.FloatField(blank=True, null=True)
     device_type = models.CharField(max_length=120, blank=True, null=True)
+    # When the row was written (timestamp is the collar's clock); see livestock.telemetry.settled_cutoff
+    received_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['livestock', 'timestamp'], name='iot_livestock_time_idx'),
+        ]
 
     def __str__(self):
         return f"IoT {self.data_id} for {self.livestock}"
 
 
+# 8a. Telemetry Rollups (time-bucketed summaries of IoTDeviceData)
+class TelemetryRollup(models.Model):
+    livestock = models.ForeignKey(LivestockItem, on_delete=models.CASCADE)
+    bucket_start = models.DateTimeField()
+    reading_count = models.PositiveIntegerField(default=0)
+
+    temperature_min = models.FloatField(blank=True, null=True)
+    temperature_max = models.FloatField(blank=True, null=True)
+    temperature_avg = models.FloatField(blank=True, null=True)
+    activity_level_min = models.FloatField(blank=True, null=True)
+    activity_level_max = models.FloatField(blank=True, null=True)
+    activity_level_avg = models.FloatField(blank=True, null=True)
+    battery_level_min = models.FloatField(blank=True, null=True)
+    battery_level_max = models.FloatField(blank=True, null=True)
+    battery_level_avg = models.FloatField(blank=True, null=True)
+    # Readings with a value for each metric, so a later batch can be averaged in
+    temperature_count = models.PositiveIntegerField(default=0)
+    activity_level_count = models.PositiveIntegerField(default=0)
+    battery_level_count = models.PositiveIntegerField(default=0)
+
+    # Last known position inside the bucket
+    last_latitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
+    last_longitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
+    last_timestamp = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        abstract = True
+        ordering = ['bucket_start']
+        # Retention prunes old buckets by time across all animals
+        indexes = [models.Index(fields=['bucket_start'], name='%(class)s_bkt_idx')]
+
+    def __str__(self):
+        return f"{self.__class__.__name__} {self.bucket_start:%Y-%m-%d %H:%M} for {self.livestock_id}"
+
+
+class TelemetryMinuteRollup(TelemetryRollup):
+    class Meta(TelemetryRollup.Meta):
+        unique_together = ('livestock', 'bucket_start')
+
+
+class TelemetryHourRollup(TelemetryRollup):
+    class Meta(TelemetryRollup.Meta):
+        unique_together = ('livestock', 'bucket_start')
+
+
+class TelemetryDayRollup(TelemetryRollup):
+    class Meta(TelemetryRollup.Meta):
+        unique_together = ('livestock', 'bucket_start')
+
+
+# 8b. High-water marks for jobs that tail IoTDeviceData by data_id
+class TelemetryCheckpoint(models.Model):
+    name = models.CharField(max_length=120, unique=True)
+    last_data_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_data_id}"
+
+
+# 8c. Latest collar position per animal (kept current on ingest; see livestock/geo.py)
+class LivestockPosition(models.Model):
+    livestock = models.OneToOneField(LivestockItem, on_delete=models.CASCADE, primary_key=True, related_name='position')
+    # Copied from the animal so a herd map is one (farmer, geohash) index scan
+    farmer = models.ForeignKey('accounts.Farmer', on_delete=models.CASCADE, related_name='positions', db_index=False)
+    data_id = models.BigIntegerField(blank=True, null=True)  # IoTDeviceData row the fix came from
+    timestamp = models.DateTimeField()
+    latitude = models.DecimalField(max_digits=9, decimal_places=6)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6)
+    geohash = models.CharField(max_length=12)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['farmer', 'geohash'], name='position_farmer_geohash_idx'),
+            models.Index(fields=['geohash'], name='position_geohash_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.livestock_id} @ {self.latitude},{self.longitude}"
+
+
+# 8d. Farm geofences (polygon in [[lat, lon], ...] order)
+class Geofence(models.Model):
+    farmer = models.ForeignKey('accounts.Farmer', on_delete=models.CASCADE, related_name='geofences')
+    name = models.CharField(max_length=120)
+    polygon = models.JSONField()
+    is_active = models.BooleanField(default=True)
+
+    # Bounding box, precomputed on save so most checks never touch the polygon
+    min_latitude = models.FloatField(editable=False)
+    max_latitude = models.FloatField(editable=False)
+    min_longitude = models.FloatField(editable=False)
+    max_longitude = models.FloatField(editable=False)
+
+    def clean(self):
+        try:
+            points = [(float(lat), float(lon)) for lat, lon in self.polygon]
+        except (TypeError, ValueError):
+            raise ValidationError({'polygon': "Use a list of [latitude, longitude] pairs."})
+        if len(points) < 3:
+            raise ValidationError({'polygon': "A geofence needs at least three points."})
+
+    def save(self, *args, **kwargs):
+        self.polygon = [[float(lat), float(lon)] for lat, lon in self.polygon]
+        latitudes = [lat for lat, _ in self.polygon]
+        longitudes = [lon for _, lon in self.polygon]
+        self.min_latitude, self.max_latitude = min(latitudes), max(latitudes)
+        self.min_longitude, self.max_longitude = min(longitudes), max(longitudes)
+        super().save(*args, **kwargs)
+
+    @property
+    def bbox(self):
+        return (self.min_latitude, self.min_longitude, self.max_latitude, self.max_longitude)
+
+    def __str__(self):
+        return f"{self.name} ({self.farmer})"
+
+
 # 9. Alert
 class Alert(models.Model):
     alert_id = models.AutoField(primary_key=True)
@@ -95,6 +251,18 @@ class Alert(models.Model):
     severity = models.CharField(max_length=20, choices=SEVERITY_CHOICES, default='info')
     is_resolved = models.BooleanField(default=False)
     description = models.TextField(blank=True, null=True)
+    # When the alert was raised (timestamp is the reading's); see livestock.telemetry.settled_cutoff
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['farmer', 'is_resolved'], name='alert_farmer_resolved_idx'),
+            # Alert engine de-duplication only ever looks at open alerts
+            models.Index(
+                fields=['livestock', 'alert_type'], name='alert_open_type_idx',
+                condition=models.Q(is_resolved=False),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.alert_type} - {self.farmer.user.username}"
@@ -120,6 +288,13 @@ class Order(models.Model):
     delivery_address = models.TextField(blank=True, null=True, help_text="Where should this be delivered?")
     contact_phone = models.CharField(max_length=15, blank=True, null=True, help_text="Phone number for delivery coordination")
 
+    class Meta:
+        indexes = [
+            # Cart lookup (buyer, 'pending') and the order history status tabs, newest first
+            models.Index(fields=['buyer', 'order_status', '-order_date'], name='order_buyer_status_date_idx'),
+            models.Index(fields=['order_status', '-order_date'], name='order_status_date_idx'),
+        ]
+
     def __str__(self):
         return f"Order {self.order_id} by {self.buyer.user.username}"
 
@@ -141,6 +316,15 @@ class LivestockImage(models.Model):
     livestock = models.ForeignKey(LivestockItem, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='livestock_images/')
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # Resized copies stored next to the original: {'card': {'webp': path, 'jpeg': path}, ...}
+    variants = models.JSONField(default=dict, blank=True)
+
+    def variant_url(self, size, fmt='webp'):
+        # Falls back to the original until the derivatives have been generated
+        path = self.variants.get(size, {}).get(fmt)
+        if path:
+            return self.image.storage.url(path)
+        return self.image.url
 
     def __str__(self):
         return f"Image for {self.livestock.tag_id}"
@@ -154,3 +338,41 @@ class Wishlist(models.Model):
 
     def __str__(self):
         return f"Wishlist for {self.user.user.username}"
+
+
+# FARMER DASHBOARD COUNTERS (denormalised; see livestock.stats)
+class FarmerStats(models.Model):
+    farmer = models.OneToOneField('accounts.Farmer', on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    total_count = models.PositiveIntegerField(default=0)  # everything not yet sold
+    available_count = models.PositiveIntegerField(default=0)
+    reserved_count = models.PositiveIntegerField(default=0)
+    sold_count = models.PositiveIntegerField(default=0)
+    new_inquiries_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats for {self.farmer}"
+
+
+# BACKGROUND JOBS (DB-backed queue, processed by `manage.py run_worker`)
+class Job(models.Model):
+    STATUS_CHOICES = (('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed'))
+
+    task = models.CharField(max_length=120)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
@@ -0,0 +1,184 @@
+# livestock/pagination.py
+# Keyset (cursor) pagination over (listing_date, livestock_id), newest first,
+# plus plain numbered pages for per-user history lists
+
+import base64
+import math
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(item):
+    raw = f"{item.listing_date.isoformat()}|{item.livestock_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        listing_date, livestock_id = raw.rsplit('|', 1)
+        listing_date = parse_datetime(listing_date)
+        livestock_id = int(livestock_id)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise InvalidCursor(cursor)
+    if listing_date is None:
+        raise InvalidCursor(cursor)
+    return listing_date, livestock_id
+
+
+class KeysetPage:
+    """One page of listings plus the cursors needed to move either way."""
+
+    def __init__(self, items, next_cursor=None, previous_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def keyset_paginate(queryset, page_size, after=None, before=None):
+    """
+    Returns a KeysetPage of ``queryset`` ordered by newest listing first.
+
+    ``after`` / ``before`` are cursors taken from a previous page. Each page
+    is a single indexed range scan of ``page_size + 1`` rows, so cost stays
+    the same however deep the buyer scrolls.
+    """
+    if before:
+        listing_date, livestock_id = decode_cursor(before)
+        rows = list(
+            queryset.filter(
+                Q(listing_date__gt=listing_date) |
+                Q(listing_date=listing_date, livestock_id__gt=livestock_id)
+            ).order_by('listing_date', 'livestock_id')[:page_size + 1]
+        )
+        has_more = len(rows) > page_size
+        items = rows[:page_size][::-1]
+        return KeysetPage(
+            items,
+            next_cursor=encode_cursor(items[-1]) if items else None,
+            previous_cursor=encode_cursor(items[0]) if items and has_more else None,
+        )
+
+    queryset = queryset.order_by('-listing_date', '-livestock_id')
+    if after:
+        listing_date, livestock_id = decode_cursor(after)
+        queryset = queryset.filter(
+            Q(listing_date__lt=listing_date) |
+            Q(listing_date=listing_date, livestock_id__lt=livestock_id)
+        )
+    rows = list(queryset[:page_size + 1])
+    has_more = len(rows) > page_size
+    items = rows[:page_size]
+    return KeysetPage(
+        items,
+        next_cursor=encode_cursor(items[-1]) if has_more else None,
+        previous_cursor=encode_cursor(items[0]) if items and after else None,
+    )
+
+
+# NUMBERED PAGES (order history, sales inquiries)
+class NumberedPage:
+    """One page of rows plus links to its neighbours (query string kept)."""
+
+    def __init__(self, items, number, count, next_url=None, previous_url=None):
+        self.items = items
+        self.number = number
+        self.count = count
+        self.next_url = next_url
+        self.previous_url = previous_url
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def numbered_page(request, queryset, total, page_size):
+    """
+    Page ``?page=N`` of ``queryset``. The caller passes the row count (the
+    status tabs already have it), so no COUNT query is run; out-of-range
+    page numbers are clamped.
+    """
+    count = max(1, math.ceil(total / page_size))
+    try:
+        number = min(max(1, int(request.GET.get('page', 1))), count)
+    except (TypeError, ValueError):
+        number = 1
+    items = list(queryset[(number - 1) * page_size:number * page_size])
+
+    params = request.GET.copy()
+    urls = {}
+    for name, target in (('previous_url', number - 1), ('next_url', number + 1)):
+        if 1 <= target <= count:
+            params['page'] = target
+            urls[name] = '?' + params.urlencode()
+    return NumberedPage(items, number, count, **urls)
+
+
+# DRF pagination class for LivestockViewSet.list
+class LivestockKeysetPagination(BasePagination):
+    page_size = getattr(settings, 'LIVESTOCK_API_PAGE_SIZE', 20)
+    max_page_size = 100
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get('page_size', self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        try:
+            self.page = keyset_paginate(
+                queryset,
+                self.get_page_size(request),
+                after=request.query_params.get('after'),
+                before=request.query_params.get('before'),
+            )
+        except InvalidCursor:
+            raise NotFound("Invalid cursor.")
+        return list(self.page)
+
+    def _link(self, param, cursor):
+        if not cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, 'after')
+        url = remove_query_param(url, 'before')
+        return replace_query_param(url, param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self._link('after', self.page.next_cursor)),
+            ('previous', self._link('before', self.page.previous_cursor)),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,28 @@
+import codecs
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+# Newline-delimited JSON (one reading per line) for streaming collar gateways
+class NDJSONParser(BaseParser):
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        reader = codecs.getreader(encoding)(stream)
+        return self._iter_lines(reader)
+
+    # Lines are decoded lazily so large bodies are never held in memory at once
+    def _iter_lines(self, reader):
+        for line_number, line in enumerate(reader, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                raise ParseError(f"NDJSON parse error on line {line_number}: {e}")
@@ -0,0 +1,90 @@
+# livestock/queries.py
+# Reusable querysets for pages that render many listings at once
+
+from django.db.models import Count, Prefetch
+
+from .models import LivestockItem, LivestockImage, Order, OrderItem
+
+
+# Status tabs on the order history and sales inquiry pages (the pending cart is not history)
+HISTORY_STATUSES = ('inquiry_sent', 'approved', 'confirmed', 'cancelled')
+
+
+def with_primary_image(queryset):
+    """Prefetches only the first photo of each item into ``primary_images``."""
+    return queryset.prefetch_related(
+        Prefetch(
+            'images',
+            queryset=LivestockImage.objects.order_by('id')[:1],
+            to_attr='primary_images',
+        )
+    )
+
+
+# API LIST/DETAIL: nested species/breed/farmer/images for LivestockItemSerializer
+def api_listings(queryset=None):
+    queryset = LivestockItem.objects.all() if queryset is None else queryset
+    return queryset.select_related('species', 'breed', 'farmer').prefetch_related(
+        Prefetch('images', queryset=LivestockImage.objects.order_by('id'))
+    )
+
+
+# MARKETPLACE GRID: everything a listing card touches, in a fixed number of queries
+def marketplace_listings():
+    listings = LivestockItem.objects.filter(status='available', is_for_sale=True)
+    listings = listings.select_related('species', 'breed', 'farmer')
+    return with_primary_image(listings)
+
+
+# ORDER LINES: cart, order history and inquiry rows (animal, names, first photo)
+def order_lines(queryset=None):
+    queryset = OrderItem.objects.all() if queryset is None else queryset
+    return queryset.select_related('livestock__species', 'livestock__breed').prefetch_related(
+        Prefetch(
+            'livestock__images',
+            queryset=LivestockImage.objects.order_by('id')[:1],
+            to_attr='primary_images',
+        )
+    )
+
+
+def _statuses(status):
+    return [status] if status in HISTORY_STATUSES else list(HISTORY_STATUSES)
+
+
+# BUYER ORDER HISTORY: newest first on the (buyer, order_status, order_date) index
+def buyer_orders(buyer_id, status=None):
+    lines = order_lines().order_by('order_item_id')
+    return (
+        Order.objects.filter(buyer_id=buyer_id, order_status__in=_statuses(status))
+        .order_by('-order_date', '-order_id')
+        .prefetch_related(Prefetch('order_items', queryset=lines))
+    )
+
+
+def buyer_status_counts(buyer_id):
+    rows = (
+        Order.objects.filter(buyer_id=buyer_id, order_status__in=HISTORY_STATUSES)
+        .values_list('order_status').annotate(count=Count('order_id')).order_by()
+    )
+    return _with_total(dict(rows))
+
+
+# FARMER SALES INQUIRIES: one row per order line on the farmer's animals
+def farmer_inquiries(farmer_id, status=None):
+    lines = OrderItem.objects.filter(livestock__farmer_id=farmer_id, order__order_status__in=_statuses(status))
+    return order_lines(lines).select_related('order__buyer__user').order_by('-order__order_date', '-order_item_id')
+
+
+def farmer_status_counts(farmer_id):
+    rows = (
+        OrderItem.objects.filter(livestock__farmer_id=farmer_id, order__order_status__in=HISTORY_STATUSES)
+        .values_list('order__order_status').annotate(count=Count('order_item_id')).order_by()
+    )
+    return _with_total(dict(rows))
+
+
+def _with_total(counts):
+    counts = {status: counts.get(status, 0) for status in HISTORY_STATUSES}
+    counts['all'] = sum(counts.values())
+    return counts
@@ -0,0 +1,296 @@
+# livestock/retention.py
+# Retention policy for telemetry: raw readings older than the policy are
+# folded into the rollups, written to gzipped CSV files partitioned by day,
+# then deleted in bounded batches. Rollups are kept for longer, coarser
+# resolutions longest; a late reading for a purged bucket is merged into the
+# bucket's rollup, not recomputed from the raw rows left. On PostgreSQL, IoTDeviceData can also be a table
+# partitioned by month, so whole expired months are dropped in one statement.
+
+import csv
+import gzip
+import os
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .exports import COLUMNS
+from .models import IoTDeviceData, TelemetryCheckpoint
+from .rollups import CHECKPOINT_NAME as ROLLUP_CHECKPOINT, RESOLUTIONS, refresh_rollups
+
+
+DEFAULT_POLICY = {
+    'raw_days': 90,              # raw readings older than this are archived and deleted
+    'minute_rollup_days': 30,    # None keeps a resolution forever
+    'hour_rollup_days': 400,
+    'day_rollup_days': None,
+    'batch_size': 10000,         # rows deleted per transaction
+    'archive': True,             # write deleted readings to TELEMETRY_ARCHIVE_DIR first
+}
+
+RETENTION_CHECKPOINT = 'telemetry_retention'
+
+
+def get_retention_policy(**overrides):
+    policy = dict(DEFAULT_POLICY)
+    policy.update(getattr(settings, 'TELEMETRY_RETENTION', {}))
+    policy.update({key: value for key, value in overrides.items() if value is not None})
+    return policy
+
+
+def archive_dir():
+    return str(getattr(settings, 'TELEMETRY_ARCHIVE_DIR', os.path.join(settings.BASE_DIR, 'telemetry_archive')))
+
+
+# 1. ARCHIVE FILES (archive/YYYY/MM/DD/telemetry-<first id>-<last id>.csv.gz)
+def write_archive(rows):
+    """
+    Writes readings (tuples in COLUMNS order) to one gzipped CSV per local
+    day. File names carry the data_id range, so re-running a batch after a
+    crash rewrites the same files instead of duplicating them.
+    """
+    by_day = {}
+    for row in rows:
+        by_day.setdefault(timezone.localtime(row[2]).date(), []).append(row)
+
+    paths = []
+    for day, day_rows in sorted(by_day.items()):
+        folder = os.path.join(archive_dir(), f"{day:%Y}", f"{day:%m}", f"{day:%d}")
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"telemetry-{day_rows[0][0]}-{day_rows[-1][0]}.csv.gz")
+        partial = path + '.part'
+        with gzip.open(partial, 'wt', newline='') as archive:
+            writer = csv.writer(archive)
+            writer.writerow(COLUMNS)
+            writer.writerows(
+                (data_id, livestock_id, timestamp.isoformat(), *rest)
+                for data_id, livestock_id, timestamp, *rest in day_rows
+            )
+        os.replace(partial, path)  # never leave a half-written archive under the real name
+        paths.append(path)
+    return paths
+
+
+# 2. RAW READINGS
+def rolled_up_through():
+    checkpoint = TelemetryCheckpoint.objects.filter(name=ROLLUP_CHECKPOINT).first()
+    return checkpoint.last_data_id if checkpoint else 0
+
+
+def purge_raw_readings(cutoff, batch_size, archive=True):
+    """
+    Deletes readings older than ``cutoff`` that the rollups already include.
+
+    Walks the primary key from a stored frontier (every row below it has
+    been purged), so each batch is an index range scan and no timestamp
+    index is needed on the raw table. The walk stops at the first reading
+    that is still within retention; readings are stored in roughly time
+    order, so that is where expired data ends. Returns rows deleted.
+    """
+    safe_through = rolled_up_through()
+    deleted = 0
+
+    while True:
+        checkpoint, _ = TelemetryCheckpoint.objects.get_or_create(name=RETENTION_CHECKPOINT)
+        rows = list(
+            IoTDeviceData.objects.filter(data_id__gt=checkpoint.last_data_id, data_id__lte=safe_through)
+            .order_by('data_id')
+            .values_list(*COLUMNS)[:batch_size]
+        )
+        expired = []
+        for row in rows:
+            if row[2] >= cutoff:
+                break
+            expired.append(row)
+        if not expired:
+            return deleted
+
+        if archive:
+            write_archive(expired)
+        with transaction.atomic():
+            first, last = expired[0][0], expired[-1][0]
+            deleted += IoTDeviceData.objects.filter(data_id__gte=first, data_id__lte=last).delete()[0]
+            checkpoint.last_data_id = last
+            checkpoint.save(update_fields=['last_data_id', 'updated_at'])
+
+        if len(expired) < len(rows):
+            return deleted
+
+
+# 3. ROLLUPS
+def prune_rollups(policy, now, batch_size):
+    """Deletes rollup buckets past their resolution's retention. Returns {kind: rows deleted}."""
+    deleted = {}
+    for kind, (model, _) in RESOLUTIONS.items():
+        days = policy.get(f'{kind}_rollup_days')
+        if not days:
+            continue
+        cutoff = now - timedelta(days=days)
+        deleted[kind] = 0
+        while True:
+            ids = list(model.objects.filter(bucket_start__lt=cutoff).values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            deleted[kind] += model.objects.filter(pk__in=ids).delete()[0]
+    return deleted
+
+
+# 4. POSTGRESQL MONTHLY PARTITIONS
+TABLE = IoTDeviceData._meta.db_table
+
+
+def using_partitions():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE relname = %s", [TABLE])
+        row = cursor.fetchone()
+    return bool(row) and row[0] == 'p'
+
+
+def month_start(moment):
+    return datetime(moment.year, moment.month, 1, tzinfo=timezone.get_current_timezone())
+
+
+def add_months(moment, months):
+    month = moment.month - 1 + months
+    return moment.replace(year=moment.year + month // 12, month=month % 12 + 1)
+
+
+def partition_name(start):
+    return f"{TABLE}_y{start:%Y}m{start:%m}"
+
+
+def ensure_partitions(months_ahead=2, months_back=0):
+    """Creates the monthly partitions from ``months_back`` ago to ``months_ahead`` from now, plus a default."""
+    start = add_months(month_start(timezone.localtime()), -months_back)
+    with connection.cursor() as cursor:
+        for offset in range(months_back + months_ahead + 1):
+            lower = add_months(start, offset)
+            upper = add_months(lower, 1)
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS "{partition_name(lower)}" PARTITION OF "{TABLE}" '
+                f'FOR VALUES FROM (%s) TO (%s)',
+                [lower, upper],
+            )
+        cursor.execute(f'CREATE TABLE IF NOT EXISTS "{TABLE}_default" PARTITION OF "{TABLE}" DEFAULT')
+
+
+def convert_to_partitioned(months_ahead=2):
+    """
+    One-off switch of IoTDeviceData to a table partitioned by month on
+    ``timestamp``. PostgreSQL requires the partition key in the primary key,
+    so the new key is (data_id, timestamp); data_id stays unique through its
+    identity sequence. The old table is kept as <table>_unpartitioned until
+    it is dropped by hand.
+    """
+    if connection.vendor != 'postgresql':
+        raise RuntimeError("Table partitioning is only supported on PostgreSQL.")
+    if using_partitions():
+        return False
+
+    livestock_table = IoTDeviceData._meta.get_field('livestock').related_model._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'SELECT MIN("timestamp") FROM "{TABLE}"')
+        oldest = cursor.fetchone()[0] or timezone.now()
+
+        cursor.execute(
+            f'CREATE TABLE "{TABLE}_partitioned" (LIKE "{TABLE}" INCLUDING DEFAULTS INCLUDING IDENTITY) '
+            f'PARTITION BY RANGE ("timestamp")'
+        )
+        cursor.execute(f'ALTER TABLE "{TABLE}_partitioned" ADD PRIMARY KEY ("data_id", "timestamp")')
+        cursor.execute(
+            f'ALTER TABLE "{TABLE}_partitioned" ADD FOREIGN KEY ("livestock_id") '
+            f'REFERENCES "{livestock_table}" ("livestock_id") DEFERRABLE INITIALLY DEFERRED'
+        )
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{TABLE}_unpartitioned"')
+        cursor.execute(f'ALTER TABLE "{TABLE}_partitioned" RENAME TO "{TABLE}"')
+        # Same index name as the model declares, so later migrations still find it
+        cursor.execute('ALTER INDEX "iot_livestock_time_idx" RENAME TO "iot_livestock_time_idx_unpartitioned"')
+        cursor.execute(f'CREATE INDEX "iot_livestock_time_idx" ON "{TABLE}" ("livestock_id", "timestamp")')
+
+        now = month_start(timezone.localtime())
+        oldest = month_start(timezone.localtime(oldest))
+        months_back = (now.year - oldest.year) * 12 + now.month - oldest.month
+        ensure_partitions(months_ahead=months_ahead, months_back=months_back)
+
+        cursor.execute(f'INSERT INTO "{TABLE}" SELECT * FROM "{TABLE}_unpartitioned"')
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('\"{TABLE}\"', 'data_id'), "
+            f'COALESCE((SELECT MAX("data_id") FROM "{TABLE}"), 1))'
+        )
+    return True
+
+
+def list_partitions():
+    """[(name, lower bound, upper bound)] of the monthly partitions, oldest first."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid WHERE parent.relname = %s",
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = []
+    for name in names:
+        if not name.startswith(f"{TABLE}_y"):
+            continue  # the default partition has no range
+        lower = month_start(datetime.strptime(name[-7:], 'y%Ym%m'))
+        partitions.append((name, lower, add_months(lower, 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def drop_expired_partitions(cutoff, archive=True, batch_size=10000):
+    """
+    Archives and drops every monthly partition that ends before ``cutoff``
+    and is fully rolled up. Returns the names of the dropped partitions.
+    """
+    safe_through = rolled_up_through()
+    dropped = []
+    for name, lower, upper in list_partitions():
+        if upper > cutoff:
+            break
+        partition = IoTDeviceData.objects.filter(timestamp__gte=lower, timestamp__lt=upper)
+        newest_id = max(partition.values_list('data_id', flat=True).order_by('-data_id')[:1], default=0)
+        if newest_id > safe_through:
+            break  # rollups have not caught up with this month yet
+
+        if archive:
+            last_id = 0
+            while True:
+                rows = list(
+                    partition.filter(data_id__gt=last_id).order_by('data_id').values_list(*COLUMNS)[:batch_size]
+                )
+                if not rows:
+                    break
+                write_archive(rows)
+                last_id = rows[-1][0]
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{name}"')
+            cursor.execute(f'DROP TABLE "{name}"')
+        dropped.append(name)
+    return dropped
+
+
+# 5. ENTRY POINT (apply_telemetry_retention command)
+def apply_retention(now=None, **overrides):
+    """
+    Runs the whole policy: refresh rollups, drop expired partitions
+    (PostgreSQL, partitioned), purge remaining expired raw rows, then prune
+    old rollups. Returns a summary dict.
+    """
+    policy = get_retention_policy(**overrides)
+    now = now or timezone.now()
+    cutoff = now - timedelta(days=policy['raw_days'])
+
+    # Downsample first: nothing is deleted before it is in the rollups
+    summary = {'rolled_up': refresh_rollups(), 'dropped_partitions': []}
+    if using_partitions():
+        summary['dropped_partitions'] = drop_expired_partitions(cutoff, policy['archive'], policy['batch_size'])
+    summary['deleted_readings'] = purge_raw_readings(cutoff, policy['batch_size'], archive=policy['archive'])
+    summary['deleted_rollups'] = prune_rollups(policy, now, policy['batch_size'])
+    return summary
@@ -0,0 +1,159 @@
+# livestock/rollups.py
+# Incremental refresh of the minute/hour/day telemetry rollup tables
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Avg, Count, Max, Min
+from django.db.models.functions import Trunc
+
+from .models import (
+    IoTDeviceData, TelemetryCheckpoint,
+    TelemetryMinuteRollup, TelemetryHourRollup, TelemetryDayRollup,
+)
+from .telemetry import settled_cutoff
+
+
+CHECKPOINT_NAME = 'telemetry_rollups'
+METRICS = ('temperature', 'activity_level', 'battery_level')
+
+# kind -> (rollup model, bucket width)
+RESOLUTIONS = {
+    'minute': (TelemetryMinuteRollup, timedelta(minutes=1)),
+    'hour': (TelemetryHourRollup, timedelta(hours=1)),
+    'day': (TelemetryDayRollup, timedelta(days=1)),
+}
+
+UPDATE_FIELDS = ['reading_count', 'last_latitude', 'last_longitude', 'last_timestamp'] + [
+    f"{metric}_{fn}" for metric in METRICS for fn in ('min', 'max', 'avg', 'count')
+]
+
+
+# 1. SUMMARISE A BATCH OF READINGS PER (ANIMAL, BUCKET)
+def summarise(readings, kind):
+    """{(livestock_id, bucket_start): aggregates} for a queryset of raw readings."""
+    raw = readings.annotate(bucket=Trunc('timestamp', kind))
+
+    aggregates = {}
+    for metric in METRICS:
+        aggregates[f"{metric}_min"] = Min(metric)
+        aggregates[f"{metric}_max"] = Max(metric)
+        aggregates[f"{metric}_avg"] = Avg(metric)
+        aggregates[f"{metric}_count"] = Count(metric)
+
+    summaries = {}
+    buckets = raw.values('livestock_id', 'bucket').annotate(reading_count=Count('data_id'), **aggregates).order_by()
+    for bucket in buckets:
+        key = (bucket.pop('livestock_id'), bucket.pop('bucket'))
+        summaries[key] = dict(bucket, last_latitude=None, last_longitude=None, last_timestamp=None)
+
+    # Last known position per bucket: later readings win
+    located = (
+        raw.filter(latitude__isnull=False, longitude__isnull=False)
+        .order_by('timestamp', 'data_id')
+        .values_list('livestock_id', 'bucket', 'latitude', 'longitude', 'timestamp')
+    )
+    for livestock_id, bucket, lat, lon, ts in located.iterator():
+        summaries[(livestock_id, bucket)].update(last_latitude=lat, last_longitude=lon, last_timestamp=ts)
+    return summaries
+
+
+def merge(existing, new):
+    """Adds a batch summary to the aggregates already stored for its bucket."""
+    merged = {'reading_count': existing.reading_count + new['reading_count']}
+    for metric in METRICS:
+        old_n, new_n = getattr(existing, f"{metric}_count"), new[f"{metric}_count"]
+        old_min, old_max, old_avg = (getattr(existing, f"{metric}_{fn}") for fn in ('min', 'max', 'avg'))
+        merged[f"{metric}_count"] = old_n + new_n
+        if not new_n:
+            merged.update({f"{metric}_min": old_min, f"{metric}_max": old_max, f"{metric}_avg": old_avg})
+        elif not old_n:
+            merged.update({f"{metric}_{fn}": new[f"{metric}_{fn}"] for fn in ('min', 'max', 'avg')})
+        else:
+            merged[f"{metric}_min"] = min(old_min, new[f"{metric}_min"])
+            merged[f"{metric}_max"] = max(old_max, new[f"{metric}_max"])
+            merged[f"{metric}_avg"] = (old_avg * old_n + new[f"{metric}_avg"] * new_n) / (old_n + new_n)
+
+    # Last known position: whichever side saw the later fix
+    position = ('last_latitude', 'last_longitude', 'last_timestamp')
+    if new['last_timestamp'] is None or (
+        existing.last_timestamp is not None and existing.last_timestamp > new['last_timestamp']
+    ):
+        merged.update({field: getattr(existing, field) for field in position})
+    else:
+        merged.update({field: new[field] for field in position})
+    return merged
+
+
+# 2. FOLD A BATCH INTO THE BUCKETS IT TOUCHES
+def fold_batch(kind, readings):
+    """
+    Adds ``readings`` to the rollup buckets they fall in. Only those
+    (animal, bucket) rows are read and written, and the raw table is not
+    re-read, so a late reading costs one bucket and still counts after
+    retention has deleted the bucket's other raw rows.
+    """
+    model, _ = RESOLUTIONS[kind]
+    summaries = summarise(readings, kind)
+    if not summaries:
+        return 0
+
+    existing = {
+        (rollup.livestock_id, rollup.bucket_start): rollup
+        for rollup in model.objects.filter(
+            livestock_id__in={livestock_id for livestock_id, _ in summaries},
+            bucket_start__in={bucket for _, bucket in summaries},
+        )
+    }
+
+    rows = []
+    for key, summary in summaries.items():
+        if key in existing:
+            summary = merge(existing[key], summary)
+        rows.append(model(livestock_id=key[0], bucket_start=key[1], **summary))
+
+    model.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['livestock', 'bucket_start'],
+        update_fields=UPDATE_FIELDS,
+    )
+    return len(rows)
+
+
+# 3. INCREMENTAL REFRESH FROM THE data_id HIGH-WATER MARK
+def refresh_rollups(batch_size=50000):
+    """
+    Folds readings newer than the stored high-water mark into every rollup
+    table, one batch of about ``batch_size`` rows at a time. Each reading is
+    counted exactly once: the batch and the checkpoint move together, and
+    the checkpoint only moves up to a settled reading (see settled_cutoff),
+    so readings still being committed are picked up by a later run.
+
+    Returns the number of raw readings processed.
+    """
+    processed = 0
+    cutoff = settled_cutoff()
+
+    while True:
+        with transaction.atomic():
+            checkpoint, _ = TelemetryCheckpoint.objects.select_for_update().get_or_create(name=CHECKPOINT_NAME)
+            low = checkpoint.last_data_id
+
+            ids = list(
+                IoTDeviceData.objects.filter(data_id__gt=low, received_at__lte=cutoff)
+                .order_by('data_id')
+                .values_list('data_id', flat=True)[:batch_size]
+            )
+            if not ids:
+                return processed
+            high = ids[-1]
+
+            new = IoTDeviceData.objects.filter(data_id__gt=low, data_id__lte=high)
+            for kind in RESOLUTIONS:
+                fold_batch(kind, new)
+
+            checkpoint.last_data_id = high
+            checkpoint.save(update_fields=['last_data_id', 'updated_at'])
+
+        processed += new.count()
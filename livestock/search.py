@@ -0,0 +1,118 @@
+# livestock/search.py
+# Ranked full-text search over listings.
+# PostgreSQL: a GIN-indexed tsvector column (LivestockItem.search_vector).
+# SQLite: an FTS5 shadow table keyed by livestock_id (rowid).
+
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Value, When
+
+
+FTS_TABLE = 'livestock_search'
+SEARCH_CONFIG = 'simple'  # no stemming: tag IDs and Kinyarwanda breed names stay intact
+
+
+def using_postgres():
+    return connection.vendor == 'postgresql'
+
+
+def build_search_document(item):
+    """The text a listing is found by: description, tag, breed, species and farm."""
+    parts = [
+        item.tag_id,
+        item.species.species_name if item.species_id else None,
+        item.breed.breed_name if item.breed_id else None,
+        item.farmer.farm_name if item.farmer_id else None,
+        item.description,
+    ]
+    return ' '.join(part for part in parts if part)
+
+
+# 1. INDEX MAINTENANCE (called from signals and the rebuild command)
+def index_listings(items, model=None):
+    """Writes the search document for each item to the active backend's index."""
+    items = list(items)
+    if not items:
+        return
+    model = model or items[0].__class__
+
+    if using_postgres():
+        for item in items:
+            model.objects.filter(pk=item.pk).update(
+                search_vector=SearchVector(Value(build_search_document(item)), config=SEARCH_CONFIG)
+            )
+        return
+
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT OR REPLACE INTO {FTS_TABLE} (rowid, document) VALUES (%s, %s)",
+            [(item.pk, build_search_document(item)) for item in items],
+        )
+
+
+def unindex_listing(livestock_id):
+    # On PostgreSQL the vector lives on the row itself and goes with it
+    if using_postgres():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [livestock_id])
+
+
+def clear_search_index():
+    # Drops orphaned FTS5 rows before a full rebuild; PostgreSQL has none
+    if using_postgres():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+
+
+# 2. QUERYING
+def _fts5_query(text):
+    # Quote every word so user input can never be read as FTS5 syntax;
+    # the trailing * lets "ank" match "Ankole" while the buyer is typing.
+    words = re.findall(r'\w+', text)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_listings(queryset, text, limit=None):
+    """
+    Narrows ``queryset`` to listings matching ``text``, best match first.
+    Each row carries a ``search_rank`` annotation; at most ``limit`` rows
+    (default SEARCH_RESULT_LIMIT) are returned.
+    """
+    limit = limit or getattr(settings, 'SEARCH_RESULT_LIMIT', 100)
+
+    if using_postgres():
+        query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+        return (
+            queryset.filter(search_vector=query)
+            .annotate(search_rank=SearchRank(F('search_vector'), query))
+            .order_by('-search_rank', '-listing_date')[:limit]
+        )
+
+    match = _fts5_query(text)
+    if not match:
+        return queryset.none()
+
+    # Rank inside FTS5, then keep only ids the caller's filters still allow
+    candidate_ids = queryset.values_list('livestock_id', flat=True)
+    sql, params = candidate_ids.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid IN ({sql}) "
+            f"ORDER BY bm25({FTS_TABLE}) LIMIT %s",
+            [match, *params, limit],
+        )
+        ranked_ids = [row[0] for row in cursor.fetchall()]
+
+    if not ranked_ids:
+        return queryset.none()
+
+    rank = Case(
+        *[When(livestock_id=pk, then=Value(position)) for position, pk in enumerate(ranked_ids)],
+        output_field=IntegerField(),
+    )
+    return queryset.filter(livestock_id__in=ranked_ids).annotate(search_rank=rank).order_by('search_rank')
@@ -2,6 +2,18 @@ from rest_framework import serializers
 from .models import LivestockItem, LivestockSpecies, Breed, LivestockImage
 from accounts.models import Farmer
 
+
+def variant_urls(photo, request=None):
+    # {"card": {"webp": url, "jpeg": url}, ...}; empty until the worker has run
+    storage = photo.image.storage
+    variants = {}
+    for size, formats in (photo.variants or {}).items():
+        variants[size] = {}
+        for fmt, path in formats.items():
+            url = storage.url(path)
+            variants[size][fmt] = request.build_absolute_uri(url) if request else url
+    return variants
+
 # 1. Serializer for Species (Simple lookup)
 class SpeciesSerializer(serializers.ModelSerializer):
     class Meta:
@@ -16,9 +28,15 @@ class BreedSerializer(serializers.ModelSerializer):
 
 # 3. Serializer for Images
 class LivestockImageSerializer(serializers.ModelSerializer):
+    # Resized copies, e.g. {"card": {"webp": url, "jpeg": url}}; empty until generated
+    variants = serializers.SerializerMethodField()
+
     class Meta:
         model = LivestockImage
-        fields = ['id', 'image', 'uploaded_at']
+        fields = ['id', 'image', 'variants', 'uploaded_at']
+
+    def get_variants(self, obj):
+        return variant_urls(obj, self.context.get('request'))
 
 # 4. Serializer for Farmer (FIXED)
 class FarmerInfoSerializer(serializers.ModelSerializer):
@@ -46,6 +64,8 @@ class LivestockItemSerializer(serializers.ModelSerializer):
     breed_id = serializers.PrimaryKeyRelatedField(
         queryset=Breed.objects.all(), source='breed', write_only=True, required=False
     )
+    # Annotated by livestock.wishlist.with_wishlist_flag for the requesting buyer
+    in_wishlist = serializers.BooleanField(read_only=True, default=False)
 
     class Meta:
         model = LivestockItem
@@ -53,5 +73,49 @@ class LivestockItemSerializer(serializers.ModelSerializer):
             'livestock_id', 'farmer', 'species', 'species_id', 
             'breed', 'breed_id', 'tag_id', 'age', 'weight', 
             'gender', 'price', 'description', 'status', 
-            'is_for_sale', 'listing_date', 'images'
-        ]
\ No newline at end of file
+            'is_for_sale', 'listing_date', 'images', 'in_wishlist'
+        ]
+
+
+# 6. FAST READ PATH: hand-written list serializer (same output as #5, read-only)
+_datetime_field = serializers.DateTimeField()
+_decimal_field = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class LivestockItemListSerializer(serializers.BaseSerializer):
+    """
+    Builds the LivestockItemSerializer representation by hand, skipping the
+    per-object field introspection of ModelSerializer. Expects the queryset
+    from ``livestock.queries.api_listings`` so nested objects are preloaded.
+    """
+
+    def to_representation(self, item):
+        request = self.context.get('request')
+        farmer = item.farmer
+        breed = item.breed
+        as_datetime = _datetime_field.to_representation
+        return {
+            'livestock_id': item.livestock_id,
+            'farmer': {'farm_name': farmer.farm_name, 'location': farmer.farm_location},
+            'species': {'id': item.species.id, 'species_name': item.species.species_name},
+            'breed': {'id': breed.id, 'breed_name': breed.breed_name} if breed else None,
+            'tag_id': item.tag_id,
+            'age': item.age,
+            'weight': item.weight,
+            'gender': item.gender,
+            'price': _decimal_field.to_representation(item.price) if item.price is not None else None,
+            'description': item.description,
+            'status': item.status,
+            'is_for_sale': item.is_for_sale,
+            'listing_date': as_datetime(item.listing_date),
+            'images': [
+                {
+                    'id': photo.id,
+                    'image': request.build_absolute_uri(photo.image.url) if request else photo.image.url,
+                    'variants': variant_urls(photo, request),
+                    'uploaded_at': as_datetime(photo.uploaded_at),
+                }
+                for photo in item.images.all()
+            ],
+            'in_wishlist': getattr(item, 'in_wishlist', False),
+        }
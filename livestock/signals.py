@@ -0,0 +1,202 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from accounts.models import Farmer, UserProfile
+from .cart import clear_cart_summary
+from .conditional import bump_listings_version
+from .context_processors import clear_header_profile
+from .detail_cache import bump_detail_version, bump_detail_versions
+from .facets import clear_marketplace_facets
+from .geo import clear_farm_geofences
+from .images import delete_variants
+from .jobs import enqueue
+from .models import (
+    LivestockItem, LivestockSpecies, Breed, Order, OrderItem, LivestockImage, Geofence, LivestockPosition, Wishlist,
+)
+from .search import index_listings, unindex_listing
+from .stats import refresh_farmer_stats_on_commit, farmers_for_orders
+from .telemetry import clear_tag_map
+from .wishlist import clear_wishlist_ids
+
+
+# Keep the cached tag_id -> livestock_id map in step with the table
+@receiver(post_save, sender=LivestockItem)
+@receiver(post_delete, sender=LivestockItem)
+def invalidate_tag_map(sender, instance, **kwargs):
+    clear_tag_map()
+
+
+# Listing status, species or farm location changes alter the filter counts
+# (cleared once committed, or a request in between would cache the old counts)
+@receiver(post_save, sender=LivestockItem)
+@receiver(post_delete, sender=LivestockItem)
+@receiver(post_save, sender=Farmer)
+@receiver(post_delete, sender=Farmer)
+@receiver(post_save, sender=LivestockSpecies)
+@receiver(post_delete, sender=LivestockSpecies)
+def invalidate_marketplace_facets(sender, instance, **kwargs):
+    transaction.on_commit(clear_marketplace_facets)
+
+
+# Full-text search: reindex a listing whenever it, or a name it is found by, changes
+@receiver(post_save, sender=LivestockItem)
+def index_listing(sender, instance, **kwargs):
+    index_listings([instance])
+
+
+@receiver(post_delete, sender=LivestockItem)
+def unindex_deleted_listing(sender, instance, **kwargs):
+    unindex_listing(instance.pk)
+
+
+@receiver(post_save, sender=Farmer)
+@receiver(post_save, sender=LivestockSpecies)
+@receiver(post_save, sender=Breed)
+def reindex_related_listings(sender, instance, created, **kwargs):
+    if created:
+        return
+    items = instance.livestock_items.select_related('species', 'breed', 'farmer')
+    index_listings(items, model=LivestockItem)
+
+
+# Farmer dashboard counters follow listing and order status changes
+# (recomputed once the change has committed; see livestock.stats)
+@receiver(post_save, sender=LivestockItem)
+@receiver(post_delete, sender=LivestockItem)
+def update_farmer_stats_for_listing(sender, instance, **kwargs):
+    refresh_farmer_stats_on_commit([instance.farmer_id])
+
+
+@receiver(post_save, sender=Order)
+def update_farmer_stats_for_order(sender, instance, **kwargs):
+    # Carts ('pending') never show up on a farmer's dashboard
+    if instance.order_status != 'pending':
+        refresh_farmer_stats_on_commit(farmers_for_orders([instance.pk]))
+
+
+@receiver(pre_delete, sender=Order)
+def update_farmer_stats_for_deleted_order(sender, instance, **kwargs):
+    # The order's lines are deleted with it: find the farmers while they exist
+    if instance.order_status != 'pending':
+        refresh_farmer_stats_on_commit(farmers_for_orders([instance.pk]))
+
+
+# Photo derivatives: queued on upload (run_worker builds them), cleaned up with the photo
+@receiver(post_save, sender=LivestockImage)
+def queue_image_variants(sender, instance, created, **kwargs):
+    if created:
+        enqueue('process_livestock_image', image_id=instance.pk)
+
+
+@receiver(post_delete, sender=LivestockImage)
+def remove_image_variants(sender, instance, **kwargs):
+    delete_variants(instance)
+
+
+# Conditional GET: anything a listing page shows invalidates the ETag. Bumped
+# once committed: a page rendered in between from the old rows would
+# otherwise be served under the new version
+@receiver(post_save, sender=LivestockItem)
+@receiver(post_delete, sender=LivestockItem)
+@receiver(post_save, sender=LivestockImage)
+@receiver(post_delete, sender=LivestockImage)
+@receiver(post_save, sender=Farmer)
+@receiver(post_delete, sender=Farmer)
+@receiver(post_save, sender=LivestockSpecies)
+@receiver(post_delete, sender=LivestockSpecies)
+@receiver(post_save, sender=Breed)
+@receiver(post_delete, sender=Breed)
+def invalidate_listing_etags(sender, instance, **kwargs):
+    transaction.on_commit(bump_listings_version)
+
+
+# Herd map: a position follows its animal to a new owner
+@receiver(post_save, sender=LivestockItem)
+def move_position_with_owner(sender, instance, created, **kwargs):
+    if not created:
+        LivestockPosition.objects.filter(livestock=instance).exclude(farmer_id=instance.farmer_id).update(
+            farmer_id=instance.farmer_id
+        )
+
+
+# Alert engine reads geofences from the cache
+@receiver(post_save, sender=Geofence)
+@receiver(post_delete, sender=Geofence)
+def invalidate_geofences(sender, instance, **kwargs):
+    clear_farm_geofences()
+
+
+# Header: cached role/avatar and cart badge. The cart module rewrites the
+# summary itself after its .update() calls; these catch admin and other edits.
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_header_profile(sender, instance, **kwargs):
+    clear_header_profile(instance.user_id)
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def invalidate_cart_summary_for_order(sender, instance, **kwargs):
+    transaction.on_commit(lambda: clear_cart_summary(instance.buyer_id))
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def invalidate_cart_summary_for_line(sender, instance, **kwargs):
+    buyer_id = Order.objects.filter(pk=instance.order_id).values_list('buyer_id', flat=True).first()
+    if buyer_id is not None:
+        transaction.on_commit(lambda: clear_cart_summary(buyer_id))
+
+
+# Wishlist: cached id sets per buyer (livestock.wishlist clears them itself
+# after its bulk writes; these catch admin edits and deleted listings)
+@receiver(m2m_changed, sender=Wishlist.items.through)
+def invalidate_wishlist_ids(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if not action.startswith('post_'):
+            return
+        buyer_ids = [instance.user_id]
+    elif action == 'pre_clear':
+        # item.wishlists.clear(): find the wishlists while the rows still exist
+        buyer_ids = list(Wishlist.objects.filter(items=instance).values_list('user_id', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        buyer_ids = list(Wishlist.objects.filter(pk__in=pk_set).values_list('user_id', flat=True))
+    else:
+        return
+    transaction.on_commit(lambda: [clear_wishlist_ids(buyer_id) for buyer_id in buyer_ids])
+
+
+@receiver(pre_delete, sender=LivestockItem)
+def invalidate_wishlists_of_listing(sender, instance, **kwargs):
+    buyer_ids = list(Wishlist.objects.filter(items=instance).values_list('user_id', flat=True))
+    if buyer_ids:
+        transaction.on_commit(lambda: [clear_wishlist_ids(buyer_id) for buyer_id in buyer_ids])
+
+
+# Detail pages: new cache version once the change has committed (a reload
+# before the commit would cache the old row under the new version)
+@receiver(post_save, sender=LivestockItem)
+@receiver(post_delete, sender=LivestockItem)
+def invalidate_listing_detail(sender, instance, **kwargs):
+    transaction.on_commit(lambda: bump_detail_version(instance.pk))
+
+
+@receiver(post_save, sender=LivestockImage)
+@receiver(post_delete, sender=LivestockImage)
+def invalidate_listing_detail_photos(sender, instance, **kwargs):
+    transaction.on_commit(lambda: bump_detail_version(instance.livestock_id))
+
+
+# Farm name, location, contact and WhatsApp number are on every listing page
+@receiver(post_save, sender=Farmer)
+def invalidate_farmer_listing_details(sender, instance, **kwargs):
+    pks = list(LivestockItem.objects.filter(farmer=instance).values_list('pk', flat=True))
+    transaction.on_commit(lambda: bump_detail_versions(pks))
+
+
+@receiver(post_save, sender=UserProfile)
+def invalidate_listing_details_for_profile(sender, instance, **kwargs):
+    if instance.user_type == 'farmer':
+        pks = list(LivestockItem.objects.filter(farmer__user_id=instance.user_id).values_list('pk', flat=True))
+        transaction.on_commit(lambda: bump_detail_versions(pks))
@@ -0,0 +1,83 @@
+# livestock/stats.py
+# Keeps FarmerStats in step with LivestockItem.status and Order.order_status
+
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import FarmerStats, LivestockItem, OrderItem
+
+
+def refresh_farmer_stats(farmer_ids):
+    """
+    Recomputes the dashboard counters for the given farmers and stores them.
+
+    Refreshes of the same farmer are serialised on the FarmerStats row, so
+    one that starts after a change has committed always writes last with
+    counts that include it. Call it after commit (refresh_farmer_stats_on_commit)
+    rather than inside the transaction that changed the statuses.
+    """
+    farmer_ids = {farmer_id for farmer_id in farmer_ids if farmer_id is not None}
+    if not farmer_ids:
+        return
+
+    with transaction.atomic():
+        list(
+            FarmerStats.objects.select_for_update().filter(farmer_id__in=farmer_ids)
+            .order_by('farmer_id').values_list('pk', flat=True)
+        )
+        counts = {
+            row['farmer_id']: row
+            for row in LivestockItem.objects.filter(farmer_id__in=farmer_ids)
+            .values('farmer_id')
+            .annotate(
+                total_count=Count('livestock_id', filter=~Q(status='sold')),
+                available_count=Count('livestock_id', filter=Q(status='available')),
+                reserved_count=Count('livestock_id', filter=Q(status='reserved')),
+                sold_count=Count('livestock_id', filter=Q(status='sold')),
+            )
+        }
+        inquiries = dict(
+            OrderItem.objects.filter(livestock__farmer_id__in=farmer_ids, order__order_status='inquiry_sent')
+            .values_list('livestock__farmer_id')
+            .annotate(count=Count('order_item_id'))
+        )
+
+        rows = []
+        for farmer_id in farmer_ids:
+            row = counts.get(farmer_id, {})
+            rows.append(FarmerStats(
+                farmer_id=farmer_id,
+                total_count=row.get('total_count', 0),
+                available_count=row.get('available_count', 0),
+                reserved_count=row.get('reserved_count', 0),
+                sold_count=row.get('sold_count', 0),
+                new_inquiries_count=inquiries.get(farmer_id, 0),
+            ))
+        FarmerStats.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['farmer'],
+            update_fields=['total_count', 'available_count', 'reserved_count',
+                           'sold_count', 'new_inquiries_count', 'updated_at'],
+        )
+
+
+def refresh_farmer_stats_on_commit(farmer_ids):
+    farmer_ids = set(farmer_ids)
+    transaction.on_commit(lambda: refresh_farmer_stats(farmer_ids))
+
+
+def farmers_for_orders(order_ids):
+    return set(
+        OrderItem.objects.filter(order_id__in=order_ids, livestock__isnull=False)
+        .values_list('livestock__farmer_id', flat=True)
+    )
+
+
+def get_farmer_stats(farmer):
+    """One indexed read; builds the row on first use."""
+    stats = FarmerStats.objects.filter(farmer=farmer).first()
+    if stats is None:
+        refresh_farmer_stats([farmer.pk])
+        stats = FarmerStats.objects.get(farmer=farmer)
+    return stats
@@ -0,0 +1,14 @@
+# livestock/tasks.py
+# Background job handlers (see livestock.jobs)
+
+from .images import generate_variants
+from .jobs import task
+from .models import LivestockImage
+
+
+@task('process_livestock_image')
+def process_livestock_image(image_id):
+    photo = LivestockImage.objects.filter(pk=image_id).first()
+    if photo is None:
+        return  # deleted before the worker got to it
+    generate_variants(photo)
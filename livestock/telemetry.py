@@ -0,0 +1,152 @@
+# livestock/telemetry.py
+# Helpers for turning raw collar readings into IoTDeviceData rows
+
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .geo import update_latest_positions
+from .models import LivestockItem, IoTDeviceData
+
+
+TAG_MAP_CACHE_KEY = 'livestock:tag_map'
+TAG_MAP_TIMEOUT = 300  # seconds
+
+FLOAT_FIELDS = ('temperature', 'activity_level', 'battery_level')
+DECIMAL_FIELDS = ('latitude', 'longitude')
+
+
+class ReadingError(ValueError):
+    """Raised when a single reading cannot be turned into a row."""
+
+
+# 1. TAG LOOKUP (tag_id -> (livestock_id, farmer_id), cached)
+def get_tag_map(refresh=False):
+    tag_map = None if refresh else cache.get(TAG_MAP_CACHE_KEY)
+    if tag_map is None:
+        tag_map = {
+            tag_id: (livestock_id, farmer_id)
+            for tag_id, livestock_id, farmer_id in LivestockItem.objects.filter(tag_id__isnull=False)
+            .exclude(tag_id='')
+            .values_list('tag_id', 'livestock_id', 'farmer_id')
+        }
+        cache.set(TAG_MAP_CACHE_KEY, tag_map, TAG_MAP_TIMEOUT)
+    return tag_map
+
+
+def clear_tag_map():
+    cache.delete(TAG_MAP_CACHE_KEY)
+
+
+# 2. SINGLE READING -> UNSAVED ROW
+def build_reading(raw, livestock_id):
+    if not isinstance(raw, dict):
+        raise ReadingError("Reading must be an object.")
+
+    values = {}
+    for field in FLOAT_FIELDS:
+        value = raw.get(field)
+        if value is not None:
+            try:
+                values[field] = float(value)
+            except (TypeError, ValueError):
+                raise ReadingError(f"Invalid {field}.")
+
+    for field in DECIMAL_FIELDS:
+        value = raw.get(field)
+        if value is not None:
+            try:
+                values[field] = Decimal(str(value)).quantize(Decimal('0.000001'))
+            except (InvalidOperation, TypeError, ValueError):
+                raise ReadingError(f"Invalid {field}.")
+
+    timestamp = raw.get('timestamp')
+    if timestamp:
+        parsed = parse_datetime(str(timestamp))
+        if parsed is None:
+            raise ReadingError("Invalid timestamp.")
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        values['timestamp'] = parsed
+    else:
+        values['timestamp'] = timezone.now()
+
+    device_type = raw.get('device_type')
+    if device_type:
+        values['device_type'] = str(device_type)[:120]
+
+    return IoTDeviceData(livestock_id=livestock_id, **values)
+
+
+# 3. BATCH INGESTION
+def ingest_readings(readings, batch_size=None, farmer_id=None):
+    """
+    Validates an iterable of raw readings keyed by ``tag_id`` and writes
+    them with ``bulk_create`` in chunks, all inside one transaction.
+    With ``farmer_id``, tags on other farmers' animals are rejected as unknown.
+
+    Returns a summary dict with the created rows and any rejected readings.
+    """
+    batch_size = batch_size or getattr(settings, 'TELEMETRY_INGEST_BATCH_SIZE', 1000)
+    tag_map = get_tag_map()
+    refreshed = False
+
+    created = []
+    rejected = []
+    received = 0
+    batch = []
+
+    with transaction.atomic():
+        for index, raw in enumerate(readings):
+            received += 1
+            tag = raw.get('tag_id') if isinstance(raw, dict) else None
+            if not isinstance(tag, str):
+                tag = None  # also keeps lists/objects out of the dict lookup
+            found = tag_map.get(tag)
+
+            # A newly tagged animal may not be in the cached map yet
+            if found is None and tag and not refreshed:
+                tag_map = get_tag_map(refresh=True)
+                refreshed = True
+                found = tag_map.get(tag)
+
+            livestock_id, owner_id = found or (None, None)
+            if livestock_id is None or (farmer_id is not None and owner_id != farmer_id):
+                rejected.append({'index': index, 'error': f"Unknown tag_id: {tag}"})
+                continue
+
+            try:
+                batch.append(build_reading(raw, livestock_id))
+            except ReadingError as e:
+                rejected.append({'index': index, 'error': str(e)})
+                continue
+
+            if len(batch) >= batch_size:
+                created.extend(IoTDeviceData.objects.bulk_create(batch))
+                batch = []
+
+        if batch:
+            created.extend(IoTDeviceData.objects.bulk_create(batch))
+
+        # Herd map reads the latest fix per animal, not the raw table
+        update_latest_positions(created)
+
+    return {'received': received, 'created': created, 'rejected': rejected}
+
+
+# 4. TAILING BY ID
+def settled_cutoff():
+    """
+    Rows written (``received_at`` / ``created_at``) before this moment are
+    settled: every lower id has committed too. Ids are handed out at insert
+    but become visible at commit, so a reader tailing the table by id only
+    moves its watermark past settled rows, or a lower id that commits later
+    would be skipped for good. TELEMETRY_SETTLE_SECONDS must outlast the
+    longest ingest transaction.
+    """
+    return timezone.now() - timedelta(seconds=getattr(settings, 'TELEMETRY_SETTLE_SECONDS', 60))
@@ -1,4 +1,6 @@
 from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
 
 register = template.Library()
 
@@ -8,4 +10,34 @@ def add_class(value, arg):
     Adds a CSS class to a Django form field widget.
     Usage: {{ field|add_class:'form-control' }}
     """
-    return value.as_widget(attrs={'class': arg})
\ No newline at end of file
+    return value.as_widget(attrs={'class': arg})
+
+@register.filter(name='variant_url')
+def variant_url(photo, size):
+    """
+    URL of a resized LivestockImage derivative (falls back to the original).
+    Usage: {{ item.primary_image|variant_url:'card' }}
+    """
+    if not photo:
+        return ''
+    return photo.variant_url(size)
+
+@register.simple_tag
+def variant_picture(photo, size, **attrs):
+    """
+    <picture> for a resized LivestockImage: the WebP derivative where the
+    browser supports it, the JPEG one otherwise (the original until the
+    derivatives exist). Keyword arguments become attributes of the <img>.
+    Usage: {% variant_picture item.primary_image 'card' alt='Cow' loading='lazy' %}
+    """
+    if not photo:
+        return ''
+    img = format_html('<img src="{}"{}>', photo.variant_url(size, 'jpeg'), flatatt(attrs))
+    webp = photo.variants.get(size, {}).get('webp')
+    if not webp:
+        return img
+    # display: contents keeps the <img> laid out as if <picture> were not there
+    return format_html(
+        '<picture style="display: contents"><source type="image/webp" srcset="{}">{}</picture>',
+        photo.image.storage.url(webp), img,
+    )
@@ -1,3 +1,1488 @@
-from django.test import TestCase
+import asyncio
+import csv
+import glob
+import gzip
+import os
+import pickle
+import re
+import tempfile
+import time
+from datetime import timedelta
+from importlib import import_module
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.template import Context, Template
+from django.template.loader import render_to_string
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from PIL import Image
+
+from accounts.models import Farmer, Buyer, UserProfile
+from .models import (
+    LivestockItem, LivestockSpecies, Breed, LivestockImage, FarmerStats, Order, OrderItem, IoTDeviceData, Alert,
+    Geofence, Job, LivestockPosition, TelemetryDayRollup, TelemetryHourRollup, TelemetryMinuteRollup,
+)
+from . import cart
+from .analytics import get_herd_health
+from .checks import check_shared_cache
+from .management.commands.explain_hot_queries import Command as ExplainHotQueries
+from .live import LiveFeed, LocalBroker, get_feed
+from .alerts import AlertEngine
+from .geo import covering_cells, encode_geohash, within_bbox
+from .wishlist import get_wishlist_ids, update_wishlist
+from .detail_cache import ENTRY_KEY, LOCK_KEY, get_detail_version, get_listing
+from .telemetry import ingest_readings
+from .retention import apply_retention
+from .rollups import refresh_rollups
+from .facets import get_marketplace_facets
+from .inquiries import InquiryError, bulk_update_inquiries
+from .jobs import claim_jobs, enqueue, enqueue_many, run_job, task
+from .pagination import keyset_paginate
+from .queries import api_listings
+from .search import search_listings
+from .images import generate_variants, save_uploaded_photos
+from .serializers import LivestockImageSerializer, LivestockItemSerializer, LivestockItemListSerializer
+
+
+def png(width, height):
+    """A small RGBA PNG, as phones and screenshots upload them."""
+    buffer = BytesIO()
+    Image.new('RGBA', (width, height), (120, 90, 60, 255)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class MarketplaceQueryCountTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('farmer', password='pass12345')
+        self.farmer = Farmer.objects.create(user=user, farm_name='Green Hills', farm_location='Musanze')
+        self.species = LivestockSpecies.objects.create(species_name='Cattle')
+        self.breed = Breed.objects.create(species=self.species, breed_name='Ankole')
+
+    def add_listings(self, count):
+        for _ in range(count):
+            item = LivestockItem.objects.create(
+                farmer=self.farmer, species=self.species, breed=self.breed,
+                price=150000, is_for_sale=True, status='available',
+            )
+            LivestockImage.objects.create(livestock=item, image='livestock_images/cow.jpg')
+            LivestockImage.objects.create(livestock=item, image='livestock_images/cow_side.jpg')
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('livestock:marketplace'))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_query_count_is_constant(self):
+        self.add_listings(2)
+        small = self.count_queries()
+
+        self.add_listings(20)
+        large = self.count_queries()
+
+        self.assertEqual(small, large)
+
+    def test_cards_use_first_photo(self):
+        self.add_listings(1)
+        response = self.client.get(reverse('livestock:marketplace'))
+        self.assertContains(response, 'livestock_images/cow.jpg')
+        self.assertNotContains(response, 'livestock_images/cow_side.jpg')
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('farmer', password='pass12345')
+        farmer = Farmer.objects.create(user=user, farm_name='Green Hills')
+        species = LivestockSpecies.objects.create(species_name='Goat')
+        # Several listings share a listing_date so livestock_id must break ties
+        same_day = timezone.now()
+        for i in range(7):
+            LivestockItem.objects.create(
+                farmer=farmer, species=species, is_for_sale=True, status='available',
+                listing_date=same_day if i % 2 else same_day - timedelta(days=i),
+            )
+        self.queryset = LivestockItem.objects.all()
+        self.expected = list(self.queryset.order_by('-listing_date', '-livestock_id'))
+
+    def test_walks_forward_and_back_without_gaps(self):
+        seen = []
+        page = keyset_paginate(self.queryset, 3)
+        pages = [page]
+        seen.extend(page)
+        while page.next_cursor:
+            page = keyset_paginate(self.queryset, 3, after=page.next_cursor)
+            pages.append(page)
+            seen.extend(page)
+        self.assertEqual(seen, self.expected)
+
+        back = keyset_paginate(self.queryset, 3, before=pages[-1].previous_cursor)
+        self.assertEqual(list(back), list(pages[-2]))
+
+    def test_api_list_is_paginated(self):
+        response = self.client.get('/api/livestock/?page_size=5')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNotNone(response.data['next'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNone(response.data['next'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/livestock/?after=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+
+class MarketplaceFacetTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('farmer', password='pass12345')
+        self.farmer = Farmer.objects.create(user=user, farm_name='Green Hills', farm_location='Musanze')
+        self.cattle = LivestockSpecies.objects.create(species_name='Cattle')
+        self.goat = LivestockSpecies.objects.create(species_name='Goat')
+        for species in (self.cattle, self.cattle, self.goat):
+            LivestockItem.objects.create(farmer=self.farmer, species=species, is_for_sale=True)
+        cache.clear()
+
+    def test_counts_per_option(self):
+        facets = get_marketplace_facets()
+        self.assertEqual(
+            [(sp['species_name'], sp['count']) for sp in facets['species']],
+            [('Cattle', 2), ('Goat', 1)],
+        )
+        self.assertEqual(facets['locations'], [{'name': 'Musanze', 'count': 3}])
+
+    def test_signals_refresh_cached_facets(self):
+        get_marketplace_facets()
+
+        self.farmer.farm_location = 'Huye'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.farmer.save()
+            LivestockItem.objects.filter(species=self.goat).get().delete()
+            # A request before the commit must not cache the old counts under a cleared key
+            self.assertEqual(len(get_marketplace_facets()['species']), 2)
+
+        facets = get_marketplace_facets()
+        self.assertEqual([sp['species_name'] for sp in facets['species']], ['Cattle'])
+        self.assertEqual(facets['locations'], [{'name': 'Huye', 'count': 2}])
+
+
+class ListingSearchTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('farmer', password='pass12345')
+        self.farmer = Farmer.objects.create(user=user, farm_name='Green Hills')
+        cattle = LivestockSpecies.objects.create(species_name='Cattle')
+        self.ankole = Breed.objects.create(species=cattle, breed_name='Ankole')
+        self.cow = LivestockItem.objects.create(
+            farmer=self.farmer, species=cattle, breed=self.ankole, tag_id='KGL001',
+            description='Calm cow, good milk yield', is_for_sale=True,
+        )
+        self.bull = LivestockItem.objects.create(
+            farmer=self.farmer, species=cattle, tag_id='KGL002',
+            description='Young bull', is_for_sale=True,
+        )
+
+    def search(self, text):
+        return list(search_listings(LivestockItem.objects.all(), text))
+
+    def test_matches_across_related_names(self):
+        self.assertEqual(self.search('ankole'), [self.cow])
+        self.assertEqual(self.search('KGL002'), [self.bull])
+        self.assertCountEqual(self.search('green hills'), [self.cow, self.bull])
+
+    def test_index_follows_renames_and_deletes(self):
+        self.ankole.breed_name = 'Inyambo'
+        self.ankole.save()
+        self.assertEqual(self.search('inyambo'), [self.cow])
+        self.assertEqual(self.search('ankole'), [])
+
+        self.bull.delete()
+        self.assertEqual(self.search('bull'), [])
+
+    def test_user_input_is_not_query_syntax(self):
+        self.assertEqual(self.search('"milk ('), [self.cow])
+        self.assertEqual(self.search('***'), [])
+
+    def test_api_and_marketplace_accept_q(self):
+        response = self.client.get('/api/livestock/?q=milk')
+        self.assertEqual([row['livestock_id'] for row in response.data], [self.cow.pk])
+
+        response = self.client.get(reverse('livestock:marketplace'), {'q': 'young'})
+        self.assertEqual(list(response.context['listings']), [self.bull])
+
+
+class ExplainHotQueriesTests(TestCase):
+    @skipUnless(connection.vendor == 'sqlite', "checks SQLite's EXPLAIN QUERY PLAN format")
+    def test_prints_a_plan_for_every_hot_query(self):
+        out = StringIO()
+        call_command('explain_hot_queries', stdout=out, no_color=True)
+        output = out.getvalue()
+        self.assertTrue(output.startswith(f"Database: {connection.vendor}"))
+
+        titles = [title for title, _ in ExplainHotQueries().hot_queries()]
+        self.assertEqual(len(titles), 9)
+        for title in titles:
+            # Each title is followed by at least one SQLite plan step
+            self.assertRegex(output, re.escape(title) + r'\n\d+ \d+ \d+ (SCAN|SEARCH) ')
+
+
+class FarmerStatsTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('farmer', password='pass12345')
+        self.farmer = Farmer.objects.create(user=user, farm_name='Green Hills')
+        buyer_user = User.objects.create_user('buyer', password='pass12345')
+        self.buyer = Buyer.objects.create(user=buyer_user)
+        species = LivestockSpecies.objects.create(species_name='Pig')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.items = [
+                LivestockItem.objects.create(farmer=self.farmer, species=species, status=status, is_for_sale=True)
+                for status in ('available', 'available', 'reserved', 'sold')
+            ]
+
+    def test_counters_follow_status_changes(self):
+        stats = FarmerStats.objects.get(farmer=self.farmer)
+        self.assertEqual(
+            (stats.total_count, stats.available_count, stats.reserved_count, stats.sold_count),
+            (3, 2, 1, 1),
+        )
+
+        order = Order.objects.create(buyer=self.buyer)
+        OrderItem.objects.create(order=order, livestock=self.items[0])
+        order.order_status = 'inquiry_sent'
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            order.save()
+            # Nothing is recomputed before the change commits
+            self.assertEqual(FarmerStats.objects.get(farmer=self.farmer).new_inquiries_count, 0)
+        self.assertTrue(callbacks)
+        self.assertEqual(FarmerStats.objects.get(farmer=self.farmer).new_inquiries_count, 1)
+
+        order.order_status = 'approved'
+        with self.captureOnCommitCallbacks(execute=True):
+            order.save()
+            self.items[0].delete()
+        stats = FarmerStats.objects.get(farmer=self.farmer)
+        self.assertEqual((stats.new_inquiries_count, stats.total_count), (0, 2))
+
+    def test_deleted_order_leaves_no_inquiry(self):
+        order = Order.objects.create(buyer=self.buyer, order_status='inquiry_sent')
+        OrderItem.objects.create(order=order, livestock=self.items[1])
+        with self.captureOnCommitCallbacks(execute=True):
+            order.save()
+        self.assertEqual(FarmerStats.objects.get(farmer=self.farmer).new_inquiries_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order.delete()
+        self.assertEqual(FarmerStats.objects.get(farmer=self.farmer).new_inquiries_count, 0)
+
+    def test_rebuild_repairs_drift(self):
+        FarmerStats.objects.filter(farmer=self.farmer).update(total_count=99)
+        call_command('rebuild_farmer_stats', stdout=StringIO())
+        self.assertEqual(FarmerStats.objects.get(farmer=self.farmer).total_count, 3)
+
+
+class CartCheckoutTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('farmer', password='pass12345')
+        self.farmer = Farmer.objects.create(user=user, farm_name='Green Hills')
+        self.species = LivestockSpecies.objects.create(species_name='Cattle')
+        self.buyers = [
+            Buyer.objects.create(user=User.objects.create_user(name, password='pass12345'))
+            for name in ('buyer1', 'buyer2')
+        ]
+
+    def new_items(self, count, price=100000):
+        return [
+            LivestockItem.objects.create(farmer=self.farmer, species=self.species, price=price, is_for_sale=True)
+            for _ in range(count)
+        ]
+
+    def test_totals_are_summed_in_the_database(self):
+        cow, goat = self.new_items(1, 150000) + self.new_items(1, 40000)
+        cart.add_item(self.buyers[0], cow)
+        cart.add_item(self.buyers[0], cow)
+        order = cart.add_item(self.buyers[0], goat)
+        self.assertEqual(order.total_amount, 340000)
+
+        cart.remove_item(order, order.order_items.get(livestock=cow).pk)
+        self.assertEqual(order.total_amount, 40000)
+
+    def test_animal_is_never_reserved_twice(self):
+        cow = self.new_items(1)[0]
+        first = cart.add_item(self.buyers[0], cow)
+        second = cart.add_item(self.buyers[1], cow)
+
+        cart.checkout(first, contact_phone='0780000000')
+        with self.assertRaises(cart.CartError):
+            cart.checkout(second, contact_phone='0781111111')
+
+        second.refresh_from_db()
+        self.assertEqual(second.order_status, 'pending')
+        self.assertEqual(LivestockItem.objects.get(pk=cow.pk).status, 'reserved')
+
+    def count_checkout_queries(self, buyer, size):
+        for item in self.new_items(size):
+            order = cart.add_item(buyer, item)
+        with CaptureQueriesContext(connection) as ctx:
+            cart.checkout(order, delivery_address='Musanze')
+        self.assertEqual(order.order_items.filter(livestock__status='reserved').count(), size)
+        return len(ctx.captured_queries)
+
+    def test_checkout_query_count_is_fixed(self):
+        self.assertEqual(
+            self.count_checkout_queries(self.buyers[0], 1),
+            self.count_checkout_queries(self.buyers[1], 8),
+        )
+
+    def test_animals_are_locked_in_key_order(self):
+        for item in self.new_items(3):
+            order = cart.add_item(self.buyers[0], item)
+        with CaptureQueriesContext(connection) as ctx:
+            cart.checkout(order)
+        lock = next(q['sql'] for q in ctx.captured_queries if 'IN (SELECT' in q['sql'])
+        self.assertTrue(lock.startswith('SELECT "livestock_livestockitem"."livestock_id"'))
+        self.assertTrue(lock.endswith('ORDER BY 1 ASC'))
+
+
+class CartSummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        farmer = Farmer.objects.create(user=User.objects.create_user('farmer', password='pass12345'), farm_name='Green Hills')
+        species = LivestockSpecies.objects.create(species_name='Cattle')
+        self.cow, self.goat = (
+            LivestockItem.objects.create(farmer=farmer, species=species, price=price, is_for_sale=True)
+            for price in (150000, 40000)
+        )
+        self.user = User.objects.create_user('buyer', password='pass12345')
+        UserProfile.objects.create(user=self.user, user_type='buyer')
+        self.buyer = Buyer.objects.create(user=self.user)
+
+    def test_summary_follows_cart_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            cart.add_item(self.buyer, self.cow)
+            order = cart.add_item(self.buyer, self.goat)
+        summary = cart.get_cart_summary(self.buyer.pk)
+        self.assertEqual((summary['count'], summary['total']), (2, 190000))
+        self.assertEqual(summary['line_ids'], list(order.order_items.order_by('pk').values_list('pk', flat=True)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cart.remove_item(order, summary['line_ids'][0])
+        self.assertEqual(cart.get_cart_summary(self.buyer.pk)['total'], 40000)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cart.checkout(order, contact_phone='0780000000')
+        self.assertEqual(cart.get_cart_summary(self.buyer.pk)['count'], 0)
+
+    def test_header_renders_without_queries(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            cart.add_item(self.buyer, self.cow)
+        request = RequestFactory().get('/')
+        request.user = self.user
+        render_to_string('base.html', request=request)  # warms the per-user cache
+
+        with self.assertNumQueries(0):
+            html = render_to_string('base.html', request=request)
+        self.assertIn(reverse('livestock:view_cart'), html)
+
+    def test_view_cart_does_not_write(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            cart.add_item(self.buyer, self.cow)
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('livestock:view_cart'))
+        self.assertContains(response, 'RWF 150000')
+        self.assertFalse([q for q in ctx.captured_queries if q['sql'].startswith('UPDATE')])
+
+
+class WishlistTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        farmer = Farmer.objects.create(user=User.objects.create_user('farmer', password='pass12345'), farm_name='Green Hills')
+        species = LivestockSpecies.objects.create(species_name='Cattle')
+        self.items = [
+            LivestockItem.objects.create(farmer=farmer, species=species, price=100000, is_for_sale=True)
+            for _ in range(4)
+        ]
+        self.user = User.objects.create_user('buyer', password='pass12345')
+        UserProfile.objects.create(user=self.user, user_type='buyer')
+        self.buyer = Buyer.objects.create(user=self.user)
+
+    def test_batched_update(self):
+        a, b, c, _ = (item.pk for item in self.items)
+        with self.captureOnCommitCallbacks(execute=True):
+            update_wishlist(self.buyer, add=[a, b])
+        self.assertEqual(get_wishlist_ids(self.buyer.pk), {a, b})
+
+        with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(8):
+            result = update_wishlist(self.buyer, toggle=[b, c], remove=[a, 999999])
+        self.assertEqual(result, {a: False, b: False, c: True})
+        self.assertEqual(get_wishlist_ids(self.buyer.pk), {c})
+
+    def test_admin_style_edits_clear_the_cache(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            update_wishlist(self.buyer, add=[self.items[0].pk])
+        self.assertEqual(get_wishlist_ids(self.buyer.pk), {self.items[0].pk})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.buyer.wishlist.items.add(self.items[1])
+            self.items[0].delete()
+        self.assertEqual(get_wishlist_ids(self.buyer.pk), {self.items[1].pk})
+
+    def test_listings_carry_heart_state(self):
+        update_wishlist(self.buyer, add=[self.items[1].pk])
+        self.client.force_login(self.user)
+        rows = self.client.get('/api/livestock/?page_size=10').json()['results']
+        self.assertEqual(
+            {row['livestock_id'] for row in rows if row['in_wishlist']}, {self.items[1].pk},
+        )
+        response = self.client.get(reverse('livestock:marketplace'))
+        self.assertEqual([item.in_wishlist for item in response.context['listings']].count(True), 1)
+
+    def test_batch_api(self):
+        self.client.force_login(self.user)
+        ids = [item.pk for item in self.items]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/wishlist/', {'toggle': ids[:3]}, content_type='application/json')
+        self.assertEqual(response.json()['wishlisted'], {str(pk): True for pk in ids[:3]})
+
+        status = self.client.get('/api/wishlist/', {'ids': ','.join(map(str, ids))}).json()['wishlisted']
+        self.assertEqual(status, {**{str(pk): True for pk in ids[:3]}, str(ids[3]): False})
+        self.assertEqual(self.client.get('/api/wishlist/').json(), {'livestock_ids': ids[:3]})
+
+
+class ListingDetailCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user('farmer', password='pass12345')
+        UserProfile.objects.create(user=user, user_type='farmer', phone_number='+250780000000')
+        self.farmer = Farmer.objects.create(user=user, farm_name='Green Hills', farm_location='Musanze')
+        species = LivestockSpecies.objects.create(species_name='Cattle')
+        self.item = LivestockItem.objects.create(farmer=self.farmer, species=species, price=150000, is_for_sale=True)
+        LivestockImage.objects.create(livestock=self.item, image='livestock_images/cow.jpg')
+        self.url = reverse('livestock:livestock_detail', kwargs={'pk': self.item.pk})
+
+    def test_hot_page_renders_without_queries(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'RWF 150000')
+        self.assertContains(response, 'livestock_images/cow.jpg')
+        self.assertContains(response, 'wa.me/250780000000')
+
+    def test_cached_entry_holds_no_credentials(self):
+        get_listing(self.item.pk)
+        entry = cache.get(ENTRY_KEY.format(pk=self.item.pk, version=get_detail_version(self.item.pk)))
+        user = entry['item'].farmer.user
+        self.assertEqual(user.get_deferred_fields() & {'password', 'email', 'last_login'}, {'password', 'email', 'last_login'})
+        self.assertNotIn(User.objects.get(username='farmer').password.encode(), pickle.dumps(entry))
+
+    def test_changes_bump_the_version(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.price = 90000
+            self.item.save()
+        self.assertContains(self.client.get(self.url), 'RWF 90000')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            LivestockImage.objects.create(livestock=self.item, image='livestock_images/cow_side.jpg')
+        self.assertContains(self.client.get(self.url), 'livestock_images/cow_side.jpg')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.farmer.farm_name = 'Blue Hills'
+            self.farmer.save()
+        self.assertContains(self.client.get(self.url), 'Blue Hills')
+
+    def test_stale_entry_is_served_while_another_request_reloads(self):
+        get_listing(self.item.pk)
+        version = get_detail_version(self.item.pk)
+        key = ENTRY_KEY.format(pk=self.item.pk, version=version)
+        entry = cache.get(key)
+        cache.set(key, {**entry, 'fresh_until': 0})
+        cache.add(LOCK_KEY.format(pk=self.item.pk, version=version), 1)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_listing(self.item.pk).pk, self.item.pk)
+
+    def test_missing_listing_is_404(self):
+        response = self.client.get(reverse('livestock:livestock_detail', kwargs={'pk': self.item.pk + 100}))
+        self.assertEqual(response.status_code, 404)
+
+
+class BulkInquiryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('farmer', password='pass12345')
+        self.farmer = Farmer.objects.create(user=self.user, farm_name='Green Hills')
+        other = Farmer.objects.create(user=User.objects.create_user('other', password='pass12345'), farm_name='Blue Hills')
+        self.species = LivestockSpecies.objects.create(species_name='Cattle')
+        self.buyer = Buyer.objects.create(user=User.objects.create_user('buyer', password='pass12345'))
+        self.other_line = self.inquiry(other)
+
+    def inquiry(self, farmer=None):
+        """One checked-out order with one reserved animal; returns its OrderItem."""
+        with self.captureOnCommitCallbacks(execute=True):
+            item = LivestockItem.objects.create(farmer=farmer or self.farmer, species=self.species, price=100000, is_for_sale=True)
+            order = cart.add_item(self.buyer, item)
+            cart.checkout(order, contact_phone='0780000000')
+        return order.order_items.get()
+
+    def test_query_count_does_not_grow_with_selection(self):
+        def count(size):
+            ids = [self.inquiry().pk for _ in range(size)]
+            with CaptureQueriesContext(connection) as ctx:
+                result = bulk_update_inquiries(self.farmer, ids, 'approve')
+            self.assertEqual(result['orders'], size)
+            return len(ctx.captured_queries)
+        self.assertEqual(count(1), count(10))
+
+    def test_reject_releases_animals_and_refreshes_counters(self):
+        lines = [self.inquiry() for _ in range(3)]
+        self.assertEqual(FarmerStats.objects.get(farmer=self.farmer).reserved_count, 3)
+        bulk_update_inquiries(self.farmer, [lines[0].pk], 'approve')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = bulk_update_inquiries(self.farmer, [line.pk for line in lines], 'reject')
+        self.assertEqual((result['orders'], result['animals']), (3, 3))
+        self.assertEqual(set(Order.objects.filter(order_items__in=lines).values_list('order_status', flat=True)), {'cancelled'})
+        self.assertFalse(LivestockItem.objects.filter(farmer=self.farmer).exclude(status='available').exists())
+        stats = FarmerStats.objects.get(farmer=self.farmer)
+        self.assertEqual((stats.available_count, stats.reserved_count, stats.new_inquiries_count), (3, 0, 0))
+
+        again = bulk_update_inquiries(self.farmer, [lines[0].pk], 'approve')
+        self.assertEqual((again['orders'], again['skipped']), (0, [lines[0].pk]))
+
+    def test_foreign_lines_reject_the_whole_selection(self):
+        line = self.inquiry()
+        with self.assertRaises(InquiryError):
+            bulk_update_inquiries(self.farmer, [line.pk, self.other_line.pk], 'reject')
+        self.assertEqual(Order.objects.get(order_items=line).order_status, 'inquiry_sent')
+
+    def test_shared_orders_are_left_to_both_farmers(self):
+        mine = LivestockItem.objects.create(farmer=self.farmer, species=self.species, price=100000, is_for_sale=True)
+        theirs = LivestockItem.objects.create(farmer=self.other_line.livestock.farmer, species=self.species, price=90000, is_for_sale=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            order = cart.add_item(self.buyer, mine)
+            cart.add_item(self.buyer, theirs)
+            cart.checkout(order, contact_phone='0780000000')
+        line = order.order_items.get(livestock=mine)
+
+        with self.assertRaises(InquiryError):
+            bulk_update_inquiries(self.farmer, [line.pk], 'reject')
+        order.refresh_from_db()
+        self.assertEqual(order.order_status, 'inquiry_sent')
+        self.assertEqual(set(LivestockItem.objects.filter(pk__in=[mine.pk, theirs.pk]).values_list('status', flat=True)), {'reserved'})
+
+        self.client.force_login(self.user)
+        response = self.client.post(
+            '/api/inquiries/bulk/', {'action': 'reject', 'ids': [line.pk]}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_form_and_api(self):
+        lines = [self.inquiry() for _ in range(2)]
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(reverse('livestock:sales_inquiries')), 'form="bulkInquiryForm"', count=2)
+        self.client.post(reverse('livestock:bulk_inquiries'), {'action': 'approve', 'ids': [lines[0].pk]})
+        self.assertEqual(Order.objects.get(order_items=lines[0]).order_status, 'approved')
+
+        response = self.client.post(
+            '/api/inquiries/bulk/', {'action': 'reject', 'ids': [lines[1].pk]}, content_type='application/json',
+        )
+        self.assertEqual(response.json()['orders'], 1)
+        response = self.client.post(
+            '/api/inquiries/bulk/', {'action': 'reject', 'ids': [self.other_line.pk]}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class HistoryPageTests(TestCase):
+    def setUp(self):
+        self.farmer_user = User.objects.create_user('farmer', password='pass12345')
+        self.farmer = Farmer.objects.create(user=self.farmer_user, farm_name='Green Hills')
+        self.species = LivestockSpecies.objects.create(species_name='Cattle')
+        self.buyer_user = User.objects.create_user('buyer', password='pass12345')
+        self.buyer = Buyer.objects.create(user=self.buyer_user)
+
+    def add_orders(self, count):
+        for _ in range(count):
+            item = LivestockItem.objects.create(farmer=self.farmer, species=self.species, price=100000, is_for_sale=True)
+            LivestockImage.objects.create(livestock=item, image='livestock_images/cow.jpg')
+            LivestockImage.objects.create(livestock=item, image='livestock_images/cow_side.jpg')
+            cart.checkout(cart.add_item(self.buyer, item), contact_phone='0780000000')
+
+    def count_queries(self, user, url):
+        self.client.force_login(user)
+        self.client.get(url)  # warm the cached header
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'cow_side.jpg')
+        return len(ctx.captured_queries)
+
+    def test_query_counts_are_constant(self):
+        for user, url in ((self.buyer_user, 'livestock:order_history'), (self.farmer_user, 'livestock:sales_inquiries')):
+            self.add_orders(2)
+            small = self.count_queries(user, reverse(url))
+            self.add_orders(10)
+            self.assertEqual(small, self.count_queries(user, reverse(url)))
+
+    @override_settings(HISTORY_PAGE_SIZE=2)
+    def test_status_tabs_and_pages(self):
+        self.add_orders(5)
+        first = OrderItem.objects.order_by('pk').first()
+        bulk_update_inquiries(self.farmer, [first.pk], 'reject')
+        cart.add_item(self.buyer, LivestockItem.objects.create(farmer=self.farmer, species=self.species, is_for_sale=True))
+
+        self.client.force_login(self.buyer_user)
+        response = self.client.get(reverse('livestock:order_history'), {'status': 'cancelled'})
+        self.assertEqual([order.pk for order in response.context['orders']], [first.order_id])
+        response = self.client.get(reverse('livestock:order_history'), {'page': 3})
+        self.assertEqual(response.context['status_counts']['all'], 5)  # the open cart is not history
+        self.assertEqual((len(response.context['orders']), response.context['page'].number), (1, 3))
+
+        self.client.force_login(self.farmer_user)
+        response = self.client.get(reverse('livestock:sales_inquiries'), {'status': 'inquiry_sent'})
+        self.assertEqual(response.context['status_counts']['inquiry_sent'], 4)
+        self.assertIn('page=2', response.context['page'].next_url)
+
+
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        species = LivestockSpecies.objects.create(species_name='Cattle')
+        farmer = Farmer.objects.create(user=User.objects.create_user('farmer'), farm_name='Green Hills')
+        self.cow = LivestockItem.objects.create(farmer=farmer, species=species)
+        self.photo = LivestockImage.objects.create(livestock=self.cow, image=ContentFile(png(2000, 1000), 'cow.png'))
+
+    def render(self, template):
+        return Template('{% load app_filters %}' + template).render(Context({'photo': self.photo}))
+
+    def test_variants_are_resized_and_stored_per_photo(self):
+        variants = generate_variants(self.photo)
+        self.assertEqual(set(variants), {'thumb', 'card', 'large'})
+        storage = self.photo.image.storage
+        with storage.open(variants['card']['webp']) as f:
+            self.assertEqual(Image.open(f).size, (480, 240))
+        with storage.open(variants['thumb']['jpeg']) as f:
+            thumb = Image.open(f)
+            self.assertEqual((thumb.format, thumb.size), ('JPEG', (160, 80)))
+        self.assertEqual(LivestockImage.objects.get(pk=self.photo.pk).variants, variants)
+        self.assertEqual(variants['card']['webp'], f'livestock_images/variants/{self.photo.pk}/card.webp')
+
+        small = LivestockImage.objects.create(livestock=self.cow, image=ContentFile(png(100, 50), 'calf.png'))
+        with storage.open(generate_variants(small)['large']['jpeg']) as f:
+            self.assertEqual(Image.open(f).size, (100, 50))  # never upscaled
+
+    def test_urls_fall_back_to_the_original_until_generated(self):
+        self.assertEqual(self.photo.variant_url('card'), self.photo.image.url)
+        self.assertEqual(self.render("{{ photo|variant_url:'card' }}"), self.photo.image.url)
+        self.assertEqual(self.render("{% variant_picture photo 'card' alt='Cow' %}"),
+                         f'<img src="{self.photo.image.url}" alt="Cow">')
+        self.assertEqual(LivestockImageSerializer(self.photo).data['variants'], {})
+
+        generate_variants(self.photo)
+        self.assertTrue(self.photo.variant_url('card').endswith('/card.webp'))
+        picture = self.render("{% variant_picture photo 'card' alt='Cow' %}")
+        self.assertIn('<source type="image/webp" srcset="/media/livestock_images/variants/', picture)
+        self.assertRegex(picture, r'<img src="/media/livestock_images/variants/\d+/card\.jpg" alt="Cow">')
+        data = LivestockImageSerializer(self.photo).data['variants']
+        self.assertTrue(data['thumb']['jpeg'].endswith('/thumb.jpg'))
+
+    def test_variants_never_touch_other_files(self):
+        storage = self.photo.image.storage
+        # An upload whose name looks like a derivative of cow.png
+        lookalike = LivestockImage.objects.create(livestock=self.cow, image=ContentFile(png(300, 200), 'cow_thumb.jpg'))
+        self.assertEqual((self.photo.image.name, lookalike.image.name), ('livestock_images/cow.png', 'livestock_images/cow_thumb.jpg'))
+
+        first = generate_variants(self.photo)
+        with storage.open(lookalike.image.name) as f:
+            self.assertEqual(Image.open(f).size, (300, 200))
+
+        # Regenerating replaces the recorded derivatives and removes only those
+        second = generate_variants(self.photo)
+        old = {path for formats in first.values() for path in formats.values()}
+        new = {path for formats in second.values() for path in formats.values()}
+        self.assertTrue(all(storage.exists(path) for path in new))
+        self.assertFalse(any(storage.exists(path) for path in old - new))
+        self.assertTrue(storage.exists(self.photo.image.name))
+        self.assertTrue(storage.exists(lookalike.image.name))
+
+
+class PhotoUploadTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media = media.name
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        species = LivestockSpecies.objects.create(species_name='Cattle')
+        self.user = User.objects.create_user('farmer', password='pass12345')
+        farmer = Farmer.objects.create(user=self.user, farm_name='Green Hills')
+        other = Farmer.objects.create(user=User.objects.create_user('other', password='pass12345'), farm_name='Other')
+        self.cow = LivestockItem.objects.create(farmer=farmer, species=species)
+        self.neighbour_cow = LivestockItem.objects.create(farmer=other, species=species)
+
+    def files(self, count):
+        return [SimpleUploadedFile(f'cow{n}.png', png(40, 30), content_type='image/png') for n in range(count)]
+
+    def stored_files(self):
+        return [name for _, _, names in os.walk(self.media) for name in names]
+
+    def test_form_uploads_several_photos_with_csrf(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        url = reverse('livestock:add_photos', args=[self.cow.pk])
+        self.assertEqual(client.post(url, {'images': self.files(1)}).status_code, 403)
+
+        client.get(url)
+        token = client.cookies['csrftoken'].value
+        with mock.patch('livestock.views.save_uploaded_photos', wraps=save_uploaded_photos) as save:
+            response = client.post(url, {'images': self.files(3), 'csrfmiddlewaretoken': token})
+        self.assertRedirects(response, url)
+        self.assertIsInstance(save.call_args.args[1][0], TemporaryUploadedFile)  # streamed to disk, not memory
+        self.assertEqual(self.cow.images.count(), 3)
+        self.assertEqual(Job.objects.filter(task='process_livestock_image').count(), 3)
+        self.assertEqual(len(self.stored_files()), 3)
+
+    def test_api_endpoint_limits_and_ownership(self):
+        self.client.force_login(self.user)
+        with mock.patch('livestock.api_views.save_uploaded_photos', wraps=save_uploaded_photos) as save:
+            response = self.client.post(f'/api/livestock/{self.cow.pk}/photos/', {'images': self.files(2)})
+        self.assertEqual(response.status_code, 201)
+        self.assertIsInstance(save.call_args.args[1][0], TemporaryUploadedFile)
+        self.assertEqual([set(photo) for photo in response.json()], [{'id', 'image', 'variants', 'uploaded_at'}] * 2)
+
+        response = self.client.post(f'/api/livestock/{self.cow.pk}/photos/', {'images': self.files(11)})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(f'/api/livestock/{self.neighbour_cow.pk}/photos/', {'images': self.files(1)})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(LivestockImage.objects.count(), 2)
+
+    def test_failed_insert_leaves_no_files(self):
+        with mock.patch('livestock.jobs.enqueue_many', side_effect=DatabaseError("queue unavailable")):
+            with self.assertRaises(DatabaseError):
+                save_uploaded_photos(self.cow, self.files(3))
+        self.assertFalse(LivestockImage.objects.exists())
+        self.assertEqual(self.stored_files(), [])
+
+
+@task('test_succeeds')
+def succeeding_task(**payload):
+    pass
+
+
+@task('test_fails')
+def failing_task(**payload):
+    raise RuntimeError("collar photo is corrupt")
+
+
+class JobQueueTests(TestCase):
+    def test_claims_never_overlap(self):
+        jobs = enqueue_many('test_succeeds', [{'n': n} for n in range(5)])
+        first, second = claim_jobs(3), claim_jobs(3)
+        self.assertEqual((len(first), len(second)), (3, 2))
+        self.assertEqual(set(first) | set(second), {job.pk for job in jobs})
+        self.assertEqual(claim_jobs(3), [])
+        self.assertEqual(set(Job.objects.values_list('status', flat=True)), {'running'})
+
+    def test_claim_skips_rows_another_worker_took(self):
+        job = enqueue('test_succeeds')
+        # Picked by a worker between this claim's SELECT and its UPDATE
+        later = timezone.now() + timedelta(seconds=1)
+        Job.objects.filter(pk=job.pk).update(status='running', locked_at=later)
+        self.assertEqual(claim_jobs(1), [])
+        self.assertEqual(Job.objects.get(pk=job.pk).locked_at, later)
+
+    def test_future_jobs_wait(self):
+        enqueue('test_succeeds')
+        Job.objects.update(run_after=timezone.now() + timedelta(minutes=5))
+        self.assertEqual(claim_jobs(10), [])
+
+    def test_failures_back_off_then_give_up(self):
+        job = enqueue('test_fails')
+        delays = []
+        for attempt in range(job.max_attempts):
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            self.assertEqual(claim_jobs(1), [job.pk])
+            before = timezone.now()
+            if attempt + 1 < job.max_attempts:
+                status = run_job(job.pk)
+            else:
+                with self.assertLogs('livestock.jobs', 'ERROR'):
+                    status = run_job(job.pk)
+            job.refresh_from_db()
+            self.assertEqual(job.attempts, attempt + 1)
+            self.assertIn("collar photo is corrupt", job.last_error)
+            if status == 'queued':
+                delays.append(round((job.run_after - before).total_seconds()))
+                self.assertEqual(claim_jobs(1), [])  # not due yet
+        self.assertEqual(delays, [30, 60])
+        self.assertEqual(job.status, 'failed')
+        self.assertIsNotNone(job.finished_at)
+
+    def test_success_clears_the_lock(self):
+        job = enqueue('test_succeeds')
+        claim_jobs(1)
+        self.assertEqual(run_job(job.pk), 'done')
+        job.refresh_from_db()
+        self.assertEqual((job.attempts, job.locked_at, job.last_error), (1, None, None))
+
+    @override_settings(JOB_LOCK_TIMEOUT=60)
+    def test_jobs_of_a_dead_worker_are_requeued(self):
+        crashed, busy = enqueue('test_succeeds'), enqueue('test_succeeds')
+        Job.objects.filter(pk=crashed.pk).update(status='running', locked_at=timezone.now() - timedelta(minutes=5))
+        Job.objects.filter(pk=busy.pk).update(status='running', locked_at=timezone.now() - timedelta(seconds=10))
+        self.assertEqual(claim_jobs(10), [crashed.pk])
+        self.assertEqual(Job.objects.get(pk=crashed.pk).attempts, 1)
+
+    @override_settings(JOB_LOCK_TIMEOUT=60)
+    def test_job_that_keeps_killing_its_worker_gives_up(self):
+        job = enqueue('test_succeeds')
+        for attempt in range(job.max_attempts):
+            self.assertEqual(claim_jobs(1), [job.pk])
+            # The worker dies: the lease just runs out
+            Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(minutes=5))
+            if attempt + 1 < job.max_attempts:
+                continue
+            with self.assertLogs('livestock.jobs', 'ERROR'):
+                self.assertEqual(claim_jobs(1), [])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.locked_at), ('failed', job.max_attempts, None))
+        self.assertIsNotNone(job.finished_at)
+
+
+class LivestockListSerializerTests(TestCase):
+    def test_matches_model_serializer_output(self):
+        user = User.objects.create_user('farmer', password='pass12345')
+        farmer = Farmer.objects.create(user=user, farm_name='Green Hills', farm_location='Musanze')
+        species = LivestockSpecies.objects.create(species_name='Cattle')
+        breed = Breed.objects.create(species=species, breed_name='Ankole')
+        with_breed = LivestockItem.objects.create(
+            farmer=farmer, species=species, breed=breed, price=150000, weight=310.5, is_for_sale=True,
+        )
+        LivestockImage.objects.create(livestock=with_breed, image='livestock_images/cow.jpg')
+        LivestockItem.objects.create(farmer=farmer, species=species, is_for_sale=True)
+
+        queryset = api_listings().order_by('pk')
+        expected = [dict(row) for row in LivestockItemSerializer(queryset, many=True).data]
+        self.assertEqual(list(LivestockItemListSerializer(queryset, many=True).data), expected)
+
+        with self.assertNumQueries(2):
+            LivestockItemListSerializer(api_listings().order_by('pk'), many=True).data
+
+
+class ConditionalRequestTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('farmer', password='pass12345')
+        self.farmer = Farmer.objects.create(user=user, farm_name='Green Hills')
+        self.species = LivestockSpecies.objects.create(species_name='Cattle')
+        self.item = LivestockItem.objects.create(farmer=self.farmer, species=self.species, is_for_sale=True)
+
+    def assert_revalidates(self, url):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        etag = first['ETag']
+
+        with self.assertNumQueries(0):
+            unchanged = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(unchanged.status_code, 304)
+
+        self.item.price = 90000
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.save()
+            # Not bumped before the commit: a page rendered now would show the old row
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_api_list(self):
+        self.assert_revalidates('/api/livestock/')
+
+    def test_api_list_ignores_if_modified_since(self):
+        # Wishlist flags are per user: a global modification date would hide them changing
+        user = User.objects.create_user('buyer', password='pass12345')
+        UserProfile.objects.create(user=user, user_type='buyer')
+        buyer = Buyer.objects.create(user=user)
+        self.client.force_login(user)
+        self.assertNotIn('Last-Modified', self.client.get('/api/livestock/'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            update_wishlist(buyer, add=[self.item.pk])
+        response = self.client.get('/api/livestock/', HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['results'][0]['in_wishlist'])
+
+    def test_marketplace(self):
+        self.assert_revalidates(reverse('livestock:marketplace'))
+
+    def test_cart_change_invalidates_buyer_etag(self):
+        user = User.objects.create_user('buyer', password='pass12345')
+        UserProfile.objects.create(user=user, user_type='buyer')
+        buyer = Buyer.objects.create(user=user)
+        self.client.force_login(user)
+        url = reverse('livestock:marketplace')
+        etag = self.client.get(url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cart.add_item(buyer, self.item)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_relogin_does_not_revalidate_a_stale_csrf_token(self):
+        client = Client(enforce_csrf_checks=True)
+        url = reverse('livestock:marketplace')
+
+        def post(path, data=None):
+            client.get(reverse('login'))
+            token = client.cookies['csrftoken'].value
+            return client.post(path, dict(data or {}, csrfmiddlewaretoken=token))
+
+        post(reverse('login'), {'username': 'farmer', 'password': 'pass12345'})
+        etag = client.get(url)['ETag']
+        post(reverse('logout'))
+        post(reverse('login'), {'username': 'farmer', 'password': 'pass12345'})
+
+        # The cached page holds the pre-login token: it must be re-rendered
+        self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_deploy_check_wants_a_shared_cache(self):
+        self.assertEqual([w.id for w in check_shared_cache(None)], ['livestock.W001'])
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://cache'}}
+        with self.settings(CACHES=redis):
+            self.assertEqual(check_shared_cache(None), [])
+
+    def test_etag_depends_on_query_string(self):
+        etag = self.client.get('/api/livestock/')['ETag']
+        response = self.client.get('/api/livestock/?page_size=1', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class TelemetryIngestTests(TestCase):
+    def setUp(self):
+        species = LivestockSpecies.objects.create(species_name='Cattle')
+        self.user = User.objects.create_user('farmer', password='pass12345')
+        farmer = Farmer.objects.create(user=self.user, farm_name='Green Hills')
+        other = Farmer.objects.create(user=User.objects.create_user('other', password='pass12345'), farm_name='Other')
+        self.cow = LivestockItem.objects.create(farmer=farmer, species=species, tag_id='RW-1')
+        self.neighbour_cow = LivestockItem.objects.create(farmer=other, species=species, tag_id='RW-2')
+        self.client.login(username='farmer', password='pass12345')
+
+    def post(self, body, content_type='application/json'):
+        return self.client.post('/api/telemetry/ingest/', body, content_type=content_type)
+
+    def test_only_farmers_post_for_their_own_herd(self):
+        response = self.post([{'tag_id': 'RW-1', 'temperature': 38.5}, {'tag_id': 'RW-2', 'temperature': 41.0}])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 1)
+        self.assertEqual(response.json()['rejected'], [{'index': 1, 'error': "Unknown tag_id: RW-2"}])
+        self.assertFalse(IoTDeviceData.objects.filter(livestock=self.neighbour_cow).exists())
+
+        User.objects.create_user('buyer', password='pass12345')
+        self.client.login(username='buyer', password='pass12345')
+        self.assertEqual(self.post({'tag_id': 'RW-2'}).status_code, 403)
+        self.client.logout()
+        self.assertIn(self.post({'tag_id': 'RW-2'}).status_code, (401, 403))
+
+    def test_body_shape(self):
+        self.assertEqual(self.post('42').status_code, 400)
+        self.assertEqual(self.post('"RW-1"').status_code, 400)
+        response = self.post([7, {'tag_id': ['RW-1']}, {'tag_id': 'RW-1', 'temperature': 'hot'}])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([r['index'] for r in response.json()['rejected']], [0, 1, 2])
+
+        ndjson = '{"tag_id": "RW-1", "temperature": 38.5}\n\n{"tag_id": "RW-1", "temperature": 38.6}\n'
+        self.assertEqual(self.post(ndjson, 'application/x-ndjson').json()['created'], 2)
+        self.assertEqual(self.post('{"tag_id": "RW-1"}\nnot json\n', 'application/x-ndjson').status_code, 400)
+        self.assertEqual(IoTDeviceData.objects.count(), 2)  # the broken NDJSON batch was rolled back
+
+    def test_readings_are_inserted_in_batches(self):
+        readings = [{'tag_id': 'RW-1', 'temperature': 38.0 + n / 10} for n in range(5)]
+        with self.settings(TELEMETRY_INGEST_BATCH_SIZE=2), CaptureQueriesContext(connection) as queries:
+            response = self.post(readings)
+        inserts = [q for q in queries if q['sql'].startswith('INSERT') and 'iotdevicedata' in q['sql']]
+        self.assertEqual(response.json()['created'], 5)
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(IoTDeviceData.objects.filter(livestock=self.cow).count(), 5)
+
+
+class AlertEngineTests(TestCase):
+    def setUp(self):
+        species = LivestockSpecies.objects.create(species_name='Cattle')
+        farmer = Farmer.objects.create(user=User.objects.create_user('farmer'), farm_name='Green Hills')
+        self.cow = LivestockItem.objects.create(farmer=farmer, species=species)
+        self.start = timezone.now() - timedelta(hours=2)
+
+    def readings(self, temperatures, every_seconds, **extra):
+        return [
+            IoTDeviceData(
+                livestock=self.cow, timestamp=self.start + timedelta(seconds=n * every_seconds),
+                temperature=temperature, **extra,
+            )
+            for n, temperature in enumerate(temperatures)
+        ]
+
+    def alert_types(self, alerts):
+        return sorted(alert.alert_type for alert in alerts)
+
+    def test_sensor_noise_between_close_readings_is_not_a_rise(self):
+        noisy = [38.5 + (0.002 if n % 2 else 0) for n in range(720)]  # an hour at one reading per 5 s
+        self.assertEqual(AlertEngine().process(self.readings(noisy, 5)), [])
+
+    def test_sustained_rise_and_fever(self):
+        engine = AlertEngine()
+        rising = [38.0 + n * 0.04 for n in range(31)]  # 1.2 degrees over 30 minutes
+        self.assertEqual(self.alert_types(engine.process(self.readings(rising, 60))), ['Rapid Temperature Rise'])
+
+        # Still rising and now feverish, but the open rise alert is not repeated
+        later = IoTDeviceData(livestock=self.cow, timestamp=self.start + timedelta(minutes=31), temperature=39.6)
+        self.assertEqual(self.alert_types(engine.process([later])), ['Fever'])
+
+    def test_inactivity_and_low_battery(self):
+        engine = AlertEngine()
+        idle = self.readings([38.5] * 19, 600, activity_level=1.0, battery_level=50.0)  # 3 hours idle
+        self.assertEqual(self.alert_types(engine.process(idle)), ['Inactivity'])
+        flat = IoTDeviceData(livestock=self.cow, timestamp=timezone.now(), activity_level=40.0, battery_level=10.0)
+        self.assertEqual(self.alert_types(engine.process([flat])), ['Low Battery'])
+
+    def test_sweep_checks_the_table_before_raising_no_signal(self):
+        engine = AlertEngine()
+        engine.process(self.readings([38.5], 60))
+        # Another process ingested a newer reading this engine never saw
+        IoTDeviceData.objects.create(livestock=self.cow, timestamp=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(engine.sweep(), [])
+
+        later = timezone.now() + timedelta(hours=1)
+        self.assertEqual(self.alert_types(engine.sweep(later)), ['No Signal'])
+        self.assertEqual(engine.sweep_if_due(later + timedelta(seconds=10)), [])  # throttled
+        self.assertEqual(engine.sweep(later + timedelta(minutes=5)), [])  # alert still open
+
+
+class TelemetryExportTests(TestCase):
+    def setUp(self):
+        species = LivestockSpecies.objects.create(species_name='Cattle')
+        self.user = User.objects.create_user('farmer', password='pass12345')
+        farmer = Farmer.objects.create(user=self.user, farm_name='Green Hills')
+        other = Farmer.objects.create(user=User.objects.create_user('other', password='pass12345'), farm_name='Other')
+        self.cow = LivestockItem.objects.create(farmer=farmer, species=species)
+        self.neighbour_cow = LivestockItem.objects.create(farmer=other, species=species)
+
+        now = timezone.now()
+        for minutes in range(5):
+            IoTDeviceData.objects.create(
+                livestock=self.cow, timestamp=now - timedelta(minutes=minutes),
+                latitude='-1.944100', longitude='30.061900', temperature=38.5, device_type='collar',
+            )
+        IoTDeviceData.objects.create(livestock=self.neighbour_cow, temperature=39.0)
+        self.client.login(username='farmer', password='pass12345')
+
+    def rows(self, response):
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        return [line.split(',') for line in lines]
+
+    def test_csv_is_streamed_in_chunks(self):
+        with self.settings(TELEMETRY_EXPORT_CHUNK_SIZE=2):
+            response = self.client.get('/api/telemetry/export/')
+            chunks = list(response.streaming_content)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(len(chunks), 3)
+
+    def test_farmers_only_export_their_own_animals(self):
+        rows = self.rows(self.client.get('/api/telemetry/export/'))
+        self.assertEqual(rows[0][:3], ['data_id', 'livestock_id', 'timestamp'])
+        self.assertEqual({row[1] for row in rows[1:]}, {str(self.cow.pk)})
+        self.assertEqual(len(rows), 6)
+
+        response = self.client.get(f'/api/telemetry/export/?livestock={self.neighbour_cow.pk}')
+        self.assertEqual(response.status_code, 403)
+
+    def test_date_range_and_command(self):
+        rows = self.rows(self.client.get('/api/telemetry/export/?start=2000-01-01&end=2000-02-01'))
+        self.assertEqual(len(rows), 1)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'export.csv')
+            call_command('export_telemetry', livestock=str(self.neighbour_cow.pk), output=path, stderr=StringIO())
+            with open(path) as exported:
+                self.assertEqual(len(exported.read().splitlines()), 2)
+
+
+@override_settings(TELEMETRY_SETTLE_SECONDS=0)  # rows count as committed at once
+class HerdHealthTests(TestCase):
+    def setUp(self):
+        species = LivestockSpecies.objects.create(species_name='Cattle')
+        self.user = User.objects.create_user('farmer', password='pass12345')
+        UserProfile.objects.create(user=self.user, user_type='farmer')
+        self.farmer = Farmer.objects.create(user=self.user, farm_name='Green Hills')
+        self.cows = [
+            LivestockItem.objects.create(farmer=self.farmer, species=species, tag_id=f'RW-{n}') for n in range(4)
+        ]
+        healthy, feverish, idle, flat_collar = self.cows
+
+        # Two days of hourly readings; the feverish cow spikes over the last 3 hours
+        now = timezone.now()
+        rows = []
+        for hour in range(48):
+            at = now - timedelta(hours=hour, minutes=1)
+            for cow in self.cows:
+                temperature = 38.5 + (hour % 3) * 0.1
+                if cow is feverish and hour < 3:
+                    temperature = 40.5
+                rows.append(IoTDeviceData(
+                    livestock=cow, timestamp=at, temperature=temperature,
+                    activity_level=10.0 if cow is idle else 50.0,
+                    battery_level=20 - (48 - hour) * 0.4 if cow is flat_collar else 90.0,
+                ))
+        IoTDeviceData.objects.bulk_create(rows)
+        refresh_rollups()
+
+    def test_flags_follow_the_telemetry(self):
+        report = get_herd_health(self.farmer, days=7)
+        animals = {animal['tag_id']: animal for animal in report['animals']}
+
+        self.assertEqual(report['herd']['readings'], 4 * 48)
+        self.assertFalse(animals['RW-0']['flagged'])
+        self.assertTrue(animals['RW-1']['temperature_flag'])
+        self.assertTrue(animals['RW-2']['activity_drop'])
+        self.assertAlmostEqual(animals['RW-3']['battery_drain_per_day'], 9.6, places=3)
+        self.assertTrue(animals['RW-3']['battery_warning'])
+        self.assertEqual({a['tag_id'] for a in report['animals'][:3]}, {'RW-1', 'RW-2', 'RW-3'})
+
+    def test_reads_rollups_not_raw_readings(self):
+        with CaptureQueriesContext(connection) as queries:
+            get_herd_health(self.farmer, days=7, refresh=True)
+        self.assertFalse(any('livestock_iotdevicedata' in query['sql'] for query in queries.captured_queries))
+
+        # Means weigh each hour by its readings
+        cow = self.cows[0]
+        hour = TelemetryHourRollup.objects.filter(livestock=cow).latest('bucket_start')
+        IoTDeviceData.objects.bulk_create([
+            IoTDeviceData(livestock=cow, timestamp=hour.bucket_start + timedelta(seconds=n), temperature=39.0)
+            for n in range(3)
+        ])
+        refresh_rollups()
+        report = get_herd_health(self.farmer, days=7, refresh=True)
+        animal = next(a for a in report['animals'] if a['tag_id'] == 'RW-0')
+        self.assertEqual(animal['readings'], 48 + 3)
+        self.assertEqual(animal['latest_temperature'], round((38.5 + 39.0 * 3) / 4, 3))
+
+    def test_api_and_dashboard(self):
+        self.client.login(username='farmer', password='pass12345')
+        response = self.client.get('/api/herd-health/?days=7')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['herd']['flagged_animals'], 3)
+
+        self.assertContains(self.client.get(reverse('dashboard')), 'Herd Health')
+
+        User.objects.create_user('buyer', password='pass12345')
+        self.client.login(username='buyer', password='pass12345')
+        self.assertEqual(self.client.get('/api/herd-health/').status_code, 403)
+
+
+class LiveFeedTests(TestCase):
+    def setUp(self):
+        species = LivestockSpecies.objects.create(species_name='Cattle')
+        self.farmers = []
+        self.cows = []
+        for name in ('north', 'south'):
+            user = User.objects.create_user(name, password='pass12345')
+            farmer = Farmer.objects.create(user=user, farm_name=name)
+            self.farmers.append(farmer)
+            self.cows.append(LivestockItem.objects.create(farmer=farmer, species=species, tag_id=f'{name}-1'))
+
+    def test_one_poll_serves_every_dashboard(self):
+        broker = LocalBroker()
+        feed = LiveFeed(broker)
+        north, south = self.farmers
+        north_tabs = [broker.subscribe(north.pk), broker.subscribe(north.pk)]
+        south_tab = broker.subscribe(south.pk)
+        feed.start_from_now()
+
+        for minutes in (3, 2, 1):
+            IoTDeviceData.objects.create(
+                livestock=self.cows[0], latitude='-1.500000', longitude='29.600000',
+                timestamp=timezone.now() - timedelta(minutes=minutes),
+            )
+        Alert.objects.create(farmer=south, livestock=self.cows[1], alert_type='Fever', severity='critical')
+
+        with self.assertNumQueries(2):
+            events = feed.poll(broker.channels())
+        for farmer_id, event in events:
+            broker.publish(farmer_id, event)
+
+        for tab in north_tabs:
+            self.assertEqual(tab.qsize(), 1)  # only the newest fix per animal
+            self.assertEqual(tab.get_nowait()['type'], 'position')
+        self.assertEqual(south_tab.get_nowait()['data']['alert_type'], 'Fever')
+        self.assertEqual(feed.poll(broker.channels()), [])
+
+    @override_settings(TELEMETRY_SETTLE_SECONDS=0)
+    def test_watermark_passes_unwatched_rows(self):
+        feed = LiveFeed(LocalBroker())
+        feed.start_from_now()
+        north, south = self.farmers
+        reading = IoTDeviceData.objects.create(livestock=self.cows[1], timestamp=timezone.now())
+        alert = Alert.objects.create(farmer=south, livestock=self.cows[1], alert_type='Fever', severity='critical')
+
+        self.assertEqual(feed.poll({north.pk}), [])
+        self.assertEqual((feed.last_data_id, feed.last_alert_id), (reading.pk, alert.pk))
+
+    def test_lower_id_committed_late_is_still_sent(self):
+        feed = LiveFeed(LocalBroker())
+        feed.start_from_now()
+        north = self.farmers[0]
+        pending = IoTDeviceData.objects.create(livestock=self.cows[0], timestamp=timezone.now())
+        pending_id = pending.pk
+        pending.delete()
+        later = IoTDeviceData.objects.create(livestock=self.cows[0], timestamp=timezone.now())
+        self.assertEqual([event['id'] for _, event in feed.poll({north.pk})], [f'p{later.pk}'])
+
+        IoTDeviceData.objects.create(data_id=pending_id, livestock=self.cows[0], timestamp=timezone.now())
+        self.assertEqual([event['id'] for _, event in feed.poll({north.pk})], [f'p{pending_id}'])
+        self.assertEqual(feed.poll({north.pk}), [])
+
+    async def test_poller_survives_a_failed_poll(self):
+        feed = LiveFeed(LocalBroker(), interval=0.01)
+        north = self.farmers[0]
+        event = {'id': 'a1', 'type': 'alert', 'data': {'alert_type': 'Fever'}}
+        results = iter([DatabaseError("connection lost"), [(north.pk, event)]])
+
+        def poll(farmer_ids):
+            result = next(results, [])
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        with mock.patch.object(feed, 'poll', side_effect=poll), self.assertLogs('livestock.live', 'ERROR'):
+            queue = feed.subscribe(north.pk)
+            self.assertEqual(await asyncio.wait_for(queue.get(), timeout=5), event)
+            task = feed.task
+            feed.broker.unsubscribe(north.pk, queue)
+            await task
+
+    async def test_restarted_poller_starts_from_now(self):
+        feed = LiveFeed(LocalBroker(), interval=0.01)
+        north = self.farmers[0]
+        queue = feed.subscribe(north.pk)
+        await asyncio.sleep(0.05)
+        feed.broker.unsubscribe(north.pk, queue)
+        while feed.task is not None:
+            await asyncio.sleep(0.01)
+
+        # Arrives while no dashboard is open: the next one must not replay it
+        await IoTDeviceData.objects.acreate(livestock_id=self.cows[0].pk, timestamp=timezone.now())
+        queue = feed.subscribe(north.pk)
+        task = feed.task
+        await asyncio.sleep(0.05)
+        feed.broker.unsubscribe(north.pk, queue)
+        await task
+        self.assertTrue(queue.empty())
+
+    async def test_stream_pushes_events(self):
+        user = await User.objects.aget(username='north')
+        await self.async_client.aforce_login(user)
+        response = await self.async_client.get(reverse('livestock:live_events'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        stream = aiter(response.streaming_content)
+        self.assertTrue((await anext(stream)).startswith(b'retry:'))
+        get_feed().broker.publish(self.farmers[0].pk, {'id': 'a1', 'type': 'alert', 'data': {'alert_type': 'Fever'}})
+        self.assertEqual(await anext(stream), b'id: a1\nevent: alert\ndata: {"alert_type": "Fever"}\n\n')
+        await stream.aclose()
+
+    def test_only_farmers_get_a_feed(self):
+        User.objects.create_user('buyer', password='pass12345')
+        self.client.login(username='buyer', password='pass12345')
+        self.assertEqual(self.client.get(reverse('livestock:live_events')).status_code, 403)
+
+
+class HerdMapTests(TestCase):
+    def setUp(self):
+        species = LivestockSpecies.objects.create(species_name='Cattle')
+        self.user = User.objects.create_user('farmer', password='pass12345')
+        self.farmer = Farmer.objects.create(user=self.user, farm_name='Green Hills')
+        self.cows = [
+            LivestockItem.objects.create(farmer=self.farmer, species=species, tag_id=f'RW-{n}') for n in range(3)
+        ]
+        now = timezone.now()
+        ingest_readings([
+            {'tag_id': 'RW-0', 'latitude': -1.9500, 'longitude': 30.0600, 'timestamp': now.isoformat()},
+            {'tag_id': 'RW-1', 'latitude': -1.9520, 'longitude': 30.0630, 'timestamp': now.isoformat()},
+            {'tag_id': 'RW-2', 'latitude': -1.5000, 'longitude': 29.6000, 'timestamp': now.isoformat()},
+            # A late upload must not move RW-0 back to where it was an hour ago
+            {'tag_id': 'RW-0', 'latitude': -1.0, 'longitude': 29.0, 'timestamp': (now - timedelta(hours=1)).isoformat()},
+        ])
+        self.client.login(username='farmer', password='pass12345')
+
+    def test_ingest_keeps_latest_position(self):
+        self.assertEqual(LivestockPosition.objects.count(), 3)
+        position = LivestockPosition.objects.get(livestock=self.cows[0])
+        self.assertEqual(float(position.latitude), -1.95)
+        self.assertEqual(position.geohash, encode_geohash(-1.95, 30.06))
+
+    def test_backfill_migration_hashes_like_the_app(self):
+        migration = import_module('livestock.migrations.0013_livestock_position_geofence')
+        for latitude, longitude in [(-1.95, 30.06), (0, 0), (89.9, -179.9), (-45.123456, 170.5)]:
+            self.assertEqual(migration.encode_geohash(latitude, longitude), encode_geohash(latitude, longitude))
+
+    def test_bbox_matches_a_full_scan(self):
+        for south, west, north, east in [(-2, 30, -1.9, 30.1), (-1.96, 30.059, -1.951, 30.07), (-3, 29, 0, 31)]:
+            expected = {
+                p.pk for p in LivestockPosition.objects.all()
+                if south <= p.latitude <= north and west <= p.longitude <= east
+            }
+            found = set(within_bbox(LivestockPosition.objects.all(), south, west, north, east).values_list('pk', flat=True))
+            self.assertEqual(found, expected)
+        self.assertLessEqual(len(covering_cells(-3, 29, 0, 31)), 16)
+
+    def test_herd_map_api(self):
+        response = self.client.get('/api/herd-map/?bbox=30.0,-2.0,30.1,-1.9')
+        tags = [feature['properties']['tag_id'] for feature in response.json()['features']]
+        self.assertEqual(sorted(tags), ['RW-0', 'RW-1'])
+        self.assertEqual(len(self.client.get('/api/herd-map/').json()['features']), 3)
+
+        response = self.client.get('/api/herd-map/nearest/?lat=-1.9521&lon=30.0631&limit=2')
+        features = response.json()['features']
+        self.assertEqual([f['properties']['tag_id'] for f in features], ['RW-1', 'RW-0'])
+        self.assertLess(features[0]['properties']['distance_km'], features[1]['properties']['distance_km'])
+
+    def test_polygon_geofence(self):
+        Geofence.objects.create(
+            farmer=self.farmer, name='Paddock',
+            polygon=[[-1.96, 30.05], [-1.96, 30.07], [-1.94, 30.07], [-1.94, 30.05]],
+        )
+        inside = IoTDeviceData(livestock=self.cows[0], latitude=-1.95, longitude=30.06, timestamp=timezone.now())
+        outside = IoTDeviceData(livestock=self.cows[1], latitude=-1.90, longitude=30.06, timestamp=timezone.now())
+        alerts = AlertEngine().process([inside, outside])
+        self.assertEqual([(a.livestock_id, a.alert_type) for a in alerts], [(self.cows[1].pk, 'Geofence Exit')])
+
+
+@override_settings(TELEMETRY_SETTLE_SECONDS=0)  # rows count as committed at once
+class TelemetryRollupTests(TestCase):
+    def setUp(self):
+        species = LivestockSpecies.objects.create(species_name='Cattle')
+        farmer = Farmer.objects.create(user=User.objects.create_user('farmer'), farm_name='Green Hills')
+        self.cow, self.calf = (LivestockItem.objects.create(farmer=farmer, species=species) for _ in range(2))
+        self.hour = (timezone.localtime() - timedelta(days=1)).replace(hour=6, minute=0, second=0, microsecond=0)
+
+    def reading(self, cow, minutes, temperature=None, **extra):
+        return IoTDeviceData.objects.create(
+            livestock=cow, timestamp=self.hour + timedelta(minutes=minutes), temperature=temperature, **extra,
+        )
+
+    def test_buckets_match_the_raw_readings(self):
+        self.reading(self.cow, 1, 38.0, latitude='-1.950000', longitude='30.060000')
+        self.reading(self.cow, 1.5, 39.0)
+        self.reading(self.cow, 2, None, latitude='-1.951000', longitude='30.061000')
+        self.reading(self.calf, 3, 40.0)
+        self.assertEqual(refresh_rollups(), 4)
+
+        minute = TelemetryMinuteRollup.objects.get(livestock=self.cow, bucket_start=self.hour + timedelta(minutes=1))
+        self.assertEqual((minute.reading_count, minute.temperature_count), (2, 2))
+        self.assertEqual((minute.temperature_min, minute.temperature_max, minute.temperature_avg), (38.0, 39.0, 38.5))
+        self.assertEqual(float(minute.last_latitude), -1.95)
+
+        hour = TelemetryHourRollup.objects.get(livestock=self.cow)
+        self.assertEqual((hour.reading_count, hour.temperature_count, hour.temperature_avg), (3, 2, 38.5))
+        self.assertEqual(float(hour.last_latitude), -1.951)
+        self.assertEqual(TelemetryMinuteRollup.objects.count(), 3)
+        self.assertEqual(TelemetryDayRollup.objects.count(), 2)
+
+    @override_settings(TELEMETRY_SETTLE_SECONDS=60)
+    def test_checkpoint_waits_for_ids_still_committing(self):
+        # An ingest transaction takes an id, and one that starts later commits first
+        pending = self.reading(self.cow, 5, 38.0)
+        pending_id = pending.pk
+        pending.delete()
+        self.reading(self.cow, 6, 40.0)
+        self.assertEqual(refresh_rollups(), 0)
+
+        IoTDeviceData.objects.create(data_id=pending_id, livestock=self.cow, timestamp=self.hour + timedelta(minutes=5), temperature=38.0)
+        IoTDeviceData.objects.update(received_at=timezone.now() - timedelta(minutes=2))
+        self.assertEqual(refresh_rollups(), 2)
+        hour = TelemetryHourRollup.objects.get(livestock=self.cow)
+        self.assertEqual((hour.reading_count, hour.temperature_avg), (2, 39.0))
+
+    def test_late_reading_only_touches_its_own_bucket(self):
+        self.reading(self.cow, 10, 38.0)
+        self.reading(self.cow, 70, 38.0, latitude='-1.950000', longitude='30.060000')
+        self.reading(self.calf, 10, 39.0)
+        refresh_rollups()
+        # Marks the rows a rebuild of the whole window would overwrite
+        TelemetryHourRollup.objects.filter(livestock=self.calf).update(reading_count=99)
+        TelemetryHourRollup.objects.filter(livestock=self.cow, bucket_start=self.hour + timedelta(hours=1)).update(
+            reading_count=99,
+        )
+
+        # Late upload for the first hour, plus a new reading for the calf much later
+        self.reading(self.cow, 20, 41.0, latitude='-1.000000', longitude='29.000000')
+        self.reading(self.calf, 300, 39.0)
+        self.assertEqual(refresh_rollups(), 2)
+
+        first = TelemetryHourRollup.objects.get(livestock=self.cow, bucket_start=self.hour)
+        self.assertEqual((first.reading_count, first.temperature_max, first.temperature_avg), (2, 41.0, 39.5))
+        self.assertEqual(float(first.last_latitude), -1.0)
+        self.assertEqual(
+            set(TelemetryHourRollup.objects.filter(reading_count=99).values_list('livestock_id', flat=True)),
+            {self.cow.pk, self.calf.pk},
+        )
+        # The day bucket kept its earlier fix: the late reading is older than it
+        day = TelemetryDayRollup.objects.get(livestock=self.cow, bucket_start=self.hour.replace(hour=0))
+        self.assertEqual((day.reading_count, float(day.last_latitude)), (3, -1.95))
+
+
+@override_settings(TELEMETRY_SETTLE_SECONDS=0)  # rows count as committed at once
+class TelemetryRetentionTests(TestCase):
+    def setUp(self):
+        species = LivestockSpecies.objects.create(species_name='Cattle')
+        farmer = Farmer.objects.create(user=User.objects.create_user('farmer'), farm_name='Green Hills')
+        self.cow = LivestockItem.objects.create(farmer=farmer, species=species)
+        self.now = timezone.now()
+        # 120, 100, then 10 days old; a late upload of a 200-day-old reading comes last
+        for days in (120, 100, 10, 200):
+            IoTDeviceData.objects.create(livestock=self.cow, timestamp=self.now - timedelta(days=days), temperature=38.5)
+
+    def test_expired_readings_are_rolled_up_archived_and_deleted(self):
+        with tempfile.TemporaryDirectory() as archive:
+            with self.settings(TELEMETRY_ARCHIVE_DIR=archive):
+                summary = apply_retention(now=self.now)
+
+            files = sorted(glob.glob(os.path.join(archive, '*', '*', '*', 'telemetry-*.csv.gz')))
+            self.assertEqual(len(files), 2)
+            with gzip.open(files[0], 'rt') as handle:
+                rows = list(csv.reader(handle))
+            self.assertEqual(rows[0][:3], ['data_id', 'livestock_id', 'timestamp'])
+            self.assertEqual(len(rows), 2)
+
+        self.assertEqual(summary['deleted_readings'], 2)
+        # The walk stops at the first reading still in retention; the late one waits for the next run
+        remaining = sorted((self.now - ts).days for ts in IoTDeviceData.objects.values_list('timestamp', flat=True))
+        self.assertEqual(remaining, [10, 200])
+
+        # Downsampled before deletion: old days survive as day/hour rollups, minutes are pruned
+        self.assertEqual(TelemetryDayRollup.objects.count(), 4)
+        self.assertEqual(TelemetryHourRollup.objects.count(), 4)
+        self.assertEqual(TelemetryMinuteRollup.objects.count(), 1)
+        self.assertEqual(summary['deleted_rollups']['minute'], 3)
+
+    def test_late_reading_for_a_purged_bucket_keeps_the_rollup(self):
+        with tempfile.TemporaryDirectory() as archive:
+            with self.settings(TELEMETRY_ARCHIVE_DIR=archive):
+                apply_retention(now=self.now)
+        old = self.now - timedelta(days=120)
+        hour = TelemetryHourRollup.objects.get(bucket_start__lte=old, bucket_start__gt=old - timedelta(hours=1))
+        self.assertFalse(IoTDeviceData.objects.filter(timestamp__gte=hour.bucket_start, timestamp__lte=old).exists())
+
+        IoTDeviceData.objects.create(livestock=self.cow, timestamp=hour.bucket_start, temperature=40.5)
+        refresh_rollups()
+
+        hour.refresh_from_db()
+        day = TelemetryDayRollup.objects.get(bucket_start__lte=old, bucket_start__gt=old - timedelta(days=1))
+        for rollup in (hour, day):
+            self.assertEqual((rollup.reading_count, rollup.temperature_count), (2, 2))
+            self.assertAlmostEqual(rollup.temperature_avg, 39.5)
+            self.assertEqual((rollup.temperature_min, rollup.temperature_max), (38.5, 40.5))
@@ -28,6 +28,7 @@ urlpatterns = [
     path('sales/', views.sales_inquiries, name='sales_inquiries'),     # For Farmers
     path('inquiry/<int:pk>/approve/', views.approve_inquiry, name='approve_inquiry'),
     path('inquiry/<int:pk>/reject/', views.reject_inquiry, name='reject_inquiry'),
+    path('inquiries/bulk/', views.bulk_inquiries, name='bulk_inquiries'),
     
     # NEW: Retry Payment Path
     path('order/<int:pk>/pay/', views.retry_payment, name='retry_payment'),
@@ -39,4 +40,7 @@ urlpatterns = [
     path('edit/<int:pk>/', views.livestock_edit, name='livestock_edit'),
     path('delete/<int:pk>/', views.livestock_delete, name='livestock_delete'),
 
+    # --- Live dashboard feed (SSE) ---
+    path('live/', views.live_events, name='live_events'),
+
 ]
\ No newline at end of file
@@ -2,16 +2,36 @@
 
 import requests
 import uuid
+from functools import wraps
 from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from .forms import LivestockItemForm, LivestockImageForm, SimpleOrderForm, CheckoutContactForm
 from .models import LivestockItem, LivestockImage, Order, OrderItem
-from django.http import JsonResponse
-from livestock.models import Wishlist, Order, OrderItem
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from livestock.models import Order, OrderItem
 from decimal import Decimal, InvalidOperation
+from django.db.models import Prefetch
 from livestock.models import LivestockItem, LivestockSpecies   
+from .queries import (
+    HISTORY_STATUSES, buyer_orders, buyer_status_counts, farmer_inquiries, farmer_status_counts,
+    marketplace_listings, order_lines,
+)
+from .pagination import keyset_paginate, numbered_page, KeysetPage, InvalidCursor
+from .search import search_listings
+from . import cart, inquiries
+from .images import save_uploaded_photos, stream_uploads_to_disk
+from .conditional import listings_etag
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.decorators.http import condition
+from .facets import get_marketplace_facets
+from .live import get_feed
+from .context_processors import buyer_id_for
+from .detail_cache import get_listing
+from .wishlist import get_wishlist_ids, update_wishlist, with_wishlist_flag
+from accounts.models import Farmer
 
 
 # 1. CREATE BASIC INFO
@@ -34,17 +54,31 @@ def livestock_create(request):
     return render(request, 'add_livestock.html', {'form': form})
 
 # 2. ADD PHOTOS VIEW
+def uploads_to_disk(view):
+    """
+    Streams the view's uploads to temp files (see images.stream_uploads_to_disk).
+    The upload handlers have to be swapped before the CSRF check reads the
+    POST body, so the check runs inside, after the swap.
+    """
+    @csrf_exempt
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        stream_uploads_to_disk(request)
+        return csrf_protect(view)(request, *args, **kwargs)
+    return wrapped
+
+
 @login_required
+@uploads_to_disk
 def add_photos(request, pk):
     livestock = get_object_or_404(LivestockItem, pk=pk, farmer=request.user.farmer_profile)
     
     if request.method == 'POST':
         form = LivestockImageForm(request.POST, request.FILES)
         if form.is_valid():
-            photo = form.save(commit=False)
-            photo.livestock = livestock
-            photo.save()
-            messages.success(request, "Photo uploaded successfully!")
+            # All selected photos are stored and recorded in one go
+            photos = save_uploaded_photos(livestock, form.cleaned_data['images'])
+            messages.success(request, f"{len(photos)} photo(s) uploaded successfully!")
             return redirect('livestock:add_photos', pk=pk) 
     else:
         form = LivestockImageForm()
@@ -63,24 +97,14 @@ def upload_success(request):
     return render(request, 'upload_success.html')
 
 # 4. MARKETPLACE VIEW
+# ETag only: the page carries per-user parts, so no shared Last-Modified
+@condition(etag_func=listings_etag)
 def marketplace(request):
-    # base queryset: only available + for sale
-    listings = LivestockItem.objects.filter(status="available", is_for_sale=True)
-
-    # species choices for the dropdown (distinct species that actually exist in listings)
-    species_qs = LivestockSpecies.objects.filter(
-        livestock_items__in=listings   # use the correct related_name
-    ).distinct()
-
+    # base queryset: only available + for sale (species/breed/farmer/photo preloaded)
+    listings = marketplace_listings()
 
-    # locations for dropdown
-    locations_qs = (
-        listings.values_list("farmer__farm_location", flat=True)
-        .exclude(farmer__farm_location__isnull=True)
-        .exclude(farmer__farm_location__exact="")
-        .distinct()
-    )
-    locations = sorted(locations_qs)
+    # species/location dropdowns with per-option counts (cached, cleared by signals)
+    facets = get_marketplace_facets()
 
     # --- read filters from GET ---
     species_id = request.GET.get("species")  # will be like "3"
@@ -111,10 +135,48 @@ def marketplace(request):
     except (InvalidOperation, TypeError):
         max_price_raw = ""
 
+    # heart state per card, as an EXISTS column on the same page query
+    page_listings = with_wishlist_flag(listings, buyer_id_for(request.user))
+
+    # free-text search: one page of the best matches instead of newest-first pages
+    query = (request.GET.get("q") or "").strip()
+    if query:
+        page = KeysetPage(list(search_listings(page_listings, query)))
+        listing_count = len(page)
+    else:
+        # keyset pagination (newest first); a bad cursor just falls back to page one
+        page_size = getattr(settings, 'MARKETPLACE_PAGE_SIZE', 24)
+        try:
+            page = keyset_paginate(
+                page_listings, page_size,
+                after=request.GET.get("after"),
+                before=request.GET.get("before"),
+            )
+        except InvalidCursor:
+            page = keyset_paginate(page_listings, page_size)
+        listing_count = listings.count()
+
+    # keep the active filters on the next/previous links
+    params = request.GET.copy()
+    params.pop("after", None)
+    params.pop("before", None)
+    next_url = previous_url = None
+    if page.next_cursor:
+        params["after"] = page.next_cursor
+        next_url = "?" + params.urlencode()
+        params.pop("after")
+    if page.previous_cursor:
+        params["before"] = page.previous_cursor
+        previous_url = "?" + params.urlencode()
+
     context = {
-        "listings": listings,
-        "species_list": species_qs,
-        "locations": locations,
+        "listings": page,
+        "listing_count": listing_count,
+        "next_url": next_url,
+        "previous_url": previous_url,
+        "species_list": facets["species"],
+        "locations": facets["locations"],
+        "selected_query": query,
         "selected_species": species_id,
         "selected_location": location,
         "selected_min_price": min_price_raw,
@@ -125,18 +187,16 @@ def marketplace(request):
 
 # 5. DETAIL VIEW
 def livestock_detail(request, pk):
-    item = get_object_or_404(LivestockItem, pk=pk)
-    
-    # Get related items from the same farmer
-    related_items = LivestockItem.objects.filter(
-        farmer=item.farmer,
-        status='available',
-        is_for_sale=True
-    ).exclude(pk=pk)[:4]
-    
+    # Read-through cache (versioned per listing, bumped by signals): a hot page
+    # renders from memory; only the per-user wishlist and header parts vary
+    item = get_listing(pk)
+    if item is None:
+        raise Http404("No such listing.")
+
+    buyer_id = buyer_id_for(request.user)
     context = {
         'item': item,
-        'related_items': related_items,
+        'in_wishlist': buyer_id is not None and item.pk in get_wishlist_ids(buyer_id),
     }
     return render(request, 'livestock_detail.html', context)
 
@@ -234,11 +294,21 @@ def order_history(request):
     if not hasattr(request.user, 'buyer_profile'):
         messages.error(request, "You are not registered as a buyer.")
         return redirect('dashboard')
-        
-    buyer_orders = Order.objects.filter(buyer=request.user.buyer_profile).order_by('-order_date')
-    
+
+    # Status tabs and numbered pages; lines, animals and first photos are
+    # prefetched, so the query count is the same for 1 order or 1,000
+    buyer_id = request.user.pk
+    status = request.GET.get('status') if request.GET.get('status') in HISTORY_STATUSES else 'all'
+    counts = buyer_status_counts(buyer_id)
+    page = numbered_page(
+        request, buyer_orders(buyer_id, status), counts[status], getattr(settings, 'HISTORY_PAGE_SIZE', 20),
+    )
+
     context = {
-        'orders': buyer_orders,
+        'orders': page,
+        'page': page,
+        'status': status,
+        'status_counts': counts,
         'page_title': 'My Order History'
     }
     return render(request, 'buyer_order_history.html', context)
@@ -249,54 +319,86 @@ def sales_inquiries(request):
     if not hasattr(request.user, 'farmer_profile'):
         messages.error(request, "You are not registered as a farmer.")
         return redirect('dashboard')
-    
-    farmer_items = LivestockItem.objects.filter(farmer=request.user.farmer_profile)
-    sales_inquiries = OrderItem.objects.filter(livestock__in=farmer_items).select_related('order', 'livestock')
-    
+
+    # One row per order line on the farmer's animals (lines still in a cart are not inquiries)
+    farmer_id = request.user.farmer_profile.pk
+    status = request.GET.get('status') if request.GET.get('status') in HISTORY_STATUSES else 'all'
+    counts = farmer_status_counts(farmer_id)
+    page = numbered_page(
+        request, farmer_inquiries(farmer_id, status), counts[status], getattr(settings, 'HISTORY_PAGE_SIZE', 20),
+    )
+
     context = {
-        'inquiries': sales_inquiries,
+        'inquiries': page,
+        'page': page,
+        'status': status,
+        'status_counts': counts,
         'page_title': 'Incoming Sales Inquiries'
     }
     return render(request, 'farmer_sales_inquiries.html', context)
 
-# 10. APPROVE INQUIRY (Updated for Pay-on-Delivery Flow)
+# 10. APPROVE INQUIRY (Pay-on-Delivery flow: approved, animal stays reserved until payment)
 @login_required
 def approve_inquiry(request, pk):
-    inquiry_item = get_object_or_404(OrderItem, pk=pk)
-    
-    # Permission check
-    if inquiry_item.livestock.farmer != request.user.farmer_profile:
+    farmer = getattr(request.user, 'farmer_profile', None)
+    try:
+        if farmer is None:
+            raise inquiries.InquiryError("Not a farmer.")
+        result = inquiries.bulk_update_inquiries(farmer, [pk], 'approve')
+    except inquiries.InquiryError:
         messages.error(request, "You do not have permission to manage this order.")
         return redirect('livestock:sales_inquiries')
+    if not result['orders']:
+        messages.info(request, "This inquiry has already been handled.")
+        return redirect('livestock:sales_inquiries')
 
-    order = inquiry_item.order
-    
-    # --- CHANGE 1: Update status to APPROVED (not confirmed/sold yet) ---
-    order.order_status = 'approved'
-    order.save()
+    # Display the delivery address to the farmer in the success message
+    address = Order.objects.filter(order_items=pk).values_list('delivery_address', flat=True).first()
+    messages.success(request, f"Inquiry Approved! Deliver to: {address or 'No address provided'}. The animal remains reserved until payment.")
+    return redirect('livestock:sales_inquiries')
 
-    # --- CHANGE 2: Animal stays RESERVED (not sold yet) ---
-    # We remove the lines that set status='sold' and is_for_sale=False
-    # because the deal is not finished until delivery.
-    
-    # Optional: Display the delivery address to the farmer in the success message
-    address = order.delivery_address or "No address provided"
-    
-    messages.success(request, f"Inquiry Approved! Deliver to: {address}. The animal remains reserved until payment.")
-    return redirect('livestock:sales_inquiries')# 11. REJECT INQUIRY
+
+# 11. REJECT INQUIRY
 @login_required
 def reject_inquiry(request, pk):
-    inquiry_item = get_object_or_404(OrderItem, pk=pk)
-    
-    if inquiry_item.livestock.farmer != request.user.farmer_profile:
+    farmer = getattr(request.user, 'farmer_profile', None)
+    try:
+        if farmer is None:
+            raise inquiries.InquiryError("Permission denied.")
+        result = inquiries.bulk_update_inquiries(farmer, [pk], 'reject')
+    except inquiries.InquiryError:
         messages.error(request, "Permission denied.")
         return redirect('livestock:sales_inquiries')
 
-    order = inquiry_item.order
-    order.order_status = 'cancelled'
-    order.save()
-    
-    messages.info(request, "Inquiry rejected. The animal remains available.")
+    if not result['orders']:
+        messages.info(request, "This inquiry has already been handled.")
+    else:
+        messages.info(request, "Inquiry rejected. The animal is available again.")
+    return redirect('livestock:sales_inquiries')
+
+
+# 11b. BULK APPROVE / REJECT (checkboxes on the sales inquiries page)
+@login_required
+def bulk_inquiries(request):
+    farmer = getattr(request.user, 'farmer_profile', None)
+    if farmer is None:
+        messages.error(request, "You are not registered as a farmer.")
+        return redirect('dashboard')
+    if request.method != 'POST':
+        return redirect('livestock:sales_inquiries')
+
+    try:
+        ids = [int(value) for value in request.POST.getlist('ids')]
+        result = inquiries.bulk_update_inquiries(farmer, ids, request.POST.get('action'))
+    except ValueError:
+        messages.error(request, "Invalid selection.")
+    except inquiries.InquiryError as e:
+        messages.error(request, str(e))
+    else:
+        verb = 'approved' if request.POST.get('action') == 'approve' else 'rejected'
+        messages.success(request, f"{result['orders']} order(s) {verb}.")
+        if result['skipped']:
+            messages.info(request, f"{len(result['skipped'])} inquiry line(s) were already handled and left unchanged.")
     return redirect('livestock:sales_inquiries')
 
 # 12. RETRY PAYMENT
@@ -344,32 +446,8 @@ def add_to_order(request, pk):
             messages.error(request, "You must be a buyer to add items to an order.")
             return redirect('livestock:livestock_detail', pk=pk)
 
-        order, _ = Order.objects.get_or_create(
-            buyer=buyer,
-            order_status='pending',
-            defaults={'total_amount': Decimal('0')}
-        )
-
-        order_item, created = OrderItem.objects.get_or_create(
-            order=order,
-            livestock=item,
-            defaults={
-                'quantity': 1,
-                'unit_price_at_time': item.price or Decimal('0')
-            }
-        )
-        if not created:
-            order_item.quantity += 1
-            order_item.save()
-
-        # Recalculate total as sum of line prices (no extra tax)
-        total = Decimal('0')
-        for oi in order.order_items.all():
-            line_price = (oi.unit_price_at_time or Decimal('0')) * oi.quantity
-            total += line_price
-
-        order.total_amount = total
-        order.save()
+        # Adds the line (or bumps its quantity) and re-sums the total in the DB
+        cart.add_item(buyer, item)
 
         messages.success(request, "Item added to your cart.")
         return redirect('livestock:view_cart')
@@ -389,17 +467,10 @@ def add_to_wishlist(request, pk):
         except:
             return JsonResponse({'message': 'You must be a buyer to save items.', 'success': False})
         
-        wishlist, created = Wishlist.objects.get_or_create(user=buyer)
-        
-        if item in wishlist.items.all():
-            wishlist.items.remove(item)
-            message = "Removed from Wishlist"
-            in_wishlist = False
-        else:
-            wishlist.items.add(item)
-            message = "Added to Wishlist"
-            in_wishlist = True
-        
+        # Indexed toggle on the through table; the M2M set is never loaded
+        in_wishlist = update_wishlist(buyer, toggle=[item.pk])[item.pk]
+        message = "Added to Wishlist" if in_wishlist else "Removed from Wishlist"
+
         return JsonResponse({'message': message, 'success': True, 'in_wishlist': in_wishlist})
     
     return redirect('livestock:livestock_detail', pk=pk)
@@ -407,21 +478,14 @@ def add_to_wishlist(request, pk):
 
 @login_required
 def view_cart(request):
-    try:
-        buyer = request.user.buyer_profile
-        order = Order.objects.get(buyer=buyer, order_status='pending')
-    except Order.DoesNotExist:
-        order = None
-
-    if order:
-        # Self‑heal: always recompute total from items
-        total = Decimal('0')
-        for oi in order.order_items.all():
-            line_price = (oi.unit_price_at_time or Decimal('0')) * oi.quantity
-            total += line_price
-
-        order.total_amount = total
-        order.save()
+    # Totals are kept current by the cart module, so a GET only reads.
+    # Buyer shares its primary key with User: no profile lookup needed.
+    lines = order_lines()
+    order = (
+        Order.objects.filter(buyer_id=request.user.pk, order_status='pending')
+        .prefetch_related(Prefetch('order_items', queryset=lines))
+        .first()
+    )
 
     return render(request, 'cart.html', {'order': order})
 
@@ -434,19 +498,8 @@ def remove_from_cart(request, item_id):
     except:
         return redirect('livestock:view_cart')
 
-    try:
-        order_item = OrderItem.objects.get(order=order, order_item_id=item_id)
-        order_item.delete()
-    except OrderItem.DoesNotExist:
-        pass
-
-    # Recalculate order total after removal (no tax)
-    total = Decimal('0')
-    for oi in order.order_items.all():
-        line_price = (oi.unit_price_at_time or Decimal('0')) * oi.quantity
-        total += line_price
-    order.total_amount = total
-    order.save()
+    # Delete the line (if it is in this cart) and recalculate the total (no tax)
+    cart.remove_item(order, item_id)
 
     return redirect('livestock:view_cart')
 
@@ -468,18 +521,13 @@ def checkout_cart(request):
     if request.method == 'POST':
         form = CheckoutContactForm(request.POST, instance=order)
         if form.is_valid():
-            # 1. Save the contact info
-            saved_order = form.save(commit=False)
-            
-            # 2. Update Status to 'inquiry_sent'
-            saved_order.order_status = 'inquiry_sent'
-            saved_order.save()
-
-            # 3. Reserve the items
-            for item in saved_order.order_items.all():
-                if item.livestock and item.livestock.status == 'available':
-                    item.livestock.status = 'reserved'
-                    item.livestock.save()
+            # Save the contact info, mark 'inquiry_sent' and reserve every animal
+            # in one locked transaction (nothing changes if one is already taken)
+            try:
+                cart.checkout(order, **form.cleaned_data)
+            except cart.CartError as e:
+                messages.error(request, str(e))
+                return redirect('livestock:view_cart')
 
             messages.success(request, "Inquiry sent! The farmer has received your delivery details and will respond soon.")
             return redirect('livestock:order_history')
@@ -555,4 +603,22 @@ def livestock_delete(request, pk):
         return redirect('dashboard')
         
     # If accessed via GET, redirect back to dashboard (safety)
-    return redirect('dashboard')
\ No newline at end of file
+    return redirect('dashboard')
+
+
+# 15. LIVE HERD FEED (Server-Sent Events for the farmer dashboard)
+@login_required
+async def live_events(request):
+    user = await request.auser()
+    farmer = await Farmer.objects.filter(user=user).afirst()
+    if farmer is None:
+        return HttpResponseForbidden("Only farmers have a live herd feed.")
+
+    # Under WSGI an endless stream would pin a worker forever
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse("Live updates need the ASGI server.", status=503)
+
+    response = StreamingHttpResponse(get_feed().stream(farmer.pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # let nginx-style proxies pass each event through
+    return response
@@ -0,0 +1,84 @@
+# livestock/wishlist.py
+# Wishlist membership. Each buyer's wishlisted livestock ids are cached as a
+# set (Buyer shares its primary key with User) that membership checks read,
+# changes hit the unique (wishlist, item) index, and listing pages get their
+# heart state from an EXISTS annotation on the listing query itself.
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .conditional import bump_user_version
+from .models import LivestockItem, Wishlist
+
+
+WishlistItem = Wishlist.items.through  # (wishlist_id, livestockitem_id), unique together
+
+WISHLIST_CACHE_KEY = 'livestock:wishlist_ids:{buyer_id}'
+WISHLIST_CACHE_TIMEOUT = 60 * 60 * 24  # cleared on every change
+MAX_BATCH_SIZE = 200                   # items per batched toggle/status request
+
+ACTIONS = ('add', 'remove', 'toggle')
+
+
+# 1. READS
+def get_wishlist_ids(buyer_id):
+    """Frozenset of the livestock ids on a buyer's wishlist (cached)."""
+    key = WISHLIST_CACHE_KEY.format(buyer_id=buyer_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(
+            WishlistItem.objects.filter(wishlist__user_id=buyer_id).values_list('livestockitem_id', flat=True)
+        )
+        cache.set(key, ids, WISHLIST_CACHE_TIMEOUT)
+    return ids
+
+
+def clear_wishlist_ids(buyer_id):
+    cache.delete(WISHLIST_CACHE_KEY.format(buyer_id=buyer_id))
+    bump_user_version(buyer_id)  # listing pages show the hearts
+
+
+def with_wishlist_flag(queryset, buyer_id):
+    """Annotates ``in_wishlist`` on a LivestockItem queryset (False for everyone but buyers)."""
+    if buyer_id is None:
+        return queryset.annotate(in_wishlist=Exists(WishlistItem.objects.none()))
+    return queryset.annotate(in_wishlist=Exists(
+        WishlistItem.objects.filter(wishlist__user_id=buyer_id, livestockitem_id=OuterRef('pk'))
+    ))
+
+
+# 2. CHANGES (batched: a fixed number of queries however many items)
+@transaction.atomic
+def update_wishlist(buyer, add=(), remove=(), toggle=()):
+    """
+    Adds, removes and toggles items on the buyer's wishlist in one pass.
+    Unknown livestock ids are ignored. Returns ``{livestock_id: in_wishlist}``
+    for every known id that was named.
+    """
+    wishlist, _ = Wishlist.objects.get_or_create(user=buyer)
+    named = set(add) | set(remove) | set(toggle)
+    known = set(LivestockItem.objects.filter(pk__in=named).values_list('pk', flat=True))
+    current = set(
+        WishlistItem.objects.filter(wishlist=wishlist, livestockitem_id__in=known).values_list('livestockitem_id', flat=True)
+    )
+
+    wanted = set(current)
+    wanted |= known & set(add)
+    wanted -= set(remove)
+    wanted ^= known & set(toggle)
+
+    added, removed = wanted - current, current - wanted
+    if added:
+        WishlistItem.objects.bulk_create(
+            [WishlistItem(wishlist=wishlist, livestockitem_id=pk) for pk in added], ignore_conflicts=True,
+        )
+    if removed:
+        WishlistItem.objects.filter(wishlist=wishlist, livestockitem_id__in=removed).delete()
+    if added or removed:
+        Wishlist.objects.filter(pk=wishlist.pk).update(updated_at=timezone.now())
+        # bulk_create/delete on the through table skip m2m_changed
+        transaction.on_commit(lambda: clear_wishlist_ids(buyer.pk))
+
+    return {pk: pk in wanted for pk in known}
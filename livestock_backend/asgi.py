@@ -2,6 +2,8 @@
 ASGI config for livestock_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with ``uvicorn livestock_backend.asgi:application`` to enable the
+live dashboard feed (livestock/live/), which streams Server-Sent Events.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -71,12 +71,14 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'livestock.context_processors.header',
             ],
         },
     },
 ]
 
 WSGI_APPLICATION = 'livestock_backend.wsgi.application'
+ASGI_APPLICATION = 'livestock_backend.asgi.application'
 
 
 # Database
@@ -127,6 +129,72 @@ LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard' 
 LOGOUT_REDIRECT_URL = 'home'
 
+# Marketplace: listings per page (HTML grid and /api/livestock/)
+MARKETPLACE_PAGE_SIZE = 24
+LIVESTOCK_API_PAGE_SIZE = 20
+
+# Order history and sales inquiry pages: rows per page
+HISTORY_PAGE_SIZE = 20
+
+# Search: most results returned for a ?q= free-text query
+SEARCH_RESULT_LIMIT = 100
+
+# IoT Telemetry: rows written per bulk_create call during ingestion
+TELEMETRY_INGEST_BATCH_SIZE = 1000
+
+# IoT Telemetry: readers that tail the table by id (rollups, alert worker,
+# live feed) only move past rows at least this old, so readings from ingest
+# transactions still open are not skipped. Keep above the longest ingestion.
+TELEMETRY_SETTLE_SECONDS = 60
+
+# IoT Alerts: evaluate rules on the ingestion request itself. Set to False when
+# the `run_alert_engine` worker is tailing the telemetry table instead (needed
+# with several web processes: each inline engine only sees its own requests).
+TELEMETRY_ALERTS_INLINE = True
+
+# Overrides for livestock.alerts.DEFAULT_THRESHOLDS, e.g. a farm geofence:
+# TELEMETRY_ALERT_THRESHOLDS = {'geofence': (-1.9441, 30.0619, 2.0)}
+TELEMETRY_ALERT_THRESHOLDS = {}
+
+# IoT Export: rows fetched from the database cursor per chunk of an export
+TELEMETRY_EXPORT_CHUNK_SIZE = 10000
+
+# IoT Retention: `manage.py apply_telemetry_retention` (daily). Overrides for
+# livestock.retention.DEFAULT_POLICY, e.g. {'raw_days': 180}. Expired readings
+# are archived as gzipped CSV under TELEMETRY_ARCHIVE_DIR/YYYY/MM/DD/.
+TELEMETRY_RETENTION = {}
+TELEMETRY_ARCHIVE_DIR = BASE_DIR / 'telemetry_archive'
+
+# Herd health: days of hourly telemetry rollups analysed for the dashboard and API
+# (as fresh as the last `refresh_telemetry_rollups` run).
+# Overrides for livestock.analytics.DEFAULT_ANALYTICS go in HERD_ANALYTICS.
+HERD_ANALYTICS_DAYS = 30
+HERD_ANALYTICS = {}
+
+# Live dashboard feed (livestock/live.py; served by the ASGI app).
+# One poll of the telemetry/alert tables per interval per process, shared by
+# every open dashboard. The broker is the in-process fan-out behind it.
+LIVE_EVENTS_BROKER = 'livestock.live.LocalBroker'
+LIVE_EVENTS_POLL_INTERVAL = 2.0  # seconds
+LIVE_EVENTS_HEARTBEAT = 15.0     # seconds between keep-alive comments
+
+# Background jobs: run by `manage.py run_worker`. JOB_QUEUE_EAGER runs them
+# right after the request's transaction commits instead (no worker needed).
+JOB_QUEUE_EAGER = False
+JOB_LOCK_TIMEOUT = 600  # seconds before a 'running' job from a dead worker is retried
+
+# Cache: per-process memory locally. Production with more than one worker
+# process needs a shared backend (Redis below): the listing ETag versions,
+# facets, detail pages, cart badges and wishlists are cached without expiry
+# or for hours and only invalidated by deleting or bumping keys, which a
+# per-process cache never passes on to the other workers (they would keep
+# answering 304 with stale pages). `manage.py check --deploy` warns about it.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -146,4 +214,13 @@ if 'DATABASE_URL' in os.environ:
             default=os.environ.get('DATABASE_URL'),
             conn_max_age=600
         )
+    }
+
+# 4. Cache: Use Redis on Render when it is configured
+if 'REDIS_URL' in os.environ:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL'),
+        }
     }
\ No newline at end of file
@@ -36,6 +36,13 @@ urlpatterns = [
 
     
     # API ROUTES (http://127.0.0.1:8000/api/livestock/)
+    path('api/telemetry/ingest/', api_views.TelemetryIngestView.as_view(), name='telemetry_ingest'),
+    path('api/telemetry/export/', api_views.TelemetryExportView.as_view(), name='telemetry_export'),
+    path('api/herd-health/', api_views.HerdHealthView.as_view(), name='herd_health'),
+    path('api/herd-map/', api_views.HerdMapView.as_view(), name='herd_map'),
+    path('api/herd-map/nearest/', api_views.NearestAnimalsView.as_view(), name='herd_map_nearest'),
+    path('api/wishlist/', api_views.WishlistView.as_view(), name='wishlist'),
+    path('api/inquiries/bulk/', api_views.BulkInquiryView.as_view(), name='bulk_inquiries'),
     path('api/', include(router.urls)),
     
     # API Login helper (optional but good for testing)